@@ -0,0 +1,207 @@
+"""
+Detector backend benchmark on one video clip.
+
+Runs every configured backend on the same frames and reports latency
+(ms/frame), throughput and how closely the detections agree with the first
+configuration.
+
+    python benchmarks/bench_detector.py --video clip.mp4 --model yolov8s.pt \
+        --onnx yolov8s.onnx --onnx yolov8s_int8.onnx --openvino yolov8s_openvino_model --threads 1 4
+
+Exported models are produced with:
+
+    python src/vehicle_counter/detector_backends.py --model yolov8s.pt --backend onnxruntime [--int8 --calibration-video clip.mp4]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "vehicle_counter")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from vehicle_detector import VehicleDetector  # noqa: E402
+
+MATCH_IOU = 0.5
+
+
+def read_frames(video_path, count):
+    """
+    Read the first `count` frames of a video into memory
+
+    Returns:
+        list: BGR frames
+    """
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def box_iou(a, b):
+    """
+    IoU matrix of two (N, 4) / (M, 4) box arrays
+    """
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def agreement(reference, detections):
+    """
+    Share of reference boxes matched by a box of the same class (IoU >= MATCH_IOU)
+
+    Args:
+        reference (list): DetectionBatch per frame of the reference configuration
+        detections (list): Same for the compared configuration
+
+    Returns:
+        float: Recall against the reference (1.0 when the reference found nothing)
+    """
+    matched = 0
+    total = 0
+
+    for (ref_boxes, _, ref_classes), (boxes, _, classes) in zip(reference, detections):
+        total += len(ref_boxes)
+        if len(ref_boxes) == 0 or len(boxes) == 0:
+            continue
+
+        iou = box_iou(ref_boxes, boxes)
+        same_class = np.asarray(ref_classes)[:, None] == np.asarray(classes)[None, :]
+        matched += int(((iou >= MATCH_IOU) & same_class).any(axis=1).sum())
+
+    return matched / total if total else 1.0
+
+
+def benchmark(label, detector, frames, batch_size, warmup):
+    """
+    Time one backend configuration over the frames
+
+    Returns:
+        tuple: (result dict, detections per frame)
+    """
+    for start in range(0, min(warmup, len(frames)), batch_size):
+        detector.detect_vehicles_batch(frames[start:start + batch_size])
+
+    detections = []
+    per_frame_ms = []
+    started = time.perf_counter()
+
+    for start in range(0, len(frames), batch_size):
+        batch = frames[start:start + batch_size]
+        batch_started = time.perf_counter_ns()
+        detections.extend(detector.detect_vehicles_batch(batch))
+        per_frame_ms.extend([(time.perf_counter_ns() - batch_started) / 1e6 / len(batch)] * len(batch))
+
+    elapsed = time.perf_counter() - started
+    per_frame_ms = np.array(per_frame_ms)
+
+    result = {
+        "backend": label,
+        "frames": len(frames),
+        "mean_ms": round(float(per_frame_ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(per_frame_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(per_frame_ms, 95)), 2),
+        "fps": round(len(frames) / elapsed, 1) if elapsed > 0 else 0.0,
+        "detections_per_frame": round(sum(len(d) for d in detections) / max(1, len(frames)), 2),
+    }
+
+    return result, detections
+
+
+def configurations(args):
+    """
+    (label, backend, model_path, threads) of every configuration to run
+    """
+    configs = []
+    if args.model:
+        configs.append((f"ultralytics {os.path.basename(args.model)}", "ultralytics", args.model, None))
+
+    threads_list = args.threads or [None]
+    for backend, paths in (("onnxruntime", args.onnx), ("openvino", args.openvino)):
+        for path in paths:
+            for threads in threads_list:
+                label = f"{backend} {os.path.basename(os.path.normpath(path))}"
+                if threads:
+                    label += f" t={threads}"
+                configs.append((label, backend, path, threads))
+
+    return configs
+
+
+def print_results(results):
+    print(f"\n{'backend':<48}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'fps':>8}{'det/f':>8}{'agree':>8}")
+    for result in results:
+        print(f"{result['backend']:<48}{result['mean_ms']:>10.2f}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+              f"{result['fps']:>8.1f}{result['detections_per_frame']:>8.2f}{result['agreement']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare detector backends on the same video clip")
+
+    parser.add_argument("--video", "-v", type=str, required=True,
+                        help="Video clip")
+    parser.add_argument("--model", "-m", type=str, default="yolov8s.pt",
+                        help="PyTorch model for the ultralytics backend (empty string to skip)")
+    parser.add_argument("--onnx", type=str, action="append", default=[],
+                        help="ONNX model for the onnxruntime backend (repeatable, e.g. FP32 and INT8)")
+    parser.add_argument("--openvino", type=str, action="append", default=[],
+                        help="OpenVINO model (.xml or directory, repeatable)")
+    parser.add_argument("--threads", type=int, nargs="+", default=None,
+                        help="Thread counts to try on the onnxruntime/openvino backends")
+    parser.add_argument("--frames", type=int, default=200,
+                        help="Frames read from the clip")
+    parser.add_argument("--warmup", type=int, default=10,
+                        help="Frames run before measuring")
+    parser.add_argument("--batch-size", "-b", type=int, default=1,
+                        help="Frames per detector call")
+    parser.add_argument("--json", type=str, default=None,
+                        help="Write results to this JSON file")
+
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    if not frames:
+        parser.error(f"No frames read from {args.video}")
+
+    results = []
+    reference = None
+
+    for label, backend, model_path, threads in configurations(args):
+        print(f"Running {label} ...")
+        detector = VehicleDetector(model_path, "cpu", backend, threads)
+        result, detections = benchmark(label, detector, frames, args.batch_size, args.warmup)
+
+        # The first configuration is the accuracy reference of the others
+        if reference is None:
+            reference = detections
+        result["agreement"] = round(agreement(reference, detections), 4)
+        results.append(result)
+
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"video": args.video, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
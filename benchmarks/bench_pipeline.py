@@ -0,0 +1,210 @@
+"""
+CPU-side pipeline benchmark with synthetic detections.
+
+Measures per-stage time (µs/frame) and allocations of tracking, zone
+statistics and traffic light control for a grid of vehicle and zone counts.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --vehicles 10 500 --zones 4 64 --frames 600 --json result.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from synthetic import SyntheticTraffic, make_zone_manager
+
+from clock import FrameClock
+from traffic_light_controller import TrafficLightController
+from vehicle_tracker import VehicleTracker
+
+FRAME_INTERVAL = 1.0 / 30
+
+STAGES = ["tracking", "zone_lookup", "statistics", "light_control"]
+ADDITIVE_STAGES = ["tracking", "statistics", "light_control"]  # zone_lookup is part of tracking
+
+
+class Scenario:
+    """
+    One benchmark configuration: zones, tracker, controller and precomputed detections
+    """
+
+    def __init__(self, n_vehicles, n_zones, frames, seed=0):
+        self.n_vehicles = n_vehicles
+        self.n_zones = n_zones
+        self.clock = FrameClock()
+        self.zone_manager = make_zone_manager(n_zones, clock=self.clock)
+        self.tracker = VehicleTracker(clock=self.clock, zone_manager=self.zone_manager)
+        self.tracker.initialize_zones(self.zone_manager.zones)
+        self.controller = TrafficLightController(clock=self.clock)
+        self.detections = SyntheticTraffic(n_vehicles, seed=seed).frames(frames)
+        self.index = 0
+
+    def run_frame(self, measure):
+        """
+        Process the next frame
+
+        Args:
+            measure (callable): measure(stage, func, *args) runs func and records it
+        """
+        detections = self.detections[self.index]
+        current_time = self.clock.tick(self.index * FRAME_INTERVAL)
+        self.index += 1
+
+        zones = self.zone_manager.zones
+
+        measure("tracking", self.tracker.track_vehicles,
+                None, detections, zones, 1, current_time)
+
+        centers = detections.centers()
+        measure("zone_lookup", self.zone_manager.label_points, zones, centers)
+
+        measure("statistics", update_statistics, zones, current_time)
+
+        measure("light_control", self.controller.manage_traffic_congestion, zones, current_time)
+
+
+def update_statistics(zones, current_time):
+    for zone in zones:
+        zone.update_statistics(current_time)
+
+
+def run_timing(scenario, frames, warmup):
+    """
+    Time each stage
+
+    Returns:
+        dict: {stage: numpy array of µs per frame}
+    """
+    samples = {stage: [] for stage in STAGES}
+
+    def measure(stage, func, *args):
+        start = time.perf_counter_ns()
+        func(*args)
+        samples[stage].append((time.perf_counter_ns() - start) / 1000.0)
+
+    def discard(stage, func, *args):
+        func(*args)
+
+    for _ in range(warmup):
+        scenario.run_frame(discard)
+    for _ in range(frames):
+        scenario.run_frame(measure)
+
+    return {stage: np.array(values) for stage, values in samples.items()}
+
+
+def run_allocations(scenario, frames):
+    """
+    Trace allocations of each stage
+
+    Returns:
+        dict: {stage: (peak bytes per frame, retained bytes per frame)}
+    """
+    peak = {stage: 0 for stage in STAGES}
+    retained = {stage: 0 for stage in STAGES}
+
+    def measure(stage, func, *args):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(*args)
+        current, stage_peak = tracemalloc.get_traced_memory()
+        peak[stage] += stage_peak - before
+        retained[stage] += current - before
+
+    tracemalloc.start()
+    try:
+        for _ in range(frames):
+            scenario.run_frame(measure)
+    finally:
+        tracemalloc.stop()
+
+    return {stage: (peak[stage] / frames, retained[stage] / frames) for stage in STAGES}
+
+
+def benchmark(n_vehicles, n_zones, frames, warmup, allocations, seed):
+    """
+    Run one configuration
+
+    Returns:
+        dict: Result of the configuration
+    """
+    alloc_frames = min(frames, 100)
+    scenario = Scenario(n_vehicles, n_zones, warmup + frames + (alloc_frames if allocations else 0), seed)
+
+    # Traffic light changes print notices
+    with contextlib.redirect_stdout(io.StringIO()):
+        timing = run_timing(scenario, frames, warmup)
+        allocs = run_allocations(scenario, alloc_frames) if allocations else None
+
+    stages = {}
+    for stage in STAGES:
+        values = timing[stage]
+        stages[stage] = {
+            "mean_us": round(float(values.mean()), 2),
+            "p50_us": round(float(np.percentile(values, 50)), 2),
+            "p95_us": round(float(np.percentile(values, 95)), 2),
+        }
+        if allocs is not None:
+            stages[stage]["peak_kb"] = round(allocs[stage][0] / 1024, 2)
+            stages[stage]["retained_b"] = round(allocs[stage][1], 1)
+
+    return {
+        "vehicles": n_vehicles,
+        "zones": n_zones,
+        "frames": frames,
+        "total_mean_us": round(sum(stages[stage]["mean_us"] for stage in ADDITIVE_STAGES), 2),
+        "stages": stages,
+    }
+
+
+def print_result(result):
+    print(f"\nvehicles={result['vehicles']} zones={result['zones']} frames={result['frames']} "
+          f"total={result['total_mean_us']:.1f} µs/frame")
+    print(f"  {'stage':<14}{'mean µs':>10}{'p50 µs':>10}{'p95 µs':>10}{'peak KB':>10}{'kept B':>10}")
+    for stage, values in result["stages"].items():
+        line = f"  {stage:<14}{values['mean_us']:>10.1f}{values['p50_us']:>10.1f}{values['p95_us']:>10.1f}"
+        if "peak_kb" in values:
+            line += f"{values['peak_kb']:>10.1f}{values['retained_b']:>10.0f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracking, zone and traffic light benchmark with synthetic detections")
+
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[10, 100, 500],
+                        help="Vehicle counts")
+    parser.add_argument("--zones", type=int, nargs="+", default=[4, 16, 64],
+                        help="Zone counts")
+    parser.add_argument("--frames", type=int, default=300,
+                        help="Measured frames per configuration")
+    parser.add_argument("--warmup", type=int, default=30,
+                        help="Frames run before measuring")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed of the synthetic traffic")
+    parser.add_argument("--no-alloc", action="store_true",
+                        help="Skip the tracemalloc pass")
+    parser.add_argument("--json", type=str, default=None,
+                        help="Write results to this JSON file")
+
+    args = parser.parse_args()
+
+    results = []
+    for n_zones in args.zones:
+        for n_vehicles in args.vehicles:
+            result = benchmark(n_vehicles, n_zones, args.frames, args.warmup, not args.no_alloc, args.seed)
+            print_result(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
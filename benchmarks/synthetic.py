@@ -0,0 +1,141 @@
+"""
+Synthetic zone layouts and vehicle trajectories for the benchmarks.
+No model or camera is needed: detections are generated from moving boxes.
+"""
+import math
+import os
+import sys
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "vehicle_counter")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from detections import DetectionBatch  # noqa: E402
+from zone_manager import Zone, ZoneManager  # noqa: E402
+
+FRAME_WIDTH = 1920
+FRAME_HEIGHT = 1080
+
+DIRECTIONS = [
+    "West_Left", "West_Straight", "West_Right",
+    "East_Left", "East_Straight", "East_Right",
+    "North_Left", "North_Straight", "North_Right",
+    "South_Left", "South_Straight", "South_Right",
+]
+
+
+def make_zone_manager(n_zones, clock=None, width=FRAME_WIDTH, height=FRAME_HEIGHT):
+    """
+    Grid of quadrilateral zones covering the frame, alternating COUNT and SUM
+
+    Args:
+        n_zones (int): Number of zones
+        clock: Clock passed to the zones
+        width (int): Frame width
+        height (int): Frame height
+
+    Returns:
+        ZoneManager: Zone manager with n_zones zones
+    """
+    manager = ZoneManager(clock=clock)
+
+    cols = math.ceil(math.sqrt(n_zones * width / height))
+    rows = math.ceil(n_zones / cols)
+    cell_w = width / cols
+    cell_h = height / rows
+
+    for i in range(n_zones):
+        row, col = divmod(i, cols)
+        x0, y0 = col * cell_w, row * cell_h
+        inset_x, inset_y = cell_w * 0.05, cell_h * 0.05
+
+        # Slightly skewed quadrilateral, like a lane seen in perspective
+        points = [
+            (int(x0 + inset_x * 2), int(y0 + inset_y)),
+            (int(x0 + cell_w - inset_x), int(y0 + inset_y)),
+            (int(x0 + cell_w - inset_x * 2), int(y0 + cell_h - inset_y)),
+            (int(x0 + inset_x), int(y0 + cell_h - inset_y)),
+        ]
+
+        zone_type = Zone.ZONE_TYPE_COUNT if i % 2 == 0 else Zone.ZONE_TYPE_SUM
+        zone = manager.create_zone(points, zone_type, name=f"Z{i + 1}")
+        zone.traffic_light_directions = [DIRECTIONS[i % len(DIRECTIONS)]]
+
+    return manager
+
+
+class SyntheticTraffic:
+    """
+    Vehicles moving on straight lines across the frame. A share of them is
+    stopped so stall detection runs too. Vehicles leaving the frame re-enter
+    from the opposite side.
+    """
+
+    def __init__(self, n_vehicles, seed=0, stopped_ratio=0.2, miss_rate=0.02, jitter=2.0,
+                 width=FRAME_WIDTH, height=FRAME_HEIGHT):
+        """
+        Create traffic
+
+        Args:
+            n_vehicles (int): Number of vehicles
+            seed (int): Random seed (same seed = same detections)
+            stopped_ratio (float): Share of vehicles that do not move
+            miss_rate (float): Probability that a vehicle is not detected in a frame
+            jitter (float): Detection noise (pixels)
+            width (int): Frame width
+            height (int): Frame height
+        """
+        self.rng = np.random.default_rng(seed)
+        self.n = n_vehicles
+        self.miss_rate = miss_rate
+        self.jitter = jitter
+        self.width = width
+        self.height = height
+
+        self.size = self.rng.uniform(40, 120, size=(n_vehicles, 2))
+        self.position = self.rng.uniform((0, 0), (width, height), size=(n_vehicles, 2))
+
+        angle = self.rng.uniform(0, 2 * np.pi, size=n_vehicles)
+        speed = self.rng.uniform(2, 15, size=n_vehicles)
+        speed[self.rng.random(n_vehicles) < stopped_ratio] = 0
+        self.velocity = np.stack([np.cos(angle) * speed, np.sin(angle) * speed], axis=1)
+
+        self.class_ids = self.rng.choice([2, 3, 5, 7], size=n_vehicles)
+
+    def step(self):
+        """
+        Move all vehicles by one frame and return the detections
+
+        Returns:
+            DetectionBatch: Detections, like VehicleDetector.detect_vehicles
+        """
+        self.position += self.velocity
+        self.position[:, 0] %= self.width
+        self.position[:, 1] %= self.height
+
+        visible = self.rng.random(self.n) >= self.miss_rate
+        center = self.position[visible] + self.rng.normal(0, self.jitter, size=(int(visible.sum()), 2))
+        half = self.size[visible] / 2
+
+        boxes = np.concatenate([center - half, center + half], axis=1)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, self.width - 1)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, self.height - 1)
+
+        scores = self.rng.uniform(0.4, 0.95, size=len(boxes))
+
+        return DetectionBatch(boxes.astype(np.float32), scores.astype(np.float32),
+                              self.class_ids[visible].astype(np.int32))
+
+    def frames(self, count):
+        """
+        Precompute detections so generation is not part of the measurement
+
+        Args:
+            count (int): Number of frames
+
+        Returns:
+            list: DetectionBatch per frame
+        """
+        return [self.step() for _ in range(count)]
@@ -12,6 +12,7 @@ setup(
         "uvicorn>=0.15.0",
         "pydantic>=1.8.0",
         "numpy>=1.19.0",
+        "scipy>=1.5.0",
     ],
     python_requires=">=3.8",
     author="Developers",
@@ -142,6 +142,8 @@ export default function Home() {
   const [detectionSocket, setDetectionSocket] = useState<any>(null);
   const [detectionActive, setDetectionActive] = useState(false);
   const [currentFrame, setCurrentFrame] = useState<string | null>(null);
+  const frameUrlRef = useRef<string | null>(null);
+  const lastFrameSeqRef = useRef(0);
   const [detectionData, setDetectionData] = useState<DetectionData | null>(null);
   const [loadingDetection, setLoadingDetection] = useState(false);
   
@@ -193,6 +195,7 @@ export default function Home() {
       console.log('Disconnected from detection server');
       setDetectionActive(false);
       setCurrentFrame(null);
+      lastFrameSeqRef.current = 0;
       setDetectionData(null);
     });
 
@@ -201,8 +204,16 @@ export default function Home() {
       setLoadingDetection(false);
     });
 
-    socket.on('frame', (data: { image: string, detection_data: DetectionData }) => {
-      setCurrentFrame(`data:image/jpeg;base64,${data.image}`);
+    socket.on('frame', (data: { seq: number, image: ArrayBuffer, detection_data: DetectionData }) => {
+      // Frames arrive as binary JPEG; ignore anything older than what is shown
+      if (data.seq <= lastFrameSeqRef.current) return;
+      lastFrameSeqRef.current = data.seq;
+
+      const url = URL.createObjectURL(new Blob([data.image], { type: 'image/jpeg' }));
+      if (frameUrlRef.current) URL.revokeObjectURL(frameUrlRef.current);
+      frameUrlRef.current = url;
+
+      setCurrentFrame(url);
       setDetectionData(data.detection_data);
     });
 
@@ -215,6 +226,10 @@ export default function Home() {
     return () => {
       // Clean up the socket connection when component unmounts
       socket.disconnect();
+      if (frameUrlRef.current) {
+        URL.revokeObjectURL(frameUrlRef.current);
+        frameUrlRef.current = null;
+      }
     };
   }, []);
 
@@ -3,5 +3,6 @@ from .zone_manager import Zone, ZoneManager
 from .vehicle_tracker import VehicleTracker
 from .zone_setup import ZoneSetupUI
 from .vehicle_counter_service import VehicleCounterService
+from .multi_stream_runner import MultiStreamRunner
 
 __version__ = "1.0.0" 
\ No newline at end of file
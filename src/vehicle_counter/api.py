@@ -1,4 +1,5 @@
 import os
+import asyncio
 import logging
 import threading
 import time
@@ -6,13 +7,16 @@ import json
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 
 from vehicle_counter_service import VehicleCounterService
+from telemetry_stream import TelemetryBroadcaster
+from frame_buffer import mjpeg_stream, MJPEG_BOUNDARY
+from metrics import REGISTRY, CONTENT_TYPE, API_REQUEST_SECONDS
 
 
 
@@ -23,9 +27,20 @@ class CountingConfig(BaseModel):
     video_path: Optional[str] = None
     model_path: str = "yolov8s.pt"
     device: str = "cpu"
+    backend: str = "ultralytics"
+    threads: Optional[int] = None
+    detection: Optional[Dict] = None
     display: bool = True
     save_data: bool = True
     save_video: bool = False
+    batch_size: int = 1
+    pipelined: bool = False
+    queue_size: int = 4
+    motion_gate: bool = False
+    motion_threshold: float = 0.002
+    roi_inference: bool = False
+    roi_imgsz: Optional[int] = None
+    offline: bool = False
     location: Optional[str] = None
 
 
@@ -38,6 +53,8 @@ class CountingStatus(BaseModel):
     model_path: str
     frame_count: int = 0
     fps: float = 0.0
+    motion_skip_ratio: float = 0.0
+    motion_gate: Dict = {}
     zones: List[Dict] = []
 
 
@@ -96,33 +113,92 @@ counter_service = None
 counter_thread = None
 
 
+def get_published_snapshot():
+    """
+    Боловсруулалтын урсгалын хамгийн сүүлд нийтэлсэн snapshot
+    """
+    if counter_service is None:
+        return None
+    return counter_service.snapshot
+
+
+telemetry = TelemetryBroadcaster(get_published_snapshot)
+
+
+def get_metric_gauges():
+    """
+    Scrape хийх үед уншигдах gauge-ууд: pipeline дарааллын урт, видео үзэгчид (бүсүүдэд хандахгүй)
+    """
+    service = counter_service
+    if service is None:
+        return {}, {}
+
+    queue_depths = {(service.stream_label, stage): depth for stage, depth in service.get_queue_depths().items()}
+    return queue_depths, {(service.stream_label,): service.frame_buffer.viewers}
+
+
+REGISTRY.gauge("vehicle_counter_pipeline_queue_depth", "Batches waiting in front of a pipeline stage",
+               ("stream", "stage"), callback=lambda: get_metric_gauges()[0])
+REGISTRY.gauge("vehicle_counter_video_viewers", "Connected MJPEG viewers",
+               ("stream",), callback=lambda: get_metric_gauges()[1])
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    API хүсэлтийн хугацааг Prometheus histogram-д бүртгэх (stream-ийн хувьд толгой илгээх хүртэлх хугацаа)
+    """
+    started = time.perf_counter()
+    response = await call_next(request)
+
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    API_REQUEST_SECONDS.labels(request.method, path, response.status_code).observe(time.perf_counter() - started)
+
+    return response
+
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus text exposition формат дахь хэмжүүрүүд
+    """
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 def read_root():
     return {"message": "Замын хөдөлгөөнийг хянах ба удирдах системийн API"}
 
 
-@app.get("/api/zones")
-def get_zones():
+def snapshot_response(name):
     """
-    Бүх бүсийн жагсаалтыг авах
+    Хамгийн сүүлийн snapshot-оос бэлэн JSON хариу буцаах
+    
+    Args:
+        name (str): Хариуны нэр (dashboard, zones, congestion, statistics)
+    
+    Returns:
+        Response: JSON хариу
     """
     if counter_service is None:
         raise HTTPException(status_code=503, detail="Систем бэлэн бус байна")
     
-    zones = []
+    snapshot = counter_service.get_snapshot()
     
-    for zone in counter_service.zone_manager.zones:
-        zones.append({
-            "id": zone.id,
-            "name": zone.name,
-            "type": zone.type,
-            "vehicle_count": zone.get_display_count(),
-            "is_stalled": zone.is_stalled,
-            "traffic_light_directions": zone.traffic_light_directions,
-            "points": zone.points
-        })
-    
-    return {"zones": zones}
+    return Response(
+        content=snapshot.payload(name),
+        media_type="application/json",
+        headers={"X-Snapshot-Version": str(snapshot.version)}
+    )
+
+
+@app.get("/api/zones")
+def get_zones():
+    """
+    Бүх бүсийн жагсаалтыг авах
+    """
+    return snapshot_response("zones")
 
 
 @app.post("/api/zones")
@@ -186,37 +262,10 @@ def get_all_statistics():
     """
     Бүх бүсийн статистик мэдээлэл авах
     """
-    if counter_service is None:
-        raise HTTPException(status_code=503, detail="Систем бэлэн бус байна")
-    
     try:
-        statistics = counter_service.zone_manager.get_all_statistics()
-        
-        
-        total_stats = {
-            "total_zones": len(statistics),
-            "total_congestion_events": sum(stat["congestion_events"] for stat in statistics),
-            "avg_congestion_time": sum(stat["total_stalled_time"] for stat in statistics) / len(statistics) if statistics else 0,
-            "busiest_zone": None,
-            "timestamp": time.time()
-        }
-        
-        
-        max_vehicles = 0
-        busiest_zone = None
-        
-        for stat in statistics:
-            if stat["max_vehicle_count"] > max_vehicles:
-                max_vehicles = stat["max_vehicle_count"]
-                busiest_zone = stat["zone_name"]
-                
-        total_stats["busiest_zone"] = busiest_zone
-        total_stats["max_vehicles"] = max_vehicles
-        
-        return {
-            "zones": statistics,
-            "summary": total_stats
-        }
+        return snapshot_response("statistics")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Статистик авахад алдаа гарлаа: {str(e)}")
 
@@ -315,21 +364,7 @@ def get_congestion_status():
     """
     Бүх бүсийн түгжрэлийн статусыг авах
     """
-    if counter_service is None:
-        raise HTTPException(status_code=503, detail="Систем бэлэн бус байна")
-    
-    congestion_data = []
-    
-    for zone in counter_service.zone_manager.zones:
-        congestion_data.append({
-            "zone_id": zone.id,
-            "zone_name": zone.name,
-            "is_stalled": zone.is_stalled,
-            "vehicle_count": len(zone.current_vehicles),
-            "stalled_time": zone.stalled_time
-        })
-    
-    return {"congestion": congestion_data}
+    return snapshot_response("congestion")
 
 
 @app.get("/api/dashboard")
@@ -337,56 +372,93 @@ def get_dashboard_data():
     """
     Даашбоард харуулах мэдээлэл авах
     """
-    if counter_service is None:
-        raise HTTPException(status_code=503, detail="Систем бэлэн бус байна")
+    return snapshot_response("dashboard")
+
+
+@app.websocket("/ws/telemetry")
+async def telemetry_websocket(websocket: WebSocket):
+    """
+    Бүсийн тоо, түгжрэл, гэрлэн дохионы өөрчлөлтийг WebSocket-оор дамжуулах.
+    Холбогдоход бүтэн төлөв, дараа нь зөвхөн өөрчлөлт илгээнэ.
+    """
+    await websocket.accept()
     
+    snapshot = counter_service.get_snapshot() if counter_service is not None else None
+    queue = telemetry.subscribe(snapshot)
     
-    zones_data = []
-    stalled_zones = 0
-    total_vehicles = 0
+    try:
+        while True:
+            message = await queue.get()
+            await websocket.send_text(message)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        telemetry.unsubscribe(queue)
+
+
+@app.get("/api/telemetry/stream")
+async def telemetry_events(request: Request):
+    """
+    WebSocket-ийн оронд Server-Sent Events ашиглан өөрчлөлт дамжуулах
+    """
+    snapshot = counter_service.get_snapshot() if counter_service is not None else None
+    queue = telemetry.subscribe(snapshot)
     
-    for zone in counter_service.zone_manager.zones:
-        vehicle_count = len(zone.current_vehicles)
-        total_vehicles += vehicle_count
-        
-        if zone.is_stalled:
-            stalled_zones += 1
-            
-        zones_data.append({
-            "id": zone.id,
-            "name": zone.name,
-            "vehicle_count": vehicle_count,
-            "is_stalled": zone.is_stalled,
-            "type": "COUNT" if zone.is_count_zone() else "SUM"
-        })
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+        finally:
+            telemetry.unsubscribe(queue)
     
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/api/telemetry/stats")
+def get_telemetry_stats():
+    """
+    Түгээлтийн статистик (холбогдсон клиент, дарааллын урт)
+    """
+    return telemetry.get_stats()
+
+
+@app.get("/api/video/mjpeg")
+async def video_mjpeg(width: Optional[int] = None, quality: Optional[int] = None, fps: float = 10):
+    """
+    Боловсруулсан дүрсийг MJPEG (multipart/x-mixed-replace) хэлбэрээр дамжуулах.
+    Хэмжээ, чанарыг тогтмол хувилбаруудын хамгийн ойрхоор сонгоно.
     
-    lights_data = {}
-    red_lights = 0
+    Args:
+        width (int): Хүссэн өргөн (байхгүй бол бүтэн хэмжээ)
+        quality (int): Хүссэн JPEG чанар (1~100)
+        fps (float): Секундэд илгээх дээд кадр
+    """
+    service = counter_service
+    if service is None:
+        raise HTTPException(status_code=503, detail="Систем бэлэн бус байна")
     
-    if counter_service.traffic_light_controller:
-        lights_data = counter_service.traffic_light_controller.traffic_lights
-        
-        
-        for light in lights_data.values():
-            if light["status"] == "RED":
-                red_lights += 1
-    
-    
-    summary = {
-        "total_zones": len(zones_data),
-        "stalled_zones": stalled_zones,
-        "total_vehicles": total_vehicles,
-        "congestion_level": "Хэвийн" if stalled_zones == 0 else "Дунд зэрэг" if stalled_zones < 3 else "Хүнд",
-        "red_lights": red_lights,
-        "timestamp": time.time()
-    }
+    variant = service.frame_buffer.select_variant(width, quality)
     
-    return {
-        "zones": zones_data,
-        "lights": lights_data,
-        "summary": summary
-    }
+    return StreamingResponse(
+        mjpeg_stream(service.frame_buffer, variant, fps, is_active=lambda: counter_service is service),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-cache", "X-Frame-Variant": variant}
+    )
+
+
+@app.get("/api/video/stats")
+def get_video_stats():
+    """
+    Кодлосон кадрын буферын статистик (үзэгчид, кодлолтын тоо)
+    """
+    if counter_service is None:
+        raise HTTPException(status_code=503, detail="Систем бэлэн бус байна")
+    return counter_service.frame_buffer.get_stats()
 
 
 @app.get("/api/vehicle-counter/status", response_model=CountingStatus)
@@ -400,6 +472,8 @@ async def get_status():
         
         counter_status.frame_count = counter_service.frame_count
         counter_status.fps = counter_service.fps
+        counter_status.motion_gate = counter_service.get_motion_gate_stats()
+        counter_status.motion_skip_ratio = counter_status.motion_gate.get("skip_ratio", 0.0)
         
         
         counter_status.zones = []
@@ -414,6 +488,55 @@ async def get_status():
     return counter_status
 
 
+@app.get("/api/vehicle-counter/pipeline")
+async def get_pipeline_stats():
+    """
+    Боловсруулалтын шат бүрийн дарааллын урт ба хоцролт авах
+    """
+    if counter_service is None:
+        raise HTTPException(status_code=503, detail="Систем бэлэн бус байна")
+    
+    return {
+        "is_running": counter_service.processing,
+        "stages": counter_service.get_pipeline_stats()
+    }
+
+
+@app.get("/api/vehicle-counter/latency")
+async def get_latency_stats():
+    """
+    Шат бүрийн (capture, inference, tracking, zone_update, light_control,
+    rendering, persistence) кадр тутмын хоцролтын p50/p95/p99
+    """
+    if counter_service is None:
+        raise HTTPException(status_code=503, detail="Систем бэлэн бус байна")
+    
+    return {
+        "is_running": counter_service.processing,
+        "stages": counter_service.get_latency_stats()
+    }
+
+
+@app.post("/api/vehicle-counter/profile")
+async def profile_processing(duration: float = 5.0, top: int = 30):
+    """
+    Боловсруулалтын урсгалуудыг sampling profiler-оор хэмжих
+    
+    Args:
+        duration (float): Хэмжих хугацаа (секунд, 0.1~60)
+        top (int): Тайланд орох функцийн тоо
+    """
+    if counter_service is None or not counter_service.processing:
+        raise HTTPException(status_code=409, detail="Боловсруулалт ажиллаагүй байна")
+    
+    duration = max(0.1, min(60.0, duration))
+    
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, counter_service.profile, duration, top)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 @app.post("/api/vehicle-counter/start", response_model=CountingStatus)
 async def start_counting(config: CountingConfig):
     """
@@ -432,12 +555,18 @@ async def start_counting(config: CountingConfig):
             counter_thread.join(timeout=3.0)
     
     
-    counter_service = VehicleCounterService(
-        video_path=config.video_path,
-        model_path=config.model_path,
-        device=config.device,
-        output_path="data"
-    )
+    try:
+        counter_service = VehicleCounterService(
+            video_path=config.video_path,
+            model_path=config.model_path,
+            device=config.device,
+            output_path="data",
+            backend=config.backend,
+            threads=config.threads,
+            detection=config.detection
+        )
+    except (ValueError, ImportError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     
     counter_status.is_running = True
@@ -445,6 +574,8 @@ async def start_counting(config: CountingConfig):
     counter_status.model_path = config.model_path
     counter_status.frame_count = 0
     counter_status.fps = 0.0
+    counter_status.motion_skip_ratio = 0.0
+    counter_status.motion_gate = {}
     counter_status.zones = []
     
     
@@ -453,7 +584,15 @@ async def start_counting(config: CountingConfig):
         kwargs={
             "display": config.display,
             "save_data": config.save_data,
-            "save_video": config.save_video
+            "save_video": config.save_video,
+            "batch_size": config.batch_size,
+            "pipelined": config.pipelined,
+            "queue_size": config.queue_size,
+            "motion_gate": config.motion_gate,
+            "motion_threshold": config.motion_threshold,
+            "roi_inference": config.roi_inference,
+            "roi_imgsz": config.roi_imgsz,
+            "offline": config.offline
         }
     )
     counter_thread.daemon = True
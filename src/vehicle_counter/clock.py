@@ -0,0 +1,66 @@
+import time
+
+
+class SystemClock:
+    """
+    Wall clock: every call reads the system time
+    """
+
+    def now(self):
+        """
+        Current time
+
+        Returns:
+            float: Unix timestamp
+        """
+        return time.time()
+
+
+class FrameClock:
+    """
+    Clock sampled once per frame. All zone, tracker and traffic light updates
+    of a frame see the same time. Replay and simulation pass their own
+    timestamps to tick().
+    """
+
+    def __init__(self, source=time.time):
+        """
+        Create clock
+
+        Args:
+            source (callable): Time source used when tick() gets no timestamp
+        """
+        self.source = source
+        self.current = None
+
+    def tick(self, timestamp=None):
+        """
+        Start a new frame
+
+        Args:
+            timestamp (float): Frame time (None = read the source)
+
+        Returns:
+            float: Frame time
+        """
+        self.current = self.source() if timestamp is None else timestamp
+        return self.current
+
+    def now(self):
+        """
+        Time of the current frame (the source time before the first tick or after reset)
+
+        Returns:
+            float: Timestamp
+        """
+        current = self.current
+        return self.source() if current is None else current
+
+    def reset(self):
+        """
+        Leave frame mode: now() follows the source until the next tick
+        """
+        self.current = None
+
+
+SYSTEM_CLOCK = SystemClock()
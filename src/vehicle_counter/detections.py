@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class DetectionBatch:
+    """
+    Detections of one frame as a struct of arrays.
+    Built once from the detector output and read in place by tracking, zone
+    labelling and drawing. The arrays are never modified after construction;
+    the tracker only sets track_ids and is_new.
+    """
+
+    __slots__ = ("boxes", "scores", "class_ids", "track_ids", "is_new", "reused", "_centers")
+
+    def __init__(self, boxes, scores, class_ids):
+        """
+        Args:
+            boxes (numpy.ndarray): (N, 4) float32 boxes x1, y1, x2, y2
+            scores (numpy.ndarray): (N,) float32 confidences
+            class_ids (numpy.ndarray): (N,) int32 class IDs
+        """
+        self.boxes = boxes
+        self.scores = scores
+        self.class_ids = class_ids
+        self.track_ids = None  # (N,) int64 vehicle IDs, set by the tracker
+        self.is_new = None  # (N,) bool, set by the tracker
+        self.reused = False  # Detections of an earlier frame (detector skipped)
+        self._centers = None
+
+    @classmethod
+    def empty(cls):
+        """
+        Batch without detections (already tracked)
+
+        Returns:
+            DetectionBatch: Empty batch
+        """
+        batch = cls(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int32))
+        batch.track_ids = np.zeros(0, dtype=np.int64)
+        batch.is_new = np.zeros(0, dtype=bool)
+        return batch
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Split an (N, 6) x1, y1, x2, y2, confidence, class_id array
+
+        Args:
+            results (numpy.ndarray): Backend output of one frame
+
+        Returns:
+            DetectionBatch: Batch
+        """
+        results = np.asarray(results, dtype=np.float32).reshape(-1, 6)
+        return cls(np.ascontiguousarray(results[:, :4]), np.ascontiguousarray(results[:, 4]),
+                   results[:, 5].astype(np.int32))
+
+    @classmethod
+    def from_lists(cls, boxes, scores, class_ids):
+        """
+        Batch from (boxes, scores, class_ids) sequences
+
+        Returns:
+            DetectionBatch: Batch
+        """
+        return cls(np.asarray(boxes, dtype=np.float32).reshape(-1, 4), np.asarray(scores, dtype=np.float32),
+                   np.asarray(class_ids, dtype=np.int32))
+
+    def share(self):
+        """
+        New batch over the same arrays with its own tracking results
+        (a frame that reuses the detections of a previous frame)
+
+        Returns:
+            DetectionBatch: Batch
+        """
+        batch = DetectionBatch(self.boxes, self.scores, self.class_ids)
+        batch.reused = True
+        batch._centers = self._centers
+        return batch
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __iter__(self):
+        # Unpacks like the old (boxes, scores, class_ids) tuple
+        return iter((self.boxes, self.scores, self.class_ids))
+
+    def centers(self):
+        """
+        Integer box centers, computed once
+
+        Returns:
+            numpy.ndarray: (N, 2) int32 centers
+        """
+        if self._centers is None:
+            self._centers = ((self.boxes[:, :2] + self.boxes[:, 2:]) / 2).astype(np.int32)
+        return self._centers
+
+    def int_boxes(self):
+        """
+        Boxes rounded down to pixels for drawing
+
+        Returns:
+            numpy.ndarray: (N, 4) int32 boxes
+        """
+        return self.boxes.astype(np.int32)
@@ -0,0 +1,509 @@
+import argparse
+import ast
+import glob
+import os
+
+import cv2
+import numpy as np
+
+LETTERBOX_COLOR = 114
+
+
+class DetectorBackend:
+    """
+    Inference backend of VehicleDetector.
+    predict() returns one float32 array of shape (N, 6) per image:
+    x1, y1, x2, y2, confidence, class_id in image pixel coordinates.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.names = {}
+
+    def predict(self, images, imgsz=None, classes=None, conf=0.25, iou=0.7, max_det=300):
+        """
+        Detect objects in a list of images
+
+        Args:
+            images (list): BGR images (numpy.ndarray)
+            imgsz (int): Model input size (None = backend default)
+            classes (collection): Class IDs to keep (None = all)
+            conf (float): Minimum confidence
+            iou (float): NMS IoU threshold
+            max_det (int): Maximum detections per image
+
+        Returns:
+            list: (N, 6) float32 array per image
+        """
+        raise NotImplementedError
+
+
+class UltralyticsBackend(DetectorBackend):
+    """
+    Eager PyTorch model through ultralytics.YOLO
+    """
+
+    name = "ultralytics"
+
+    def __init__(self, model_path, device="cpu"):
+        super().__init__()
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+        self.device = device
+        self.names = self.model.names
+
+    def predict(self, images, imgsz=None, classes=None, conf=0.25, iou=0.7, max_det=300):
+        kwargs = {"classes": list(classes) if classes is not None else None,
+                  "conf": conf, "iou": iou, "max_det": max_det}
+        if imgsz is not None:
+            kwargs["imgsz"] = imgsz
+
+        results = self.model(list(images), **kwargs)
+
+        return [self._to_array(result) for result in results]
+
+    @staticmethod
+    def _to_array(result):
+        data = result.boxes.data
+        if hasattr(data, "cpu"):
+            data = data.cpu().numpy()
+        return np.asarray(data, dtype=np.float32).reshape(-1, 6)
+
+
+def letterbox_batch(images, size):
+    """
+    Resize images keeping the aspect ratio, pad them to the model input size
+    and pack them into one NCHW float32 RGB blob (0..1)
+
+    Args:
+        images (list): BGR images
+        size (tuple): Model input (height, width)
+
+    Returns:
+        tuple: (blob, [(scale, pad_x, pad_y), ...])
+    """
+    height, width = size
+    canvases = []
+    transforms = []
+
+    for image in images:
+        image_height, image_width = image.shape[:2]
+        scale = min(height / image_height, width / image_width)
+        new_width = int(round(image_width * scale))
+        new_height = int(round(image_height * scale))
+        pad_x = (width - new_width) // 2
+        pad_y = (height - new_height) // 2
+
+        canvas = np.full((height, width, 3), LETTERBOX_COLOR, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = cv2.resize(
+            image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+        canvases.append(canvas)
+        transforms.append((scale, pad_x, pad_y))
+
+    blob = cv2.dnn.blobFromImages(canvases, scalefactor=1.0 / 255, swapRB=True)
+    return blob, transforms
+
+
+def parse_names(names):
+    """
+    Class names stored in exported model metadata
+
+    Args:
+        names: dict, or its string form as written by the ultralytics exporter
+
+    Returns:
+        dict: {class_id: name}
+    """
+    if not names:
+        return {}
+    if isinstance(names, str):
+        names = ast.literal_eval(names)
+    if isinstance(names, (list, tuple)):
+        names = dict(enumerate(names))
+    return {int(class_id): name for class_id, name in names.items()}
+
+
+class ExportedGraphBackend(DetectorBackend):
+    """
+    Shared pre/post-processing of YOLOv8 graphs exported without NMS:
+    input (B, 3, H, W) RGB 0..1, output (B, 4 + classes, anchors) with xywh boxes
+    """
+
+    def __init__(self, imgsz=640):
+        """
+        Args:
+            imgsz (int): Input size for graphs with a dynamic input shape
+        """
+        super().__init__()
+        self.imgsz = imgsz
+        self.static_batch = None  # Batch size of graphs exported with a fixed batch
+        self.static_size = None  # (height, width) of graphs exported with a fixed input size
+
+    def _set_input_shape(self, shape):
+        """
+        Read fixed dimensions of the graph input (None or names for dynamic ones)
+
+        Args:
+            shape (list): Input shape (batch, 3, height, width)
+        """
+        batch, _, height, width = shape
+        self.static_batch = batch if isinstance(batch, int) and batch > 0 else None
+        if isinstance(height, int) and isinstance(width, int) and height > 0 and width > 0:
+            self.static_size = (height, width)
+
+    def input_size(self, imgsz=None):
+        if self.static_size is not None:
+            return self.static_size
+
+        size = int(np.ceil((imgsz or self.imgsz) / 32) * 32)
+        return size, size
+
+    def _run(self, blob):
+        """
+        Run the graph
+
+        Args:
+            blob (numpy.ndarray): (B, 3, H, W) float32 input
+
+        Returns:
+            numpy.ndarray: (B, 4 + classes, anchors) output
+        """
+        raise NotImplementedError
+
+    def _run_batches(self, blob):
+        if self.static_batch is None or len(blob) == self.static_batch:
+            return self._run(blob)
+
+        outputs = []
+        for start in range(0, len(blob), self.static_batch):
+            chunk = blob[start:start + self.static_batch]
+            count = len(chunk)
+            if count < self.static_batch:
+                padding = np.zeros((self.static_batch - count,) + chunk.shape[1:], dtype=chunk.dtype)
+                chunk = np.concatenate([chunk, padding])
+            outputs.append(self._run(chunk)[:count])
+
+        return np.concatenate(outputs)
+
+    def predict(self, images, imgsz=None, classes=None, conf=0.25, iou=0.7, max_det=300):
+        if len(images) == 0:
+            return []
+
+        blob, transforms = letterbox_batch(images, self.input_size(imgsz))
+        output = self._run_batches(blob)
+        classes = np.asarray(classes, dtype=np.int64) if classes is not None else None
+
+        return [self._postprocess(prediction, transform, image.shape, classes, conf, iou, max_det)
+                for prediction, transform, image in zip(output, transforms, images)]
+
+    @staticmethod
+    def _postprocess(prediction, transform, image_shape, classes, conf, iou, max_det):
+        """
+        Confidence and class filter, class-aware NMS and mapping back to image coordinates
+        (same order as the ultralytics NMS: best class first, then the class filter)
+
+        Args:
+            prediction (numpy.ndarray): (4 + classes, anchors) output of one image
+            transform (tuple): (scale, pad_x, pad_y) from letterbox_batch
+            image_shape (tuple): Original image shape
+            classes (numpy.ndarray): Class IDs to keep (None = all)
+            conf (float): Minimum confidence
+            iou (float): NMS IoU threshold
+            max_det (int): Maximum detections
+
+        Returns:
+            numpy.ndarray: (N, 6) float32 detections
+        """
+        prediction = prediction.T
+        class_scores = prediction[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+
+        keep = scores >= conf
+        if classes is not None:
+            keep &= np.isin(class_ids, classes)
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+
+        xywh = prediction[keep, :4]
+        scores = scores[keep]
+        class_ids = class_ids[keep]
+
+        # cv2 NMS takes top-left x, y, w, h
+        rects = xywh.copy()
+        rects[:, :2] -= rects[:, 2:] / 2
+        indices = cv2.dnn.NMSBoxesBatched(rects.tolist(), scores.tolist(), class_ids.tolist(), conf, iou)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:max_det]
+
+        scale, pad_x, pad_y = transform
+        height, width = image_shape[:2]
+
+        boxes = np.empty((len(indices), 4), dtype=np.float32)
+        boxes[:, :2] = rects[indices, :2]
+        boxes[:, 2:] = rects[indices, :2] + rects[indices, 2:]
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / scale).clip(0, width)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / scale).clip(0, height)
+
+        return np.column_stack([boxes, scores[indices], class_ids[indices]]).astype(np.float32)
+
+
+class OnnxRuntimeBackend(ExportedGraphBackend):
+    """
+    ONNX graph on the ONNX Runtime CPU provider (FP32 or INT8 quantized)
+    """
+
+    name = "onnxruntime"
+
+    def __init__(self, model_path, threads=None, **kwargs):
+        """
+        Args:
+            model_path (str): .onnx file (from export_model or quantize_onnx)
+            threads (int): Intra-op threads (None = all cores)
+        """
+        super().__init__(**kwargs)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnxruntime backend needs `pip install onnxruntime`") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        graph_input = self.session.get_inputs()[0]
+        self.input_name = graph_input.name
+        self._set_input_shape(graph_input.shape)
+        self.names = parse_names(self.session.get_modelmeta().custom_metadata_map.get("names"))
+
+    def _run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(ExportedGraphBackend):
+    """
+    OpenVINO IR on the CPU plugin (FP32, FP16 or INT8 IR)
+    """
+
+    name = "openvino"
+
+    def __init__(self, model_path, threads=None, **kwargs):
+        """
+        Args:
+            model_path (str): .xml file or the *_openvino_model directory written by export_model
+            threads (int): Inference threads (None = all cores)
+        """
+        super().__init__(**kwargs)
+        try:
+            from openvino.runtime import Core
+        except ImportError as e:
+            raise ImportError("The openvino backend needs `pip install openvino`") from e
+
+        model_dir = model_path if os.path.isdir(model_path) else os.path.dirname(model_path)
+        if os.path.isdir(model_path):
+            model_path = sorted(glob.glob(os.path.join(model_path, "*.xml")))[0]
+
+        core = Core()
+        model = core.read_model(model_path)
+
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = str(threads)
+
+        shape = model.input(0).get_partial_shape()
+        self._set_input_shape([None if dim.is_dynamic else dim.get_length() for dim in shape])
+
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.request = self.compiled.create_infer_request()
+        self.output = self.compiled.output(0)
+        self.names = self._read_names(model_dir)
+
+    @staticmethod
+    def _read_names(model_dir):
+        metadata_path = os.path.join(model_dir, "metadata.yaml")
+        if not os.path.exists(metadata_path):
+            return {}
+
+        import yaml
+        with open(metadata_path, encoding="utf-8") as f:
+            return parse_names((yaml.safe_load(f) or {}).get("names"))
+
+    def _run(self, blob):
+        return self.request.infer({0: blob})[self.output]
+
+
+BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenVinoBackend.name: OpenVinoBackend,
+}
+
+
+def create_backend(backend, model_path, device="cpu", threads=None, imgsz=640):
+    """
+    Create an inference backend by name
+
+    Args:
+        backend (str): "ultralytics", "onnxruntime" or "openvino"
+        model_path (str): Model file (.pt for ultralytics, .onnx, OpenVINO .xml or directory)
+        device (str): Torch device (ultralytics only)
+        threads (int): CPU threads (exported-graph backends only)
+        imgsz (int): Input size of dynamic-shape exported graphs
+
+    Returns:
+        DetectorBackend: Backend
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of {sorted(BACKENDS)}")
+
+    if backend == UltralyticsBackend.name:
+        return UltralyticsBackend(model_path, device)
+
+    return BACKENDS[backend](model_path, threads=threads, imgsz=imgsz)
+
+
+class _CalibrationReader:
+    """
+    onnxruntime CalibrationDataReader over letterboxed frames
+    """
+
+    def __init__(self, input_name, frames, size):
+        self.input_name = input_name
+        self.frames = iter(frames)
+        self.size = size
+
+    def get_next(self):
+        frame = next(self.frames, None)
+        if frame is None:
+            return None
+        return {self.input_name: letterbox_batch([frame], self.size)[0]}
+
+    def rewind(self):
+        pass
+
+
+def read_calibration_frames(video_path, count=100):
+    """
+    Frames spread evenly over a video, for INT8 calibration
+
+    Args:
+        video_path (str): Video file
+        count (int): Number of frames
+
+    Returns:
+        list: BGR frames
+    """
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or count
+    step = max(1, total // count)
+    frames = []
+
+    for index in range(0, total, step):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+        if len(frames) >= count:
+            break
+
+    cap.release()
+    return frames
+
+
+def quantize_onnx(model_path, calibration_frames, output_path=None, imgsz=640):
+    """
+    Static INT8 (QDQ) quantization of an exported ONNX model, calibrated on
+    frames of the target camera
+
+    Args:
+        model_path (str): FP32 .onnx file
+        calibration_frames (list): BGR frames representative of the scene
+        output_path (str): Output file (default: <model>_int8.onnx)
+        imgsz (int): Input size if the graph has a dynamic shape
+
+    Returns:
+        str: Path of the INT8 model
+    """
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    output_path = output_path or os.path.splitext(model_path)[0] + "_int8.onnx"
+
+    graph_input = onnx.load(model_path).graph.input[0]
+    dims = [dim.dim_value for dim in graph_input.type.tensor_type.shape.dim]
+    size = (dims[2], dims[3]) if dims[2] > 0 and dims[3] > 0 else (imgsz, imgsz)
+
+    quantize_static(
+        model_path, output_path,
+        _CalibrationReader(graph_input.name, calibration_frames, size),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+
+    return output_path
+
+
+def export_model(model_path, backend, imgsz=640, int8=False, calibration_video=None):
+    """
+    Export a YOLOv8 .pt model for an exported-graph backend
+
+    Args:
+        model_path (str): .pt model
+        backend (str): "onnxruntime" or "openvino"
+        imgsz (int): Fixed input size of the exported graph
+        int8 (bool): Quantize to INT8
+        calibration_video (str): Video used for ONNX INT8 calibration
+
+    Returns:
+        str: Path to pass as model_path with the backend
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+
+    if backend == OnnxRuntimeBackend.name:
+        path = model.export(format="onnx", imgsz=imgsz, simplify=True)
+        if int8:
+            if calibration_video is None:
+                raise ValueError("ONNX INT8 quantization needs a calibration video")
+            path = quantize_onnx(path, read_calibration_frames(calibration_video), imgsz=imgsz)
+        return path
+
+    if backend == OpenVinoBackend.name:
+        # INT8 IR is produced by the ultralytics exporter through NNCF
+        return model.export(format="openvino", imgsz=imgsz, int8=int8)
+
+    raise ValueError(f"Backend '{backend}' does not use an exported model")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a YOLOv8 model for the ONNX Runtime or OpenVINO backend")
+
+    parser.add_argument("--model", "-m", type=str, default="yolov8s.pt",
+                        help="YOLO .pt model path")
+    parser.add_argument("--backend", type=str, choices=[OnnxRuntimeBackend.name, OpenVinoBackend.name],
+                        default=OnnxRuntimeBackend.name, help="Target backend")
+    parser.add_argument("--imgsz", type=int, default=640,
+                        help="Input size of the exported graph")
+    parser.add_argument("--int8", action="store_true",
+                        help="Quantize to INT8")
+    parser.add_argument("--calibration-video", type=str, default=None,
+                        help="Video of the target camera for INT8 calibration (ONNX)")
+
+    args = parser.parse_args()
+
+    path = export_model(args.model, args.backend, args.imgsz, args.int8, args.calibration_video)
+    print(f"Exported model: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import os
+import glob
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+# Record kinds
+EVENT_ZONE_SAMPLE = 1  # Periodic zone state: value = display count, occupancy = vehicles in zone
+EVENT_CROSSING = 2     # Vehicle counted in a COUNT zone: value = vehicle ID
+
+# Record flags
+FLAG_STALLED = 1
+
+# Fixed-width little-endian record (26 bytes)
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("value", "<u8"),
+    ("frame", "<u4"),
+    ("zone_id", "<u2"),
+    ("occupancy", "<u2"),
+    ("kind", "u1"),
+    ("flags", "u1"),
+])
+
+# Segment header: magic + record size + reserved
+SEGMENT_MAGIC = b"TBEVLOG1"
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("record_size", "<u4"), ("reserved", "<u4")])
+HEADER_SIZE = HEADER_DTYPE.itemsize
+
+SEGMENT_PATTERN = "events_*.bin"
+
+
+class EventLogWriter:
+    """
+    Append-only, segment-rotated log of zone samples and crossing events
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, fsync_interval=5.0, flush_records=1024):
+        """
+        Open event log for writing
+
+        Args:
+            directory (str): Directory of the segment files
+            segment_bytes (int): Start a new segment when the current one reaches this size
+            fsync_interval (float): Seconds between two fsync calls; buffered records are written at least this often
+            flush_records (int): Write pending records early once this many are buffered
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.flush_records = flush_records
+
+        self.pending = []
+        self.lock = threading.Lock()
+        self.file = None
+        self.segment_path = None
+        self.segment_size = 0
+        self.segment_index = 0
+        self.last_fsync = time.time()
+        self.records_written = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self, timestamp):
+        """
+        Start a new segment file
+
+        Args:
+            timestamp (float): Timestamp of the first record
+        """
+        self._close_segment()
+
+        timestamp_str = datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H%M%S")
+        self.segment_path = os.path.join(self.directory, f"events_{timestamp_str}_{self.segment_index:04d}.bin")
+        self.segment_index += 1
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = SEGMENT_MAGIC
+        header["record_size"] = RECORD_DTYPE.itemsize
+
+        self.file = open(self.segment_path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(header.tobytes())
+        self.segment_size = self.file.tell()
+
+    def _close_segment(self):
+        """
+        Sync and close the current segment file
+        """
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+
+    def append(self, kind, timestamp, zone_id=0, value=0, frame=0, occupancy=0, flags=0):
+        """
+        Buffer one record (written on the next flush)
+
+        Args:
+            kind (int): EVENT_ZONE_SAMPLE or EVENT_CROSSING
+            timestamp (float): Event time
+            zone_id (int): Zone ID
+            value (int): Count or vehicle ID
+            frame (int): Frame number
+            occupancy (int): Vehicles in zone
+            flags (int): FLAG_* bits
+        """
+        with self.lock:
+            self.pending.append((timestamp, value, frame, zone_id, min(occupancy, 0xFFFF), kind, flags))
+
+    def log_zone_sample(self, timestamp, frame, zone):
+        """
+        Buffer the current state of a zone
+
+        Args:
+            timestamp (float): Sample time
+            frame (int): Frame number
+            zone (Zone): Zone
+        """
+        self.append(
+            EVENT_ZONE_SAMPLE, timestamp,
+            zone_id=zone.id,
+            value=zone.get_display_count(),
+            frame=frame,
+            occupancy=len(zone.current_vehicles),
+            flags=FLAG_STALLED if zone.is_stalled else 0
+        )
+
+    def log_crossing(self, timestamp, frame, zone_id, vehicle_id):
+        """
+        Buffer a counted zone entry
+
+        Args:
+            timestamp (float): Event time
+            frame (int): Frame number
+            zone_id (int): Zone ID
+            vehicle_id (int): Vehicle ID
+        """
+        self.append(EVENT_CROSSING, timestamp, zone_id=zone_id, value=vehicle_id, frame=frame)
+
+    def flush(self, force=False):
+        """
+        Write buffered records. Records are written once flush_records are
+        buffered or fsync_interval seconds have passed since the last fsync, and
+        are then fsynced, so at most about fsync_interval seconds of events are
+        only in memory.
+
+        Args:
+            force (bool): Write and fsync regardless of the batch thresholds
+        """
+        now = time.time()
+        sync_due = force or now - self.last_fsync >= self.fsync_interval
+
+        with self.lock:
+            if not self.pending or (not sync_due and len(self.pending) < self.flush_records):
+                pending = None
+            else:
+                pending = self.pending
+                self.pending = []
+
+        if pending:
+            records = np.array(pending, dtype=RECORD_DTYPE)
+
+            if self.file is None or self.segment_size + records.nbytes > self.segment_bytes:
+                self._open_segment(float(records["timestamp"][0]))
+
+            self.file.write(records.tobytes())
+            self.segment_size += records.nbytes
+            self.records_written += len(records)
+
+        if sync_due:
+            if self.file is not None:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            self.last_fsync = now
+
+    def close(self):
+        """
+        Write everything and close the log
+        """
+        self.flush(force=True)
+        self._close_segment()
+
+
+class EventLogReader:
+    """
+    Range queries over event log segments through memory maps
+    """
+
+    def __init__(self, directory):
+        """
+        Open event log for reading
+
+        Args:
+            directory (str): Directory of the segment files
+        """
+        self.directory = directory
+
+    def segments(self):
+        """
+        Segment files in write order
+
+        Returns:
+            list: Segment paths
+        """
+        return sorted(glob.glob(os.path.join(self.directory, SEGMENT_PATTERN)))
+
+    @staticmethod
+    def open_segment(path):
+        """
+        Memory-map a segment
+
+        Args:
+            path (str): Segment path
+
+        Returns:
+            numpy.ndarray: Read-only structured array of RECORD_DTYPE (empty if the segment has no records)
+        """
+        size = os.path.getsize(path)
+        if size < HEADER_SIZE:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)[0]
+        if header["magic"] != SEGMENT_MAGIC or header["record_size"] != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Not an event log segment: {path}")
+
+        # A partially written last record is ignored
+        count = (size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+
+        return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+    def query(self, start=None, end=None, kind=None, zone_id=None):
+        """
+        Get records in a time range
+
+        Args:
+            start (float): Start timestamp (inclusive, None = from the beginning)
+            end (float): End timestamp (exclusive, None = until the end)
+            kind (int): Only this record kind
+            zone_id (int): Only this zone
+
+        Returns:
+            numpy.ndarray: Structured array of RECORD_DTYPE
+        """
+        parts = []
+
+        for path in self.segments():
+            records = self.open_segment(path)
+            if len(records) == 0:
+                continue
+
+            # Records of a segment are in time order: skip segments outside the range
+            if start is not None and records["timestamp"][-1] < start:
+                continue
+            if end is not None and records["timestamp"][0] >= end:
+                continue
+
+            timestamps = records["timestamp"]
+            lo = np.searchsorted(timestamps, start, side="left") if start is not None else 0
+            hi = np.searchsorted(timestamps, end, side="left") if end is not None else len(records)
+            selected = records[lo:hi]
+
+            if kind is not None:
+                selected = selected[selected["kind"] == kind]
+            if zone_id is not None:
+                selected = selected[selected["zone_id"] == zone_id]
+
+            parts.append(np.array(selected))
+
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+
+        return np.concatenate(parts)
+
+    def zone_counts(self, zone_id, start=None, end=None):
+        """
+        Zone sample series of one zone
+
+        Args:
+            zone_id (int): Zone ID
+            start (float): Start timestamp
+            end (float): End timestamp
+
+        Returns:
+            tuple: (timestamps, counts, occupancy, stalled) arrays
+        """
+        records = self.query(start, end, kind=EVENT_ZONE_SAMPLE, zone_id=zone_id)
+
+        return (
+            records["timestamp"],
+            records["value"],
+            records["occupancy"],
+            (records["flags"] & FLAG_STALLED) != 0
+        )
+
+    def crossings(self, start=None, end=None, zone_id=None):
+        """
+        Counted zone entries
+
+        Args:
+            start (float): Start timestamp
+            end (float): End timestamp
+            zone_id (int): Only this zone
+
+        Returns:
+            numpy.ndarray: Structured array of EVENT_CROSSING records
+        """
+        return self.query(start, end, kind=EVENT_CROSSING, zone_id=zone_id)
@@ -0,0 +1,196 @@
+import asyncio
+import threading
+
+import cv2
+
+
+# Encoded variants: name -> (max width or None for full size, JPEG quality)
+FRAME_VARIANTS = {
+    "full": (None, 80),
+    "full_low": (None, 50),
+    "medium": (960, 70),
+    "preview": (480, 60),
+}
+
+MJPEG_BOUNDARY = "frame"
+
+
+class EncodedFrameBuffer:
+    """
+    Latest annotated frame with a sequence number. Each variant is
+    JPEG-encoded at most once per frame and shared by every consumer.
+    """
+
+    def __init__(self, variants=None):
+        """
+        Create buffer
+
+        Args:
+            variants (dict): Encoded variants {name: (max_width, quality)} (FRAME_VARIANTS if None)
+        """
+        self.variants = dict(variants or FRAME_VARIANTS)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.frame = None
+        self.metadata = None
+        self.encoded = {}
+        self.encode_count = 0
+        self.viewers = 0
+
+    def publish(self, frame, metadata=None):
+        """
+        Store a new frame. Only the reference is kept; encoding happens on the first read.
+
+        Args:
+            frame (numpy.ndarray): Annotated BGR frame (must not be modified afterwards)
+            metadata (dict): Data sent together with the frame
+        """
+        with self.lock:
+            self.seq += 1
+            self.frame = frame
+            self.metadata = metadata
+            self.encoded = {}
+
+    def clear(self):
+        """
+        Drop the stored frame (sequence numbers keep increasing)
+        """
+        with self.lock:
+            self.frame = None
+            self.metadata = None
+            self.encoded = {}
+
+    def _encode(self, frame, variant):
+        """
+        JPEG-encode one variant
+
+        Args:
+            frame (numpy.ndarray): BGR frame
+            variant (str): Variant name
+
+        Returns:
+            bytes: JPEG data
+        """
+        max_width, quality = self.variants[variant]
+
+        if max_width is not None and frame.shape[1] > max_width:
+            height = max(1, int(round(frame.shape[0] * max_width / frame.shape[1])))
+            frame = cv2.resize(frame, (max_width, height), interpolation=cv2.INTER_AREA)
+
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+
+        return buffer.tobytes()
+
+    def get(self, variant="full", after_seq=0):
+        """
+        Get the encoded latest frame
+
+        Args:
+            variant (str): Variant name
+            after_seq (int): Return None unless the frame is newer than this sequence number
+
+        Returns:
+            tuple: (seq, jpeg bytes, metadata), or None if there is no newer frame
+        """
+        if variant not in self.variants:
+            raise KeyError(f"Unknown frame variant: {variant}")
+
+        with self.lock:
+            if self.frame is None or self.seq <= after_seq:
+                return None
+
+            seq, frame, metadata = self.seq, self.frame, self.metadata
+            data = self.encoded.get(variant)
+
+        if data is None:
+            # Encode outside the lock so publish() never waits for JPEG encoding
+            data = self._encode(frame, variant)
+
+            with self.lock:
+                if self.seq == seq:
+                    cached = self.encoded.setdefault(variant, data)
+                    if cached is data:
+                        self.encode_count += 1
+                    data = cached
+
+        return seq, data, metadata
+
+    def select_variant(self, width=None, quality=None):
+        """
+        Map a requested size and quality onto the closest fixed variant
+
+        Args:
+            width (int): Wanted frame width (None = full size)
+            quality (int): Wanted JPEG quality 1~100 (None = best available)
+
+        Returns:
+            str: Variant name
+        """
+        def variant_width(name):
+            max_width = self.variants[name][0]
+            return float("inf") if max_width is None else max_width
+
+        # Smallest variant that is at least as wide as requested
+        wanted = float("inf") if width is None else width
+        large_enough = [name for name in self.variants if variant_width(name) >= wanted]
+        if not large_enough:
+            large_enough = [max(self.variants, key=variant_width)]
+        smallest = min(variant_width(name) for name in large_enough)
+        candidates = [name for name in large_enough if variant_width(name) == smallest]
+
+        if quality is None:
+            return max(candidates, key=lambda name: self.variants[name][1])
+        return min(candidates, key=lambda name: abs(self.variants[name][1] - quality))
+
+    def get_stats(self):
+        """
+        Get buffer statistics
+
+        Returns:
+            dict: Latest sequence number, encode count, viewers and encoded variant sizes
+        """
+        with self.lock:
+            return {
+                "seq": self.seq,
+                "encode_count": self.encode_count,
+                "viewers": self.viewers,
+                "encoded_sizes": {name: len(data) for name, data in self.encoded.items()}
+            }
+
+
+async def mjpeg_stream(buffer, variant="full", fps=10, is_active=None):
+    """
+    multipart/x-mixed-replace body with the newest frame of a buffer.
+    Frames are taken from the shared encoded cache, so viewers add no encoding cost.
+
+    Args:
+        buffer (EncodedFrameBuffer): Frame buffer
+        variant (str): Variant name
+        fps (float): Maximum frames per second sent to this viewer
+        is_active (callable): Stream ends when this returns False
+
+    Yields:
+        bytes: One multipart part per frame
+    """
+    interval = 1.0 / max(0.1, fps)
+    last_seq = 0
+    loop = asyncio.get_running_loop()
+
+    buffer.viewers += 1
+    try:
+        while is_active is None or is_active():
+            latest = await loop.run_in_executor(None, buffer.get, variant, last_seq)
+
+            if latest is not None:
+                last_seq, image, _ = latest
+                yield (
+                    f"--{MJPEG_BOUNDARY}\r\n"
+                    f"Content-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(image)}\r\n\r\n"
+                ).encode("ascii") + image + b"\r\n"
+
+            await asyncio.sleep(interval)
+    finally:
+        buffer.viewers -= 1
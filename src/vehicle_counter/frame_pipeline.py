@@ -0,0 +1,220 @@
+import queue
+import threading
+import time
+
+
+class PipelineStage:
+    """
+    One worker thread of the frame pipeline
+    """
+
+    # Latency smoothing factor (exponential moving average)
+    LATENCY_ALPHA = 0.1
+
+    def __init__(self, name, handler, input_queue=None, output_queue=None):
+        """
+        Create pipeline stage
+
+        Args:
+            name (str): Stage name
+            handler (callable): Called with each input item (no argument for the source stage).
+                                Returns the item for the next stage, or None to drop it.
+                                A source stage returns None when the stream has ended.
+            input_queue (queue.Queue): Queue to read items from (None for the source stage)
+            output_queue (queue.Queue): Queue to write results to (None for the last stage)
+        """
+        self.name = name
+        self.handler = handler
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.pipeline = None
+        self.thread = None
+
+        self.processed = 0
+        self.latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    def _put(self, item):
+        """
+        Put an item to the output queue, waiting while the queue is full
+
+        Args:
+            item: Item for the next stage
+
+        Returns:
+            bool: False if the pipeline was stopped while waiting
+        """
+        while not self.pipeline.stop_event.is_set():
+            try:
+                self.output_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self):
+        """
+        Get the next item from the input queue
+
+        Returns:
+            item, or FramePipeline.END when the stream has ended or the pipeline was stopped
+        """
+        while not self.pipeline.stop_event.is_set():
+            try:
+                return self.input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return FramePipeline.END
+
+    def _record_latency(self, started):
+        """
+        Update latency statistics
+
+        Args:
+            started (float): perf_counter value before the handler was called
+        """
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+        if self.processed == 0:
+            self.latency_ms = elapsed_ms
+        else:
+            self.latency_ms += self.LATENCY_ALPHA * (elapsed_ms - self.latency_ms)
+
+        self.max_latency_ms = max(self.max_latency_ms, elapsed_ms)
+        self.processed += 1
+
+    def run(self):
+        """
+        Stage thread main loop
+        """
+        try:
+            while not self.pipeline.stop_event.is_set():
+                if self.input_queue is None:
+                    started = time.perf_counter()
+                    result = self.handler()
+                    if result is None:
+                        break
+                else:
+                    item = self._get()
+                    if item is FramePipeline.END:
+                        break
+
+                    started = time.perf_counter()
+                    result = self.handler(item)
+
+                self._record_latency(started)
+
+                if result is not None and self.output_queue is not None:
+                    if not self._put(result):
+                        break
+        except Exception as e:
+            print(f"Pipeline stage '{self.name}' stopped with error: {e}")
+            self.pipeline.stop()
+        finally:
+            if self.output_queue is not None:
+                # Signal end of stream to the next stage
+                self._put(FramePipeline.END)
+
+    def get_stats(self):
+        """
+        Get stage statistics
+
+        Returns:
+            dict: Queue depth and latency information
+        """
+        return {
+            "queue_depth": self.input_queue.qsize() if self.input_queue is not None else 0,
+            "queue_size": self.input_queue.maxsize if self.input_queue is not None else 0,
+            "processed": self.processed,
+            "latency_ms": round(self.latency_ms, 2),
+            "max_latency_ms": round(self.max_latency_ms, 2)
+        }
+
+
+class FramePipeline:
+    """
+    Chain of stages connected by bounded queues, each running in its own thread
+    """
+
+    # End of stream marker
+    END = object()
+
+    def __init__(self, queue_size=4):
+        """
+        Create pipeline
+
+        Args:
+            queue_size (int): Maximum number of items waiting between two stages
+        """
+        self.queue_size = max(1, int(queue_size))
+        self.stages = []
+        self.stop_event = threading.Event()
+
+    def add_stage(self, name, handler):
+        """
+        Append a stage. The first stage added is the source stage.
+
+        Args:
+            name (str): Stage name
+            handler (callable): Stage handler (see PipelineStage)
+
+        Returns:
+            PipelineStage: Created stage
+        """
+        input_queue = None
+
+        if self.stages:
+            input_queue = queue.Queue(maxsize=self.queue_size)
+            self.stages[-1].output_queue = input_queue
+
+        stage = PipelineStage(name, handler, input_queue=input_queue)
+        stage.pipeline = self
+        self.stages.append(stage)
+
+        return stage
+
+    def start(self):
+        """
+        Start all stage threads
+        """
+        self.stop_event.clear()
+
+        for stage in self.stages:
+            stage.thread = threading.Thread(target=stage.run, name=f"pipeline-{stage.name}")
+            stage.thread.daemon = True
+            stage.thread.start()
+
+    def stop(self):
+        """
+        Ask all stages to stop
+        """
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        """
+        Wait for all stage threads to finish
+
+        Args:
+            timeout (float): Timeout per stage (seconds)
+        """
+        for stage in self.stages:
+            if stage.thread is not None:
+                stage.thread.join(timeout)
+
+    def is_running(self):
+        """
+        Check whether any stage is still running
+
+        Returns:
+            bool: True while a stage thread is alive
+        """
+        return any(stage.thread is not None and stage.thread.is_alive() for stage in self.stages)
+
+    def get_stats(self):
+        """
+        Get statistics of all stages
+
+        Returns:
+            dict: {stage_name: stage statistics}
+        """
+        return {stage.name: stage.get_stats() for stage in self.stages}
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+
+
+class RollingLatency:
+    """
+    Last `window` durations of one stage in a ring buffer
+    """
+
+    def __init__(self, window=1024):
+        """
+        Create buffer
+
+        Args:
+            window (int): Number of samples kept
+        """
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.window = window
+        self.index = 0
+        self.count = 0
+        self.total_count = 0
+        self.last = 0.0
+
+    def add(self, seconds):
+        """
+        Add one duration
+
+        Args:
+            seconds (float): Duration (seconds)
+        """
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        self.total_count += 1
+        self.last = seconds
+
+    def get_stats(self):
+        """
+        Percentiles of the kept samples
+
+        Returns:
+            dict: count, last, mean, p50, p95, p99 and max in milliseconds
+        """
+        values = self.samples[:self.count].copy() * 1000.0
+        if len(values) == 0:
+            return {"count": 0}
+
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+
+        return {
+            "count": self.total_count,
+            "last_ms": round(self.last * 1000.0, 3),
+            "mean_ms": round(float(values.mean()), 3),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(values.max()), 3)
+        }
+
+
+class StageTimer:
+    """
+    Rolling latency percentiles of the processing stages
+    """
+
+    STAGES = ("capture", "inference", "tracking", "zone_update", "light_control",
+              "rendering", "persistence", "frame_interval")
+
+    def __init__(self, window=1024, stages=STAGES):
+        """
+        Create timer
+
+        Args:
+            window (int): Samples kept per stage
+            stages (tuple): Stage names
+        """
+        self.window = window
+        self.stages = {stage: RollingLatency(window) for stage in stages}
+
+    def record(self, stage, seconds, count=1):
+        """
+        Record a stage duration
+
+        Args:
+            stage (str): Stage name
+            seconds (float): Duration (seconds)
+            count (int): Frames handled in this duration (batched stages record the per-frame share)
+        """
+        latency = self.stages.get(stage)
+        if latency is None:
+            latency = self.stages[stage] = RollingLatency(self.window)
+
+        per_frame = seconds / count if count > 1 else seconds
+        for _ in range(max(1, count)):
+            latency.add(per_frame)
+
+    def since(self, stage, start, count=1):
+        """
+        Record the time elapsed since a perf_counter() value
+
+        Args:
+            stage (str): Stage name
+            start (float): time.perf_counter() at the stage start
+            count (int): Frames handled
+
+        Returns:
+            float: time.perf_counter() now (start of the next stage)
+        """
+        now = time.perf_counter()
+        self.record(stage, now - start, count)
+        return now
+
+    def reset(self):
+        """
+        Drop all samples
+        """
+        self.stages = {stage: RollingLatency(self.window) for stage in self.stages}
+
+    def get_stats(self):
+        """
+        Get statistics of all stages
+
+        Returns:
+            dict: {stage: statistics}
+        """
+        return {stage: latency.get_stats() for stage, latency in list(self.stages.items())}
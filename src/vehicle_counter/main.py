@@ -10,11 +10,7 @@ def main():
     parser = argparse.ArgumentParser(description="Vehicle Counting System")
     
     parser.add_argument("--video", "-v", type=str, default="viiddeo.mov",
-<<<<<<< HEAD
-                        help="Видео файлын зам (заагаагүй бол камер ашиглана)")
-=======
                         help="Video file path (uses camera if not specified)")
->>>>>>> 8ef2c1fafc83dbc488307860c9a134352c318dcb
     
     parser.add_argument("--model", "-m", type=str, default="yolov8s.pt",
                        help="YOLO model path")
@@ -25,6 +21,25 @@ def main():
     parser.add_argument("--output", "-o", type=str, default="data",
                        help="Output data path")
     
+    parser.add_argument("--backend", type=str, default="ultralytics",
+                       choices=["ultralytics", "onnxruntime", "openvino"],
+                       help="Detector backend (onnxruntime/openvino take the exported model as --model)")
+    
+    parser.add_argument("--threads", type=int, default=None,
+                       help="CPU threads of the onnxruntime/openvino backends")
+    
+    parser.add_argument("--classes", type=str, nargs="+", default=None,
+                       help="Class names or IDs to detect (default: bicycle car motorcycle bus truck)")
+    
+    parser.add_argument("--conf", type=float, default=0.25,
+                       help="Minimum detection confidence")
+    
+    parser.add_argument("--iou", type=float, default=0.7,
+                       help="NMS IoU threshold")
+    
+    parser.add_argument("--max-det", type=int, default=300,
+                       help="Maximum detections per frame")
+    
     parser.add_argument("--save-video", "-sv", action="store_true", 
                        help="Save processed video")
     
@@ -34,6 +49,21 @@ def main():
     parser.add_argument("--no-display", "-nd", action="store_true",
                       help="Do not display video")
     
+    parser.add_argument("--batch-size", "-b", type=int, default=1,
+                      help="Number of frames per detector forward pass")
+    
+    parser.add_argument("--pipelined", "-p", action="store_true",
+                      help="Run capture, inference, tracking and output in separate threads")
+    
+    parser.add_argument("--motion-gate", "-mg", action="store_true",
+                      help="Skip detection on frames without motion inside the zones")
+    
+    parser.add_argument("--roi", action="store_true",
+                      help="Run detection only on the zone bounding rectangles")
+    
+    parser.add_argument("--offline", action="store_true",
+                      help="Process the video as fast as possible with timing taken from the video timestamps (no display)")
+    
     # Parse arguments
     args = parser.parse_args()
     
@@ -42,14 +72,22 @@ def main():
         video_path=args.video,
         model_path=args.model,
         device=args.device,
-        output_path=args.output
+        output_path=args.output,
+        backend=args.backend,
+        threads=args.threads,
+        detection={"classes": args.classes, "conf": args.conf, "iou": args.iou, "max_det": args.max_det}
     )
     
     # Start counting process
     service.start_counting(
         display=not args.no_display,
         save_data=args.save_data,
-        save_video=args.save_video
+        save_video=args.save_video,
+        batch_size=args.batch_size,
+        pipelined=args.pipelined,
+        motion_gate=args.motion_gate,
+        roi_inference=args.roi,
+        offline=args.offline
     )
 
 if __name__ == "__main__":
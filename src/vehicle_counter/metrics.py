@@ -0,0 +1,249 @@
+import bisect
+import math
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _CounterChild:
+    """
+    One labelled counter. Plain attribute updates: each child has a single
+    writer (the processing thread of its stream), readers only copy the value.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "count")
+
+    def __init__(self, upper_bounds):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * len(upper_bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """
+    Metric family with fixed label names
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """
+        Child for the given label values (keep it to avoid the lookup on hot paths)
+
+        Args:
+            *values: Label values in labelnames order
+
+        Returns:
+            Child metric
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        """
+        Drop a child (e.g. a deleted zone)
+        """
+        self.children.pop(tuple(str(value) for value in values), None)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        """
+        Text exposition of the family
+
+        Returns:
+            list: Lines
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+                for key, child in list(self.children.items())]
+
+
+class Gauge(_Metric):
+    """
+    Gauge set by the owner, or read from a callback at scrape time
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        """
+        Args:
+            callback (callable): Returns {label values tuple: value} when scraped
+        """
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _samples(self):
+        if self.callback is not None:
+            values = self.callback()
+        else:
+            values = {key: child.value for key, child in list(self.children.items())}
+
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets)) + (math.inf,)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def _samples(self):
+        lines = []
+        for key, child in list(self.children.items()):
+            counts = list(child.counts)
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Set of metric families rendered together
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        """
+        Add a metric family (an existing family with the same name is returned instead)
+
+        Args:
+            metric (_Metric): Metric family
+
+        Returns:
+            _Metric: Registered family
+        """
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=Histogram.DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        Prometheus text exposition format (0.0.4)
+
+        Returns:
+            str: Metrics text
+        """
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = MetricsRegistry()
+
+FRAMES_PROCESSED = REGISTRY.counter(
+    "vehicle_counter_frames_processed_total", "Frames tracked", ("stream",))
+FRAMES_DROPPED = REGISTRY.counter(
+    "vehicle_counter_frames_dropped_total", "Frames read or rendered but not delivered", ("stream", "reason"))
+DETECTIONS_SKIPPED = REGISTRY.counter(
+    "vehicle_counter_detections_skipped_total", "Frames that reused the previous detections (motion gate)", ("stream",))
+INFERENCE_SECONDS = REGISTRY.histogram(
+    "vehicle_counter_inference_seconds", "Detector time per frame", ("stream",),
+    buckets=(0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0))
+ZONE_CROSSINGS = REGISTRY.counter(
+    "vehicle_counter_zone_crossings_total", "Vehicles counted entering a COUNT zone", ("stream", "zone_id"))
+STALL_EVENTS = REGISTRY.counter(
+    "vehicle_counter_stall_events_total", "Zone stall (congestion) starts", ("stream", "zone_id"))
+LIGHT_TRANSITIONS = REGISTRY.counter(
+    "vehicle_counter_light_transitions_total", "Traffic light status changes", ("stream", "direction", "status"))
+API_REQUEST_SECONDS = REGISTRY.histogram(
+    "vehicle_counter_api_request_seconds", "API request latency", ("method", "route", "status"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
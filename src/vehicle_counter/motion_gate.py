@@ -0,0 +1,132 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap frame-difference check run before the detector.
+    Detection is skipped when almost nothing changed inside the zones.
+    """
+
+    def __init__(self, threshold=0.002, pixel_threshold=25, scale=0.25, max_skip=50):
+        """
+        Initialize motion gate
+
+        Args:
+            threshold (float): Fraction of zone pixels that must change to run detection
+            pixel_threshold (int): Gray level difference for a pixel to count as changed
+            scale (float): Downscale factor of the compared frames
+            max_skip (int): Run detection at least once every max_skip frames
+        """
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.scale = scale
+        self.max_skip = max_skip
+
+        self.mask = None
+        self.mask_pixels = 0
+        self.reference = None
+        self.skipped_in_row = 0
+
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.last_motion = 0.0
+
+    def set_zones(self, zones, frame_shape):
+        """
+        Build the union mask of all zone polygons
+
+        Args:
+            zones (list): List of zones
+            frame_shape (tuple): Frame shape (height, width, ...)
+        """
+        height = max(1, int(round(frame_shape[0] * self.scale)))
+        width = max(1, int(round(frame_shape[1] * self.scale)))
+
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for zone in zones:
+            points = np.round(np.asarray(zone.points, dtype=np.float64) * self.scale).astype(np.int32)
+            if len(points) >= 3:
+                cv2.fillPoly(mask, [points.reshape(-1, 2)], 1)
+
+        # No zones: watch the whole frame
+        if not mask.any():
+            mask[:] = 1
+
+        self.mask = mask.astype(bool)
+        self.mask_pixels = int(self.mask.sum())
+        self.reference = None
+
+    def _prepare(self, frame):
+        """
+        Downscaled, blurred grayscale frame
+
+        Args:
+            frame (numpy.ndarray): BGR frame
+
+        Returns:
+            numpy.ndarray: Gray frame of the mask size
+        """
+        small = cv2.resize(frame, (self.mask.shape[1], self.mask.shape[0]), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_detect(self, frame):
+        """
+        Decide whether the detector has to run on this frame
+
+        Args:
+            frame (numpy.ndarray): BGR frame
+
+        Returns:
+            bool: True to run detection, False to reuse the previous detections
+        """
+        if self.mask is None:
+            self.set_zones([], frame.shape)
+
+        self.frames_checked += 1
+        gray = self._prepare(frame)
+
+        if self.reference is None:
+            self.reference = gray
+            self.skipped_in_row = 0
+            return True
+
+        changed = cv2.absdiff(gray, self.reference) > self.pixel_threshold
+        self.last_motion = float(np.count_nonzero(changed & self.mask)) / self.mask_pixels
+
+        if self.last_motion >= self.threshold or self.skipped_in_row >= self.max_skip:
+            # Compare the next frames with the last detected one, so slow changes add up
+            self.reference = gray
+            self.skipped_in_row = 0
+            return True
+
+        self.skipped_in_row += 1
+        self.frames_skipped += 1
+        return False
+
+    def get_skip_ratio(self):
+        """
+        Fraction of checked frames where detection was skipped
+
+        Returns:
+            float: 0.0 ~ 1.0
+        """
+        if self.frames_checked == 0:
+            return 0.0
+        return self.frames_skipped / self.frames_checked
+
+    def get_stats(self):
+        """
+        Get gate statistics
+
+        Returns:
+            dict: Gate statistics
+        """
+        return {
+            "frames_checked": self.frames_checked,
+            "frames_skipped": self.frames_skipped,
+            "skip_ratio": round(self.get_skip_ratio(), 4),
+            "last_motion": round(self.last_motion, 4),
+            "threshold": self.threshold
+        }
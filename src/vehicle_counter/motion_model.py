@@ -0,0 +1,184 @@
+import numpy as np
+
+
+class KalmanBoxFilter:
+    """
+    Constant-velocity Kalman filter for many bounding boxes at once.
+
+    Same state model as KalmanBoxTracker in z_test/sort.py
+    (x, y, s, r, vx, vy, vs: center, area, aspect ratio and their velocities),
+    but every track is one row of shared NumPy arrays instead of its own filter object.
+    """
+
+    DIM_X = 7
+    DIM_Z = 4
+
+    def __init__(self):
+        """
+        Initialize empty filter
+        """
+        self.x = np.zeros((0, self.DIM_X), dtype=np.float64)
+        self.P = np.zeros((0, self.DIM_X, self.DIM_X), dtype=np.float64)
+
+        self.H = np.zeros((self.DIM_Z, self.DIM_X))
+        self.H[:, :self.DIM_Z] = np.eye(self.DIM_Z)
+
+        self.R = np.eye(self.DIM_Z)
+        self.R[2:, 2:] *= 10.0
+
+        self.Q = np.eye(self.DIM_X)
+        self.Q[-1, -1] *= 0.01
+        self.Q[4:, 4:] *= 0.01
+
+        self.P0 = np.eye(self.DIM_X)
+        self.P0[4:, 4:] *= 1000.0
+        self.P0 *= 10.0
+
+    def __len__(self):
+        return len(self.x)
+
+    @staticmethod
+    def boxes_to_z(boxes):
+        """
+        Convert boxes to measurements
+
+        Args:
+            boxes (array-like): N boxes [[x1, y1, x2, y2], ...]
+
+        Returns:
+            numpy.ndarray: N x 4 measurements [x, y, s, r]
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        w = boxes[:, 2] - boxes[:, 0]
+        h = boxes[:, 3] - boxes[:, 1]
+
+        return np.column_stack([
+            boxes[:, 0] + w / 2.0,
+            boxes[:, 1] + h / 2.0,
+            w * h,
+            w / np.maximum(h, 1e-6)
+        ])
+
+    @staticmethod
+    def x_to_boxes(x):
+        """
+        Convert states to boxes
+
+        Args:
+            x (numpy.ndarray): N x 7 states
+
+        Returns:
+            numpy.ndarray: N x 4 boxes [[x1, y1, x2, y2], ...]
+        """
+        w = np.sqrt(np.maximum(x[:, 2] * x[:, 3], 0.0))
+        h = np.divide(x[:, 2], w, out=np.zeros_like(w), where=w > 0)
+
+        return np.column_stack([
+            x[:, 0] - w / 2.0,
+            x[:, 1] - h / 2.0,
+            x[:, 0] + w / 2.0,
+            x[:, 1] + h / 2.0
+        ])
+
+    def transition(self, dt):
+        """
+        State transition matrix
+
+        Args:
+            dt (float): Number of frames to advance
+
+        Returns:
+            numpy.ndarray: 7 x 7 matrix
+        """
+        F = np.eye(self.DIM_X)
+        F[0, 4] = F[1, 5] = F[2, 6] = dt
+        return F
+
+    def add(self, boxes):
+        """
+        Start new tracks
+
+        Args:
+            boxes (array-like): N boxes [[x1, y1, x2, y2], ...]
+
+        Returns:
+            numpy.ndarray: Row indices of the new tracks
+        """
+        z = self.boxes_to_z(boxes)
+        start = len(self.x)
+
+        x = np.zeros((len(z), self.DIM_X))
+        x[:, :self.DIM_Z] = z
+
+        self.x = np.concatenate([self.x, x])
+        self.P = np.concatenate([self.P, np.repeat(self.P0[None], len(z), axis=0)])
+
+        return np.arange(start, start + len(z))
+
+    def remove(self, rows):
+        """
+        Drop tracks. Rows after a removed row move up.
+
+        Args:
+            rows (array-like): Row indices
+        """
+        keep = np.ones(len(self.x), dtype=bool)
+        keep[np.asarray(rows, dtype=np.intp)] = False
+
+        self.x = self.x[keep]
+        self.P = self.P[keep]
+
+    def predict(self, dt=1.0):
+        """
+        Advance every track
+
+        Args:
+            dt (float): Number of frames to advance
+
+        Returns:
+            numpy.ndarray: N x 4 predicted boxes
+        """
+        if len(self.x) == 0:
+            return np.zeros((0, 4))
+
+        # Keep the predicted area positive
+        shrinking = self.x[:, 6] * dt + self.x[:, 2] <= 0
+        self.x[shrinking, 6] = 0.0
+
+        F = self.transition(dt)
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + self.Q
+
+        return self.boxes()
+
+    def update(self, rows, boxes):
+        """
+        Correct tracks with matched detections
+
+        Args:
+            rows (array-like): Row indices of the tracks
+            boxes (array-like): Detected boxes of the tracks [[x1, y1, x2, y2], ...]
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(rows) == 0:
+            return
+
+        z = self.boxes_to_z(boxes)
+        x = self.x[rows]
+        P = self.P[rows]
+
+        y = z - x @ self.H.T
+        S = self.H @ P @ self.H.T + self.R
+        K = P @ self.H.T @ np.linalg.inv(S)
+
+        self.x[rows] = x + np.einsum('nij,nj->ni', K, y)
+        self.P[rows] = (np.eye(self.DIM_X) - K @ self.H) @ P
+
+    def boxes(self):
+        """
+        Current boxes of all tracks
+
+        Returns:
+            numpy.ndarray: N x 4 boxes
+        """
+        return self.x_to_boxes(self.x)
@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import time
+
+import cv2
+
+from vehicle_detector import VehicleDetector
+from vehicle_counter_service import VehicleCounterService
+
+
+class MultiStreamRunner:
+    """
+    Runs several camera streams of one intersection with a single shared detector.
+    Frames of all streams are detected in one batched forward pass; tracking,
+    zones and traffic lights stay separate per stream.
+    """
+
+    def __init__(self, sources, model_path="yolov8s.pt", device="cpu", output_path="data",
+                 backend="ultralytics", threads=None):
+        """
+        Initialize runner
+
+        Args:
+            sources (list): Stream configs [{"name": str, "video_path": str or None,
+                            "custom_zones": [...], "detection": {...}}, ...]
+                            (custom_zones and detection as in VehicleCounterService)
+            model_path (str): YOLO model path
+            device (str): Device to use (cpu, cuda, mps)
+            output_path (str): Output data path (each stream writes into its own subdirectory)
+            backend (str): Detector backend: ultralytics, onnxruntime or openvino
+            threads (int): CPU threads of the onnxruntime/openvino backends
+        """
+        self.detector = VehicleDetector(model_path, device, backend, threads)
+        self.services = []
+        self.processing = False
+
+        for i, source in enumerate(sources):
+            name = source.get("name") or f"Stream {i + 1}"
+            self.services.append(VehicleCounterService(
+                video_path=source.get("video_path"),
+                model_path=model_path,
+                device=device,
+                output_path=os.path.join(output_path, self._safe_dir_name(name)),
+                custom_zones=source.get("custom_zones"),
+                detector=self.detector,
+                name=name,
+                detection=source.get("detection")
+            ))
+
+    @staticmethod
+    def _safe_dir_name(name):
+        """
+        Directory name for a stream
+
+        Args:
+            name (str): Stream name
+
+        Returns:
+            str: Name with only letters, digits, '-' and '_'
+        """
+        return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+
+    def get_service(self, name):
+        """
+        Find a stream by name
+
+        Args:
+            name (str): Stream name
+
+        Returns:
+            VehicleCounterService: Stream service (None if not found)
+        """
+        for service in self.services:
+            if service.name == name:
+                return service
+        return None
+
+    def _setup_streams(self, save_data, motion_gate, roi_inference=False, roi_imgsz=None, offline=False):
+        """
+        Set up zones and open captures of all streams
+
+        Args:
+            save_data (bool): Save data
+            motion_gate (bool): Skip detection on frames without motion inside the zones
+            roi_inference (bool): Run the detector only on the zone bounding rectangles of each stream
+            roi_imgsz (int): Model input size for the ROI crops (None = model default)
+            offline (bool): Take the timing of video file streams from the video timestamps
+
+        Returns:
+            list: Streams that are ready
+        """
+        active = []
+
+        for service in self.services:
+            if not service._setup_zones() or len(service.zone_manager.zones) == 0:
+                print(f"{service.name}: no zones configured, stream skipped.")
+                continue
+
+            if not service._open_video_capture():
+                print(f"{service.name}: failed to open video or camera, stream skipped.")
+                continue
+
+            # Crops are per stream: each camera has its own zones
+            service._setup_rois(roi_inference, roi_imgsz)
+            service._begin_run(save_data, motion_gate, offline=offline and service.video_path is not None)
+            active.append(service)
+
+        return active
+
+    def _detect(self, services, frames):
+        """
+        Detect vehicles in one frame of each stream, with one forward pass per distinct
+        detection settings and crops. Every stream records its share of the batch time.
+
+        Args:
+            services (list): Streams
+            frames (list): One frame per stream
+
+        Returns:
+            list: (boxes, scores, class_ids) per stream
+        """
+        run_detection = []
+        stage_seconds = []
+        for service, frame in zip(services, frames):
+            started = time.perf_counter()
+            run_detection.append(service._gate_frames([frame])[0])
+            stage_seconds.append(time.perf_counter() - started)
+
+        # Cameras with the same settings and crops share a batch
+        groups = {}
+        for i, (service, run) in enumerate(zip(services, run_detection)):
+            if run:
+                settings = service.detection_settings or self.detector.settings
+                rois = service.detection_rois
+                key = (settings.key(), rois.key() if rois else None)
+                groups.setdefault(key, (settings, rois, []))[2].append(i)
+
+        detected = {}
+        detect_seconds = [0.0] * len(services)
+        for settings, rois, indices in groups.values():
+            started = time.perf_counter()
+            results = self.detector.detect_vehicles_batch([frames[i] for i in indices], settings, rois)
+            per_frame = (time.perf_counter() - started) / len(indices)
+
+            detected.update(zip(indices, results))
+            for i in indices:
+                detect_seconds[i] = per_frame
+
+        detections = []
+        for i, (service, run) in enumerate(zip(services, run_detection)):
+            detections.append(service._fill_skipped_detections([run], [detected[i]] if run else [])[0])
+            service._record_inference(1, stage_seconds[i] + detect_seconds[i], int(run), detect_seconds[i])
+
+        return detections
+
+    def start(self, display=False, save_data=True, motion_gate=False, roi_inference=False, roi_imgsz=None,
+              offline=False):
+        """
+        Process all streams until every stream has ended or stop() is called
+
+        Args:
+            display (bool): Show one window per stream
+            save_data (bool): Save data of each stream
+            motion_gate (bool): Skip detection on frames without motion inside the zones
+            roi_inference (bool): Run the detector only on the zone bounding rectangles of each stream
+            roi_imgsz (int): Model input size for the ROI crops (None = model default)
+            offline (bool): Process recorded videos as fast as possible with timing taken from
+                            the video timestamps (no display)
+
+        Returns:
+            bool: Process success
+        """
+        if offline:
+            display = False
+
+        active = self._setup_streams(save_data, motion_gate, roi_inference, roi_imgsz, offline)
+        if not active:
+            print("No stream could be started.")
+            return False
+
+        self.processing = True
+
+        try:
+            while active and self.processing:
+                services = []
+                frames = []
+
+                for service in list(active):
+                    # Through the service reader: capture timing and video timestamps
+                    read = service._read_frames(1) if service.processing else []
+                    if not read:
+                        service._end_run(save_data)
+                        active.remove(service)
+                        continue
+
+                    services.append(service)
+                    frames.append(read[0])
+
+                if not frames:
+                    break
+
+                for service, frame, detections in zip(services, frames, self._detect(services, frames)):
+                    if not service._process_frame(frame, detections, display, None, save_data):
+                        # ESC in a window stops every stream
+                        self.processing = False
+                        break
+
+        except KeyboardInterrupt:
+            print("Process stopped by user request.")
+        except Exception as e:
+            print(f"Process stopped with error: {e}")
+        finally:
+            self.processing = False
+
+            for service in active:
+                service._end_run(save_data)
+
+            if display:
+                cv2.destroyAllWindows()
+
+        return True
+
+    def stop(self):
+        """
+        Stop all streams
+
+        Returns:
+            bool: Process stopped
+        """
+        if self.processing:
+            self.processing = False
+            return True
+        return False
+
+
+def main():
+    """
+    Run the streams described in a JSON config file
+    """
+    parser = argparse.ArgumentParser(description="Multi-camera vehicle counting with one shared model")
+
+    parser.add_argument("--config", "-c", type=str, required=True,
+                        help='JSON file: {"streams": [{"name", "video_path", "custom_zones", "detection"}, ...]}')
+
+    parser.add_argument("--model", "-m", type=str, default="yolov8s.pt",
+                        help="YOLO model path")
+
+    parser.add_argument("--device", "-d", type=str, default="cpu",
+                        help="Device to use (cpu, cuda, mps)")
+
+    parser.add_argument("--output", "-o", type=str, default="data",
+                        help="Output data path")
+
+    parser.add_argument("--backend", type=str, default="ultralytics",
+                        choices=["ultralytics", "onnxruntime", "openvino"],
+                        help="Detector backend (onnxruntime/openvino take the exported model as --model)")
+
+    parser.add_argument("--threads", type=int, default=None,
+                        help="CPU threads of the onnxruntime/openvino backends")
+
+    parser.add_argument("--display", action="store_true",
+                        help="Show one window per stream")
+
+    parser.add_argument("--motion-gate", "-mg", action="store_true",
+                        help="Skip detection on frames without motion inside the zones")
+
+    parser.add_argument("--roi", action="store_true",
+                        help="Run detection only on the zone bounding rectangles of each stream")
+
+    parser.add_argument("--offline", action="store_true",
+                        help="Process the videos as fast as possible with timing taken from the video timestamps")
+
+    args = parser.parse_args()
+
+    with open(args.config, encoding="utf-8") as f:
+        config = json.load(f)
+
+    runner = MultiStreamRunner(
+        config.get("streams", []),
+        model_path=args.model,
+        device=args.device,
+        output_path=args.output,
+        backend=args.backend,
+        threads=args.threads
+    )
+
+    runner.start(display=args.display, save_data=True, motion_gate=args.motion_gate,
+                 roi_inference=args.roi, offline=args.offline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: periodically samples the Python stacks of the
+    processing threads. Nothing is installed in the profiled threads, so the
+    cost only exists while a profile is being taken.
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        Create profiler
+
+        Args:
+            interval (float): Seconds between two samples
+        """
+        self.interval = interval
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _frame_key(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def profile(self, duration=5.0, thread_ids=None, top=30):
+        """
+        Sample stacks for `duration` seconds (blocks the calling thread)
+
+        Args:
+            duration (float): Profiling time (seconds)
+            thread_ids (collection): Thread idents to sample (None = all other threads)
+            top (int): Number of functions in the report
+
+        Returns:
+            dict: Sample count and the functions seen most often, by own time
+                  (top of stack) and by total time (anywhere in the stack)
+        """
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+
+        try:
+            own = Counter()
+            total = Counter()
+            samples = 0
+            own_id = threading.get_ident()
+            end = time.perf_counter() + duration
+
+            while time.perf_counter() < end:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id or (thread_ids is not None and thread_id not in thread_ids):
+                        continue
+
+                    samples += 1
+                    own[self._frame_key(frame)] += 1
+
+                    seen = set()
+                    while frame is not None:
+                        key = self._frame_key(frame)
+                        if key not in seen:
+                            seen.add(key)
+                            total[key] += 1
+                        frame = frame.f_back
+
+                time.sleep(self.interval)
+
+            def report(counter):
+                return [
+                    {"function": key, "samples": count,
+                     "percent": round(100.0 * count / samples, 2) if samples else 0.0}
+                    for key, count in counter.most_common(top)
+                ]
+
+            return {
+                "duration": duration,
+                "interval": self.interval,
+                "samples": samples,
+                "own": report(own),
+                "total": report(total)
+            }
+        finally:
+            self.lock.release()
@@ -3,15 +3,19 @@ import logging
 from api import start_api
 import socketio
 from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-import base64
 import cv2
 import numpy as np
 import time
 import asyncio
 import os
 from vehicle_counter_service import VehicleCounterService
+from frame_buffer import EncodedFrameBuffer, mjpeg_stream, MJPEG_BOUNDARY
+from detections import DetectionBatch
+from metrics import REGISTRY, CONTENT_TYPE, FRAMES_DROPPED
 
 # Set headless mode by default for server environment
 os.environ['HEADLESS'] = '1'
@@ -44,15 +48,125 @@ sio = socketio.AsyncServer(
 )
 socket_app = socketio.ASGIApp(sio, app)
 
+# Frame stream limits
+DEFAULT_CLIENT_FPS = 10
+MAX_CLIENT_FPS = 30
+MIN_CLIENT_FPS = 1
+MAX_PENDING_PACKETS = 2  # Frames still in flight to a client before new frames are dropped
+SEND_TICK = 1.0 / MAX_CLIENT_FPS
+
+
+class FrameClient:
+    """
+    Frame stream state of one socket.io session. Only the newest frame is
+    ever sent: while the client still has frames in flight, new frames are
+    dropped and its frame rate backs off until the queue drains.
+    
+    Clients that acknowledge frames (stream_settings {'ack': true}) are
+    measured by frames sent minus frames acknowledged; for the others the
+    engine.io send queue is read.
+    """
+
+    def __init__(self, sid, fps=DEFAULT_CLIENT_FPS, variant="full"):
+        self.sid = sid
+        self.variant = variant
+        self.set_fps(fps)
+        self.next_send = 0.0
+        self.last_seq = 0
+        self.queue_depth = 0
+        self.ack_frames = False
+        self.frames_unacked = 0
+        self.frames_sent = 0
+        self.frames_acked = 0
+        self.frames_dropped = 0
+
+    def set_ack_frames(self, ack_frames):
+        """Turn frame acknowledgements on or off (frames sent before are not waited for)"""
+        self.ack_frames = bool(ack_frames)
+        self.frames_unacked = 0
+
+    def sent(self):
+        """A frame was emitted"""
+        self.frames_sent += 1
+        if self.ack_frames:
+            self.frames_unacked += 1
+
+    def ack(self, *args):
+        """socket.io callback: the client received a frame"""
+        self.frames_acked += 1
+        self.frames_unacked = max(0, self.frames_unacked - 1)
+
+    def update_queue_depth(self):
+        """Frames in flight: unacknowledged frames, or the engine.io queue (0 if it cannot be read)"""
+        if self.ack_frames:
+            self.queue_depth = self.frames_unacked
+        else:
+            depth = engine_queue_depth(self.sid)
+            self.queue_depth = depth if depth is not None else 0
+        return self.queue_depth
+
+    def set_fps(self, fps):
+        """Set the target frame rate (clamped to MIN_CLIENT_FPS ~ MAX_CLIENT_FPS)"""
+        self.target_fps = max(MIN_CLIENT_FPS, min(MAX_CLIENT_FPS, float(fps)))
+        self.interval = 1.0 / self.target_fps
+
+    def backoff(self):
+        """Client is behind: halve the current frame rate"""
+        self.interval = min(self.interval * 2, 1.0 / MIN_CLIENT_FPS)
+
+    def recover(self):
+        """Client keeps up: move back toward the target frame rate"""
+        self.interval = max(self.interval * 0.8, 1.0 / self.target_fps)
+
+    def get_stats(self):
+        return {
+            'variant': self.variant,
+            'target_fps': self.target_fps,
+            'current_fps': round(1.0 / self.interval, 2),
+            'queue_depth': self.queue_depth,
+            'ack_frames': self.ack_frames,
+            'last_seq': self.last_seq,
+            'frames_sent': self.frames_sent,
+            'frames_acked': self.frames_acked,
+            'frames_dropped': self.frames_dropped
+        }
+
+
 # Global variables to store the vehicle counter service and frame data
 vehicle_counter = None
-latest_frame = None
-latest_detection_data = None
+frame_buffer = EncodedFrameBuffer()
+frame_clients = {}  # sid -> FrameClient
 processing_active = False
+engine_queue_missing = False  # Logged once when engine.io has no readable send queue
+
+REGISTRY.gauge("vehicle_counter_stream_client_queue_depth", "Frames in flight to a socket.io client",
+               ("client",), callback=lambda: {(sid,): client.queue_depth
+                                              for sid, client in list(frame_clients.items())})
+
+
+def engine_queue_depth(sid):
+    """
+    Number of packets queued for a client in engine.io.
+    This reads engine.io internals: if a version does not have them, None is
+    returned and a warning is logged once.
+    """
+    global engine_queue_missing
+    
+    try:
+        eio_sid = sio.manager.eio_sid_from_sid(sid, '/')
+        socket = sio.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else 0
+    except AttributeError as e:
+        if not engine_queue_missing:
+            engine_queue_missing = True
+            logger.warning(f"engine.io send queue is not readable ({e}); "
+                           "clients without frame acks get no backpressure")
+        return None
 
 @sio.event
 async def connect(sid, environ):
     print(f"Client connected: {sid}")
+    frame_clients[sid] = FrameClient(sid)
     # Send the current status to the newly connected client
     if processing_active:
         await sio.emit('processing_status', {'active': True}, room=sid)
@@ -62,6 +176,58 @@ async def connect(sid, environ):
 @sio.event
 async def disconnect(sid):
     print(f"Client disconnected: {sid}")
+    frame_clients.pop(sid, None)
+
+@sio.event
+async def stream_settings(sid, data):
+    """
+    Negotiate frame rate and quality for this client: {'fps': 1~30, 'variant': 'full' or 'preview', 'ack': bool}.
+    With 'ack' the client acknowledges every 'frame' event and backpressure follows the unacknowledged frames.
+    """
+    client = frame_clients.get(sid)
+    if client is None:
+        return {'status': 'error', 'message': 'Unknown client'}
+    
+    data = data or {}
+    variant = data.get('variant', data.get('quality', client.variant))
+    if variant not in frame_buffer.variants:
+        return {'status': 'error', 'message': f'Unknown frame variant: {variant}'}
+    
+    try:
+        fps = float(data.get('fps', client.target_fps))
+    except (TypeError, ValueError):
+        return {'status': 'error', 'message': 'Invalid fps'}
+    
+    client.variant = variant
+    client.set_fps(fps)
+    if 'ack' in data:
+        client.set_ack_frames(data['ack'])
+    return {'status': 'success', 'variant': client.variant, 'fps': client.target_fps, 'ack': client.ack_frames}
+
+@sio.event
+async def frame_variant(sid, data):
+    """Select the frame variant sent to this client ('full' or 'preview')"""
+    variant = data.get('variant', 'full') if isinstance(data, dict) else data
+    return await stream_settings(sid, {'variant': variant})
+
+@sio.event
+async def stream_stats(sid):
+    """Frame stream statistics of the calling client"""
+    client = frame_clients.get(sid)
+    return client.get_stats() if client is not None else None
+
+@app.get("/api/stream/clients")
+async def get_stream_clients():
+    """Frame stream statistics (queue depth, frame rate, drops) per connected client"""
+    return {
+        'buffer': frame_buffer.get_stats(),
+        'clients': {sid: client.get_stats() for sid, client in list(frame_clients.items())}
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of the processing and frame stream metrics"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
 
 @sio.event
 async def start_detection(sid, data):
@@ -76,17 +242,21 @@ async def start_detection(sid, data):
         # Check if custom zones are provided
         custom_zones = data.get('custom_zones', None)
         
+        # Offline: recorded video as fast as possible, timing from the video timestamps
+        offline = bool(data.get('offline', False)) and video_path is not None
+        
         # Initialize vehicle counter with custom zones if provided
         vehicle_counter = VehicleCounterService(
             video_path=video_path,
             model_path="yolov8s.pt",
             device="cpu",
             output_path="data",
-            custom_zones=custom_zones
+            custom_zones=custom_zones,
+            detection=data.get('detection')
         )
         
         # Run the detection process in a separate task
-        asyncio.create_task(run_detection())
+        asyncio.create_task(run_detection(offline))
         
         return {'status': 'success', 'message': 'Vehicle detection started'}
     else:
@@ -98,25 +268,26 @@ async def stop_detection(sid):
     if processing_active and vehicle_counter:
         vehicle_counter.stop_counting()
         processing_active = False
+        frame_buffer.clear()
         await sio.emit('processing_status', {'active': False})
         return {'status': 'success', 'message': 'Vehicle detection stopped'}
     else:
         return {'status': 'error', 'message': 'No detection running'}
 
-async def run_detection():
-    global vehicle_counter, latest_frame, latest_detection_data, processing_active
+async def run_detection(offline=False):
+    global vehicle_counter, processing_active
     
-    # Initialize the detector with modified start_counting function
+    # Frames are only stored here; send_frames encodes each one at most once per variant
     def frame_callback(frame, detection_data):
-        global latest_frame, latest_detection_data
-        latest_frame = frame
-        latest_detection_data = detection_data
+        frame_buffer.publish(frame, detection_data)
     
     # Start the vehicle counter with our callback
-    success = await asyncio.to_thread(
+    success = await asyncio.get_running_loop().run_in_executor(
+        None,
         start_detection_process, 
         vehicle_counter,
-        frame_callback
+        frame_callback,
+        offline
     )
     
     if not success:
@@ -124,8 +295,11 @@ async def run_detection():
         await sio.emit('processing_status', {'active': False})
         await sio.emit('detection_error', {'message': 'Detection process failed to start'})
 
-def start_detection_process(counter, callback):
-    """Custom function to start detection and pass frames to callback"""
+def start_detection_process(counter, callback, offline=False):
+    """Custom function to start detection and pass frames to callback
+    
+    In offline mode the clock follows the video timestamps and frames are not throttled.
+    """
     if not counter._setup_zones():
         return False
     
@@ -137,60 +311,46 @@ def start_detection_process(counter, callback):
         print("Failed to open video or camera.")
         return False
     
-    counter.processing = True
-    counter.frame_count = 0
-    counter.start_time = time.time()
+    counter._begin_run(save_data=False, offline=offline)
     
     try:
         while counter.cap.isOpened() and counter.processing:
-            ret, frame = counter.cap.read()
-            if not ret:
+            frames = counter._read_frames(1)
+            if not frames:
                 break
+            frame = frames[0]
             
             counter.frame_count += 1
-            current_time = time.time()
+            current_time = counter._frame_time()
             
             # Detect vehicles
-            detections = counter.detector.detect_vehicles(frame)
-            
-            # Process detections format
-            if isinstance(detections, tuple) and len(detections) == 3:
-                boxes, scores, class_ids = detections
-            else:
-                boxes = []
-                scores = []
-                class_ids = []
-                
-                if detections:
-                    for det in detections:
-                        if isinstance(det, dict) and 'box' in det:
-                            x1, y1, x2, y2 = det['box']
-                            boxes.append([x1, y1, x2, y2])
-                            scores.append(det.get('confidence', 1.0))
-                            class_ids.append(det.get('class_id', 0))
+            started = time.perf_counter()
+            detections = counter.detector.detect_vehicles(frame, counter.detection_settings, counter.detection_rois)
+            counter.inference_metric.observe(time.perf_counter() - started)
             
             # Track vehicles
             try:
                 tracked_objects, zone_vehicles = counter.tracker.track_vehicles(
-                    frame, boxes, scores, class_ids, counter.zone_manager.zones
+                    frame, counter._unpack_detections(detections), counter.zone_manager.zones,
+                    current_time=current_time
                 )
             except Exception as e:
                 print(f"Tracking error: {e}")
-                tracked_objects = []
+                counter.tracking_errors_metric.inc()
+                tracked_objects = DetectionBatch.empty()
                 zone_vehicles = {}
             
-            # Update statistics
-            for zone in counter.zone_manager.zones:
-                zone.update_statistics()
+            # Update statistics (once per statistics interval)
+            counter._update_statistics(current_time)
+            
+            counter._record_frame_metrics()
             
             # Draw zones and tracked objects
             frame_with_viz = frame.copy()
             frame_with_viz = counter.zone_manager.draw_zones(frame_with_viz)
             
-            for obj in tracked_objects:
-                x1, y1, x2, y2 = obj["bbox"]
-                track_id = obj["id"]
-                
+            for (x1, y1, x2, y2), track_id in zip(tracked_objects.int_boxes().tolist(),
+                                                  tracked_objects.track_ids.tolist()):
                 cv2.rectangle(frame_with_viz, (x1, y1), (x2, y2), (255, 0, 0), 2)
                 cv2.putText(frame_with_viz, f"ID: {track_id}", (x1, y1 - 10), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
@@ -201,7 +361,7 @@ def start_detection_process(counter, callback):
             # Prepare detection data to send to clients
             detection_data = {
                 'frame_count': counter.frame_count,
-                'fps': counter.frame_count / (current_time - counter.start_time) if current_time > counter.start_time else 0,
+                'fps': counter.frame_count / (time.time() - counter.start_time) if time.time() > counter.start_time else 0,
                 'tracked_objects': len(tracked_objects),
                 'congestion_status': congestion_status,
                 'zones': []
@@ -219,8 +379,9 @@ def start_detection_process(counter, callback):
             # Call the callback with the processed frame and detection data
             callback(frame_with_viz, detection_data)
             
-            # Sleep to reduce CPU usage
-            time.sleep(0.03)  # Adjust for desired frame rate
+            # Sleep to reduce CPU usage (offline runs as fast as possible)
+            if not offline:
+                time.sleep(0.03)  # Adjust for desired frame rate
             
     except Exception as e:
         print(f"Process stopped with error: {e}")
@@ -231,29 +392,69 @@ def start_detection_process(counter, callback):
         cv2.destroyAllWindows()
         return True
 
+@app.get("/api/video/mjpeg")
+async def video_mjpeg(width: Optional[int] = None, quality: Optional[int] = None, fps: float = 10):
+    """MJPEG preview for viewers without socket.io, served from the shared encoded frames"""
+    variant = frame_buffer.select_variant(width, quality)
+    
+    return StreamingResponse(
+        mjpeg_stream(frame_buffer, variant, fps),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={'Cache-Control': 'no-cache', 'X-Frame-Variant': variant}
+    )
+
 async def send_frames():
     """Task to send processed frames to connected clients"""
-    global latest_frame, latest_detection_data, processing_active
+    global processing_active
+    
+    loop = asyncio.get_running_loop()
+    stream_drops = FRAMES_DROPPED.labels("socketio", "client_backpressure")
     
     while True:
-        # Only send if processing is active and we have data
-        if processing_active and latest_frame is not None and latest_detection_data is not None:
-            try:
-                # Convert frame to JPEG
-                _, buffer = cv2.imencode('.jpg', latest_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                # Convert to base64 string
-                frame_b64 = base64.b64encode(buffer).decode('utf-8')
+        # Only send if processing is active and someone is connected
+        if processing_active and frame_clients:
+            now = loop.time()
+            encoded = {}  # variant -> (seq, image, detection_data), fetched once per tick
+            
+            for client in list(frame_clients.values()):
+                if now < client.next_send:
+                    continue
                 
-                # Emit the frame and detection data to all connected clients
-                await sio.emit('frame', {
-                    'image': frame_b64,
-                    'detection_data': latest_detection_data
-                })
-            except Exception as e:
-                print(f"Error sending frame: {e}")
+                try:
+                    if client.update_queue_depth() > MAX_PENDING_PACKETS:
+                        # Previous frames are still in flight: skip this one (latest wins)
+                        client.frames_dropped += 1
+                        stream_drops.inc()
+                        client.backoff()
+                        client.next_send = now + client.interval
+                        continue
+                    
+                    if client.variant not in encoded:
+                        # Encoded at most once per frame and variant, shared by all clients
+                        encoded[client.variant] = await loop.run_in_executor(None, frame_buffer.get, client.variant)
+                    
+                    latest = encoded[client.variant]
+                    if latest is None or latest[0] <= client.last_seq:
+                        continue
+                    
+                    seq, image, detection_data = latest
+                    
+                    # JPEG bytes go out as a binary attachment, no base64
+                    await sio.emit('frame', {
+                        'seq': seq,
+                        'variant': client.variant,
+                        'image': image,
+                        'detection_data': detection_data
+                    }, room=client.sid, callback=client.ack if client.ack_frames else None)
+                    
+                    client.last_seq = seq
+                    client.sent()
+                    client.recover()
+                    client.next_send = now + client.interval
+                except Exception as e:
+                    print(f"Error sending frame: {e}")
         
-        # Sleep to maintain reasonable frame rate (adjust as needed)
-        await asyncio.sleep(0.1)  # 10 FPS
+        await asyncio.sleep(SEND_TICK)
 
 async def start_server():
     """
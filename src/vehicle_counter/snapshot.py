@@ -0,0 +1,199 @@
+import json
+
+
+def _dumps(data):
+    """
+    Serialize API payload
+
+    Args:
+        data: JSON-compatible data
+
+    Returns:
+        bytes: UTF-8 JSON
+    """
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def congestion_level_name(stalled_zones):
+    """
+    Dashboard congestion level name
+
+    Args:
+        stalled_zones (int): Number of stalled zones
+
+    Returns:
+        str: Level name
+    """
+    return "Хэвийн" if stalled_zones == 0 else "Дунд зэрэг" if stalled_zones < 3 else "Хүнд"
+
+
+class TelemetrySnapshot:
+    """
+    Immutable, versioned view of zones, lights and statistics.
+    Built by the processing thread once per tick; API requests only read it.
+    """
+
+    __slots__ = ("version", "timestamp", "zones", "lights", "frame_count", "fps", "_payloads")
+
+    def __init__(self, version, timestamp, zones, lights, frame_count, fps, payloads):
+        """
+        Create snapshot
+
+        Args:
+            version (int): Snapshot version (increases by one per publish)
+            timestamp (float): Build time
+            zones (tuple): Zone states (tuple of dicts)
+            lights (dict): Traffic light states {direction: {...}}
+            frame_count (int): Processed frames
+            fps (float): Processing FPS
+            payloads (dict): Pre-serialized endpoint responses {name: bytes}
+        """
+        self.version = version
+        self.timestamp = timestamp
+        self.zones = zones
+        self.lights = lights
+        self.frame_count = frame_count
+        self.fps = fps
+        self._payloads = payloads
+
+    def payload(self, name):
+        """
+        Pre-serialized response body
+
+        Args:
+            name (str): dashboard, zones, congestion or statistics
+
+        Returns:
+            bytes: JSON body
+        """
+        return self._payloads[name]
+
+
+def build_snapshot(service, version, statistics_payload=None):
+    """
+    Build a snapshot from the live objects of a counting service.
+    Must run on the thread that updates the zones.
+
+    Args:
+        service (VehicleCounterService): Counting service
+        version (int): Snapshot version
+        statistics_payload (bytes): Reuse this statistics body instead of rebuilding it
+
+    Returns:
+        TelemetrySnapshot: New snapshot
+    """
+    timestamp = service.current_time()
+    controller = service.traffic_light_controller
+
+    zones = tuple({
+        "id": zone.id,
+        "name": zone.name,
+        "type": zone.type,
+        "type_name": "COUNT" if zone.is_count_zone() else "SUM",
+        "display_count": zone.get_display_count(),
+        "vehicle_count": len(zone.current_vehicles),
+        "is_stalled": zone.is_stalled,
+        "stalled_time": zone.stalled_time,
+        "traffic_light_directions": list(zone.traffic_light_directions),
+        "points": [list(point) for point in zone.points]
+    } for zone in service.zone_manager.zones)
+
+    lights = {}
+    if controller is not None:
+        lights = {direction: dict(light) for direction, light in controller.traffic_lights.items()}
+
+    # /api/zones
+    zones_body = {"zones": [{
+        "id": zone["id"],
+        "name": zone["name"],
+        "type": zone["type"],
+        "vehicle_count": zone["display_count"],
+        "is_stalled": zone["is_stalled"],
+        "traffic_light_directions": zone["traffic_light_directions"],
+        "points": zone["points"]
+    } for zone in zones]}
+
+    # /api/congestion
+    congestion_body = {"congestion": [{
+        "zone_id": zone["id"],
+        "zone_name": zone["name"],
+        "is_stalled": zone["is_stalled"],
+        "vehicle_count": zone["vehicle_count"],
+        "stalled_time": zone["stalled_time"]
+    } for zone in zones]}
+
+    # /api/dashboard
+    stalled_zones = sum(1 for zone in zones if zone["is_stalled"])
+    dashboard_body = {
+        "zones": [{
+            "id": zone["id"],
+            "name": zone["name"],
+            "vehicle_count": zone["vehicle_count"],
+            "is_stalled": zone["is_stalled"],
+            "type": zone["type_name"]
+        } for zone in zones],
+        "lights": lights,
+        "summary": {
+            "total_zones": len(zones),
+            "stalled_zones": stalled_zones,
+            "total_vehicles": sum(zone["vehicle_count"] for zone in zones),
+            "congestion_level": congestion_level_name(stalled_zones),
+            "red_lights": sum(1 for light in lights.values() if light["status"] == "RED"),
+            "timestamp": timestamp
+        }
+    }
+
+    # /api/statistics
+    if statistics_payload is None:
+        statistics_payload = _dumps(build_statistics(service.zone_manager.get_all_statistics(timestamp), timestamp))
+
+    payloads = {
+        "zones": _dumps(zones_body),
+        "congestion": _dumps(congestion_body),
+        "dashboard": _dumps(dashboard_body),
+        "statistics": statistics_payload
+    }
+
+    return TelemetrySnapshot(
+        version=version,
+        timestamp=timestamp,
+        zones=zones,
+        lights=lights,
+        frame_count=service.frame_count,
+        fps=service.fps,
+        payloads=payloads
+    )
+
+
+def build_statistics(statistics, timestamp):
+    """
+    Statistics response with summary
+
+    Args:
+        statistics (list): Zone statistics (ZoneManager.get_all_statistics)
+        timestamp (float): Build time
+
+    Returns:
+        dict: {"zones": [...], "summary": {...}}
+    """
+    max_vehicles = 0
+    busiest_zone = None
+
+    for stat in statistics:
+        if stat["max_vehicle_count"] > max_vehicles:
+            max_vehicles = stat["max_vehicle_count"]
+            busiest_zone = stat["zone_name"]
+
+    summary = {
+        "total_zones": len(statistics),
+        "total_congestion_events": sum(stat["congestion_events"] for stat in statistics),
+        "avg_congestion_time": sum(stat["total_stalled_time"] for stat in statistics) / len(statistics) if statistics else 0,
+        "busiest_zone": busiest_zone,
+        "timestamp": timestamp,
+        "max_vehicles": max_vehicles
+    }
+
+    return {
+        "zones": statistics,
+        "summary": summary
+    }
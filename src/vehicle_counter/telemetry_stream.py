@@ -0,0 +1,246 @@
+import asyncio
+import json
+
+
+def _dumps(data):
+    """
+    Serialize stream message
+
+    Args:
+        data (dict): Message
+
+    Returns:
+        str: JSON text
+    """
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def full_message(snapshot):
+    """
+    Message with the complete state (sent on connect and after a client fell behind)
+
+    Args:
+        snapshot (TelemetrySnapshot): Snapshot
+
+    Returns:
+        str: JSON text
+    """
+    return _dumps({
+        "type": "snapshot",
+        "version": snapshot.version,
+        "timestamp": snapshot.timestamp,
+        "frame_count": snapshot.frame_count,
+        "zones": [{
+            "id": zone["id"],
+            "name": zone["name"],
+            "type": zone["type_name"],
+            "count": zone["display_count"],
+            "vehicle_count": zone["vehicle_count"],
+            "is_stalled": zone["is_stalled"]
+        } for zone in snapshot.zones],
+        "lights": {
+            direction: {"status": light["status"], "changed_time": light["changed_time"]}
+            for direction, light in snapshot.lights.items()
+        }
+    })
+
+
+def delta_message(previous, snapshot):
+    """
+    Message with only what changed between two snapshots
+
+    Args:
+        previous (TelemetrySnapshot): Previous snapshot
+        snapshot (TelemetrySnapshot): New snapshot
+
+    Returns:
+        str: JSON text, or None if nothing changed
+    """
+    previous_zones = {zone["id"]: zone for zone in previous.zones}
+    current_ids = set()
+    zones = []
+
+    for zone in snapshot.zones:
+        current_ids.add(zone["id"])
+        old = previous_zones.get(zone["id"])
+
+        if old is None:
+            zones.append({
+                "id": zone["id"],
+                "name": zone["name"],
+                "type": zone["type_name"],
+                "count": zone["display_count"],
+                "vehicle_count": zone["vehicle_count"],
+                "is_stalled": zone["is_stalled"]
+            })
+            continue
+
+        changes = {}
+        if zone["display_count"] != old["display_count"]:
+            changes["count"] = zone["display_count"]
+        if zone["vehicle_count"] != old["vehicle_count"]:
+            changes["vehicle_count"] = zone["vehicle_count"]
+        if zone["is_stalled"] != old["is_stalled"]:
+            changes["is_stalled"] = zone["is_stalled"]
+
+        if changes:
+            changes["id"] = zone["id"]
+            zones.append(changes)
+
+    lights = {}
+    for direction, light in snapshot.lights.items():
+        old = previous.lights.get(direction)
+        if old is None or old["status"] != light["status"]:
+            lights[direction] = {"status": light["status"], "changed_time": light["changed_time"]}
+
+    removed = [zone_id for zone_id in previous_zones if zone_id not in current_ids]
+
+    if not zones and not lights and not removed:
+        return None
+
+    message = {
+        "type": "delta",
+        "version": snapshot.version,
+        "base_version": previous.version,
+        "timestamp": snapshot.timestamp
+    }
+    if zones:
+        message["zones"] = zones
+    if lights:
+        message["lights"] = lights
+    if removed:
+        message["removed_zones"] = removed
+
+    return _dumps(message)
+
+
+class TelemetryBroadcaster:
+    """
+    Polls the published snapshot and pushes one serialized delta per new
+    version to every subscriber queue. Serialization cost does not depend on
+    the number of viewers.
+    """
+
+    def __init__(self, get_snapshot, interval=0.1, queue_size=32):
+        """
+        Create broadcaster
+
+        Args:
+            get_snapshot (callable): Returns the latest published TelemetrySnapshot (or None)
+            interval (float): Snapshot poll interval (seconds)
+            queue_size (int): Messages buffered per subscriber before it is resynchronized
+        """
+        self.get_snapshot = get_snapshot
+        self.interval = interval
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.task = None
+        self.last_snapshot = None
+        self.messages_sent = 0
+        self._full_cache = (None, None)
+
+    def subscribe(self, snapshot=None):
+        """
+        Add a subscriber. The full state is queued first.
+
+        Args:
+            snapshot (TelemetrySnapshot): Initial state (latest published snapshot if None)
+
+        Returns:
+            asyncio.Queue: Message queue of the subscriber
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+
+        # Deltas are built against last_snapshot, so it is also the initial state
+        if self.last_snapshot is None:
+            self.last_snapshot = snapshot or self.get_snapshot()
+        if self.last_snapshot is not None:
+            queue.put_nowait(self._full_message(self.last_snapshot))
+
+        self.subscribers.add(queue)
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+        return queue
+
+    def _full_message(self, snapshot):
+        """
+        Full state message, serialized once per snapshot
+
+        Args:
+            snapshot (TelemetrySnapshot): Snapshot
+
+        Returns:
+            str: JSON text
+        """
+        if self._full_cache[0] is not snapshot:
+            self._full_cache = (snapshot, full_message(snapshot))
+        return self._full_cache[1]
+
+    def unsubscribe(self, queue):
+        """
+        Remove a subscriber
+
+        Args:
+            queue (asyncio.Queue): Queue returned by subscribe
+        """
+        self.subscribers.discard(queue)
+
+    def _publish(self, message, snapshot):
+        """
+        Hand one message to every subscriber. A subscriber whose queue is
+        full gets its backlog replaced by the full state.
+
+        Args:
+            message (str): Delta message
+            snapshot (TelemetrySnapshot): Snapshot the message was built from
+        """
+        resync = None
+
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                if resync is None:
+                    resync = self._full_message(snapshot)
+                queue.put_nowait(resync)
+
+        self.messages_sent += 1
+
+    async def run(self):
+        """
+        Poll loop, runs while there are subscribers
+        """
+        while self.subscribers:
+            snapshot = self.get_snapshot()
+
+            if snapshot is not None and (self.last_snapshot is None or snapshot.version != self.last_snapshot.version):
+                if self.last_snapshot is None or snapshot.version < self.last_snapshot.version:
+                    # First snapshot or a new counting run
+                    message = self._full_message(snapshot)
+                else:
+                    message = delta_message(self.last_snapshot, snapshot)
+
+                self.last_snapshot = snapshot
+
+                if message is not None:
+                    self._publish(message, snapshot)
+
+            await asyncio.sleep(self.interval)
+
+    def get_stats(self):
+        """
+        Get broadcaster statistics
+
+        Returns:
+            dict: Subscriber count, queue depths and messages sent
+        """
+        return {
+            "subscribers": len(self.subscribers),
+            "queue_depths": [queue.qsize() for queue in self.subscribers],
+            "messages_sent": self.messages_sent,
+            "version": self.last_snapshot.version if self.last_snapshot is not None else None
+        }
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules import each other by flat name (as when run from src/vehicle_counter)
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if MODULE_DIR not in sys.path:
+    sys.path.insert(0, MODULE_DIR)
@@ -0,0 +1,86 @@
+import event_log
+from event_log import EVENT_CROSSING, EVENT_ZONE_SAMPLE, FLAG_STALLED, EventLogReader, EventLogWriter
+
+
+class FakeTime:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_small_batches_are_written_after_fsync_interval(tmp_path, monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(event_log, "time", clock)
+
+    writer = EventLogWriter(str(tmp_path), fsync_interval=5.0, flush_records=1024)
+    writer.log_crossing(clock.now, 1, zone_id=3, vehicle_id=7)
+
+    writer.flush()
+    assert writer.records_written == 0
+
+    clock.now += 5.0
+    writer.flush()
+    assert writer.records_written == 1
+
+    # Readable before the writer is closed (and after a crash)
+    records = EventLogReader(str(tmp_path)).crossings(zone_id=3)
+    assert records["value"].tolist() == [7]
+    assert records["kind"].tolist() == [EVENT_CROSSING]
+
+    writer.close()
+
+
+def test_full_batch_is_written_before_fsync_interval(tmp_path, monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(event_log, "time", clock)
+
+    writer = EventLogWriter(str(tmp_path), fsync_interval=5.0, flush_records=4)
+    for vehicle_id in range(4):
+        writer.log_crossing(clock.now, vehicle_id, zone_id=1, vehicle_id=vehicle_id)
+
+    writer.flush()
+    assert writer.records_written == 4
+
+    writer.close()
+
+
+def test_round_trip_across_segments(tmp_path):
+    # Room for 4 records per segment
+    writer = EventLogWriter(str(tmp_path), segment_bytes=16 + 4 * 26, flush_records=2)
+    start = 1_700_000_000.0
+
+    for second in range(10):
+        writer.log_crossing(start + second, second, zone_id=1 + second % 2, vehicle_id=100 + second)
+        writer.append(EVENT_ZONE_SAMPLE, start + second, zone_id=1, value=second, frame=second,
+                      occupancy=second % 3, flags=FLAG_STALLED if second == 4 else 0)
+        writer.flush()
+    writer.close()
+
+    reader = EventLogReader(str(tmp_path))
+    assert len(reader.segments()) == 5
+    assert len(reader.query()) == 20
+
+    records = reader.query(start + 3, start + 7)
+    assert records["timestamp"].tolist() == [start + second for second in range(3, 7) for _ in range(2)]
+
+    assert reader.crossings(zone_id=2)["value"].tolist() == [101, 103, 105, 107, 109]
+
+    timestamps, counts, occupancy, stalled = reader.zone_counts(1, start + 2, start + 6)
+    assert timestamps.tolist() == [start + second for second in range(2, 6)]
+    assert counts.tolist() == [2, 3, 4, 5]
+    assert occupancy.tolist() == [2, 0, 1, 2]
+    assert stalled.tolist() == [False, False, True, False]
+
+
+def test_partial_last_record_is_ignored(tmp_path):
+    writer = EventLogWriter(str(tmp_path))
+    writer.log_crossing(1_700_000_000.0, 1, zone_id=1, vehicle_id=5)
+    writer.close()
+
+    # Crash in the middle of the next record
+    with open(writer.segment_path, "ab") as segment:
+        segment.write(b"\x00" * 10)
+
+    assert EventLogReader(str(tmp_path)).crossings()["value"].tolist() == [5]
@@ -0,0 +1,62 @@
+import numpy as np
+
+from frame_buffer import EncodedFrameBuffer
+
+VARIANTS = {"full": (None, 80), "preview": (32, 60)}
+
+
+def frame(value=0):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def test_get_returns_only_newer_frames():
+    buffer = EncodedFrameBuffer(VARIANTS)
+    assert buffer.get() is None
+
+    buffer.publish(frame(), {"counts": 1})
+    seq, data, metadata = buffer.get()
+    assert seq == 1
+    assert data[:2] == b"\xff\xd8"
+    assert metadata == {"counts": 1}
+
+    assert buffer.get(after_seq=seq) is None
+
+    buffer.publish(frame(255))
+    assert buffer.get(after_seq=seq)[0] == 2
+
+
+def test_each_variant_is_encoded_once_per_frame():
+    buffer = EncodedFrameBuffer(VARIANTS)
+    buffer.publish(frame())
+
+    full = buffer.get("full")[1]
+    assert buffer.get("full")[1] is full
+    preview = buffer.get("preview")[1]
+    buffer.get("preview")
+    assert buffer.encode_count == 2
+    assert len(preview) < len(full)
+
+    # A new frame invalidates the cached encodings
+    buffer.publish(frame(255))
+    assert buffer.get("full")[1] != full
+    assert buffer.encode_count == 3
+
+
+def test_clear_keeps_sequence_increasing():
+    buffer = EncodedFrameBuffer(VARIANTS)
+    buffer.publish(frame())
+    buffer.clear()
+    assert buffer.get() is None
+
+    buffer.publish(frame())
+    assert buffer.get()[0] == 2
+
+
+def test_select_variant_picks_smallest_wide_enough_variant():
+    buffer = EncodedFrameBuffer()
+
+    assert buffer.select_variant() == "full"
+    assert buffer.select_variant(quality=50) == "full_low"
+    assert buffer.select_variant(width=800) == "medium"
+    assert buffer.select_variant(width=320) == "preview"
+    assert buffer.select_variant(width=4000) == "full"
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from frame_pipeline import FramePipeline
+
+
+def source(count):
+    items = iter(range(count))
+    return lambda: next(items, None)
+
+
+def test_all_items_reach_the_last_stage_before_shutdown():
+    results = []
+
+    pipeline = FramePipeline(queue_size=2)
+    pipeline.add_stage("source", source(50))
+    pipeline.add_stage("double", lambda item: item * 2)
+    pipeline.add_stage("sink", results.append)
+    pipeline.start()
+    pipeline.join(timeout=5.0)
+
+    assert not pipeline.is_running()
+    assert results == [item * 2 for item in range(50)]
+    assert pipeline.get_stats()["sink"]["processed"] == 50
+
+
+def test_stop_releases_stages_blocked_on_full_queues():
+    release = threading.Event()
+
+    pipeline = FramePipeline(queue_size=1)
+    pipeline.add_stage("source", lambda: 1)
+    pipeline.add_stage("slow", lambda item: item)
+    pipeline.add_stage("sink", lambda item: release.wait(5.0))
+    pipeline.start()
+
+    # Wait until the sink holds an item and the queues behind it are full
+    while pipeline.stages[2].input_queue.qsize() == 0:
+        time.sleep(0.01)
+
+    pipeline.stop()
+    release.set()
+    pipeline.join(timeout=5.0)
+
+    assert not pipeline.is_running()
+
+
+def test_failing_stage_stops_the_pipeline():
+    def fail(item):
+        if item == 3:
+            raise RuntimeError("broken frame")
+        return item
+
+    pipeline = FramePipeline()
+    pipeline.add_stage("source", source(1_000_000))
+    pipeline.add_stage("fail", fail)
+    pipeline.add_stage("sink", lambda item: None)
+    pipeline.start()
+    pipeline.join(timeout=5.0)
+
+    assert not pipeline.is_running()
+    assert pipeline.stop_event.is_set()
+    assert pipeline.get_stats()["fail"]["processed"] == 3
@@ -0,0 +1,70 @@
+from track_table import TrackTable
+
+
+def test_zone_masks_grow_past_one_word():
+    table = TrackTable(capacity=4)
+
+    bits = table.zone_bits(list(range(1, 131)))
+
+    assert len(set(bits)) == 130
+    assert table.zone_words() == 3
+    assert table.entered_zones.shape == (4, 3)
+    assert table.zone_entry_times.shape == (4, 3 * TrackTable.ZONES_PER_WORD)
+
+
+def test_bits_of_removed_zones_are_recycled_before_growing():
+    table = TrackTable(capacity=4)
+    table.zone_bits(list(range(1, 65)))
+
+    slot = table.allocate(1, [0, 0, 10, 10], 0.0)
+    word, mask = table.bit_mask(table.zone_bit_index[1])
+    table.entered_zones[slot, word] |= mask
+
+    # Zone 1 is gone, zone 100 takes its bit
+    bits = table.zone_bits(list(range(2, 65)) + [100])
+
+    assert table.zone_words() == 1
+    assert bits[-1] == 0
+    assert not table.entered_zones[slot, word] & mask
+
+
+def test_released_slots_are_reused_lowest_first():
+    table = TrackTable(capacity=3)
+    slots = [table.allocate(vehicle_id, [0, 0, 10, 10], 0.0) for vehicle_id in (1, 2, 3)]
+    assert slots == [0, 1, 2]
+    assert table.free_count() == 0
+
+    table.release([2, 0])
+    assert len(table) == 1
+    assert table.active.tolist() == [False, True, False]
+
+    assert table.allocate(4, [0, 0, 10, 10], 1.0) == 0
+    assert table.allocate(5, [0, 0, 10, 10], 1.0) == 2
+    assert table.ids.tolist() == [4, 2, 5]
+
+
+def test_release_forgets_zone_history():
+    table = TrackTable(capacity=2)
+    table.zone_bits([7])
+    slot = table.allocate(1, [0, 0, 10, 10], 0.0)
+    table.entered_zones[slot, 0] = 1
+    table.in_zones[slot, 0] = 1
+
+    table.release([slot])
+    slot = table.allocate(2, [0, 0, 10, 10], 1.0)
+
+    assert table.entered_zones[slot, 0] == 0
+    assert table.in_zones[slot, 0] == 0
+    assert table.hits[slot] == 1
+    assert table.misses[slot] == 0
+
+
+def test_oldest_returns_least_recently_seen_live_slots():
+    table = TrackTable(capacity=4)
+    for vehicle_id, last_seen in ((1, 3.0), (2, 1.0), (3, 2.0), (4, 0.5)):
+        table.allocate(vehicle_id, [0, 0, 10, 10], last_seen)
+    table.release([3])
+
+    assert table.oldest(2).tolist() == [1, 2]
+    assert table.oldest(2, exclude=[1]).tolist() == [2, 0]
+    assert table.oldest(10).tolist() == [1, 2, 0]
@@ -0,0 +1,55 @@
+import numpy as np
+
+import vehicle_detector
+from vehicle_detector import VehicleDetector
+from zone_manager import Zone, ZoneManager
+
+
+class RecordingBackend:
+    """
+    Backend that finds one car in the top-left corner of every image
+    """
+
+    names = {}
+
+    def __init__(self):
+        self.image_shapes = []
+
+    def predict(self, images, imgsz=None, classes=None, conf=0.25, iou=0.7, max_det=300):
+        self.image_shapes.extend(image.shape[:2] for image in images)
+        return [np.array([[0, 0, 10, 10, 0.9, 2]], dtype=np.float32) for _ in images]
+
+
+def make_detector(monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr(vehicle_detector, "create_backend", lambda *args, **kwargs: backend)
+    return VehicleDetector(), backend
+
+
+def zone_rois(detector, x, y):
+    manager = ZoneManager()
+    manager.create_zone([(x, y), (x + 100, y), (x + 100, y + 100), (x, y + 100)], Zone.ZONE_TYPE_COUNT)
+    return detector.make_rois(manager.zones, (480, 640), padding=0)
+
+
+def test_rois_belong_to_the_camera_not_the_detector(monkeypatch):
+    detector, backend = make_detector(monkeypatch)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    first = zone_rois(detector, 100, 50)
+    second = zone_rois(detector, 400, 300)
+
+    assert detector.detect_vehicles(frame, rois=first).boxes.tolist() == [[100, 50, 110, 60]]
+    assert detector.detect_vehicles(frame, rois=second).boxes.tolist() == [[400, 300, 410, 310]]
+
+    # A camera without crops still runs on the full frame
+    assert detector.detect_vehicles(frame).boxes.tolist() == [[0, 0, 10, 10]]
+    assert backend.image_shapes == [(100, 100), (100, 100), (480, 640)]
+
+
+def test_large_zones_keep_full_frame_inference(monkeypatch):
+    detector, _ = make_detector(monkeypatch)
+    manager = ZoneManager()
+    manager.create_zone([(0, 0), (640, 0), (640, 480), (0, 480)], Zone.ZONE_TYPE_SUM)
+
+    assert detector.make_rois(manager.zones, (480, 640)) is None
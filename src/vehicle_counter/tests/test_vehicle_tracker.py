@@ -0,0 +1,172 @@
+from detections import DetectionBatch
+from vehicle_tracker import VehicleTracker
+from zone_manager import Zone, ZoneManager
+
+FPS = 30.0
+
+
+def count_zones(width=1200, spacing=100):
+    """
+    Narrow COUNT zones across a horizontal road
+    """
+    manager = ZoneManager()
+    for x in range(0, width, spacing):
+        manager.create_zone([(x, 0), (x + 50, 0), (x + 50, 200), (x, 200)], Zone.ZONE_TYPE_COUNT)
+    return manager.zones
+
+
+def batch(*boxes):
+    return DetectionBatch.from_lists(boxes, [0.9] * len(boxes), [2] * len(boxes))
+
+
+def drive(tracker, zones, frames, speed, size=40, frame_step=1):
+    """
+    One vehicle moving right by `speed` px per frame; the tracker sees every `frame_step`-th frame
+
+    Returns:
+        set: Vehicle IDs given to the vehicle
+    """
+    ids = set()
+    for frame in range(0, frames, frame_step):
+        x = frame * speed
+        detections = batch([x, 80, x + size, 120])
+        tracker.track_vehicles(None, detections, zones, frame_step, current_time=frame / FPS)
+        ids.update(detections.track_ids.tolist())
+    return ids
+
+
+def test_fast_vehicle_keeps_one_id():
+    zones = count_zones()
+    tracker = VehicleTracker()
+    tracker.initialize_zones(zones)
+
+    # 30 px per frame with a 40 px box: consecutive boxes overlap with IoU < 0.3
+    ids = drive(tracker, zones, 40, speed=30)
+
+    assert len(ids) == 1
+    assert [zone.vehicle_count for zone in zones] == [1] * len(zones)
+
+
+def test_fast_vehicles_in_adjacent_lanes_keep_their_ids():
+    tracker = VehicleTracker()
+    lane_ids = ([], [])
+
+    for frame in range(30):
+        x = frame * 30
+        detections = batch([x, 80, x + 40, 120], [x + 15, 130, x + 55, 170])
+        tracker.track_vehicles(None, detections, [], current_time=frame / FPS)
+        lane_ids[0].append(int(detections.track_ids[0]))
+        lane_ids[1].append(int(detections.track_ids[1]))
+
+    assert len(set(lane_ids[0])) == 1
+    assert len(set(lane_ids[1])) == 1
+    assert lane_ids[0][0] != lane_ids[1][0]
+
+
+def test_reduced_frame_rate_keeps_one_id():
+    zones = count_zones()
+    tracker = VehicleTracker()
+    tracker.initialize_zones(zones)
+
+    # Detection on every third frame: 36 px between observations
+    ids = drive(tracker, zones, 120, speed=12, frame_step=3)
+
+    assert len(ids) == 1
+    assert [zone.vehicle_count for zone in zones] == [1] * len(zones)
+
+
+def test_coasting_track_is_dropped_after_max_age():
+    tracker = VehicleTracker(max_age=5)
+    zones = []
+
+    for frame in range(5):
+        tracker.track_vehicles(None, batch([10 * frame, 0, 10 * frame + 40, 40]), zones, current_time=frame / FPS)
+    assert len(tracker.tracks) == 1
+
+    for frame in range(5, 10):
+        tracker.track_vehicles(None, batch(), zones, current_time=frame / FPS)
+    assert len(tracker.tracks) == 1
+
+    tracker.track_vehicles(None, batch(), zones, current_time=10 / FPS)
+    assert len(tracker.tracks) == 0
+    assert len(tracker.motion_model) == 0
+
+
+def test_unconfirmed_track_survives_one_miss_only():
+    tracker = VehicleTracker(min_hits=3)
+
+    tracker.track_vehicles(None, batch([0, 0, 40, 40]), [], current_time=0.0)
+    tracker.track_vehicles(None, batch(), [], current_time=1 / FPS)
+    assert len(tracker.tracks) == 1
+
+    tracker.track_vehicles(None, batch(), [], current_time=2 / FPS)
+    assert len(tracker.tracks) == 0
+
+
+def test_reused_detections_keep_tracks_and_ids():
+    zones = count_zones()
+    tracker = VehicleTracker()
+    tracker.initialize_zones(zones)
+
+    detections = batch([10, 80, 50, 120])
+    tracker.track_vehicles(None, detections, zones, current_time=0.0)
+    vehicle_id = int(detections.track_ids[0])
+
+    # Detector skipped for 10 s (nothing moved): the track must not expire
+    for frame in range(1, 300):
+        reused = detections.share()
+        tracker.track_vehicles(None, reused, zones, current_time=frame / FPS * 10)
+        assert reused.track_ids.tolist() == [vehicle_id]
+        assert not reused.is_new.any()
+
+    assert zones[0].vehicle_count == 1
+
+
+def test_more_than_64_zones_are_counted():
+    zones = count_zones(width=15000)
+    assert len(zones) > 64
+
+    tracker = VehicleTracker()
+    tracker.initialize_zones(zones)
+
+    ids = drive(tracker, zones, 510, speed=30)
+
+    assert len(ids) == 1
+    assert [zone.vehicle_count for zone in zones] == [1] * len(zones)
+
+
+def test_vehicle_ids_are_never_reused_after_expiry():
+    tracker = VehicleTracker(max_tracks=2)
+    seen_ids = []
+
+    for session in range(4):
+        start = session * 10.0
+        for frame in range(3):
+            detections = batch([0, 0, 40, 40])
+            tracker.track_vehicles(None, detections, [], current_time=start + frame / FPS)
+            seen_ids.extend(detections.track_ids.tolist())
+
+        # The vehicle leaves and its track expires; its slot is free again
+        tracker.cleanup_stale_tracks(start + 9.0, timeout=5.0)
+        assert len(tracker.tracks) == 0
+
+    assert seen_ids == [1, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 4]
+
+
+def test_full_table_evicts_least_recently_seen_track():
+    tracker = VehicleTracker(max_tracks=2)
+
+    old = batch([0, 0, 40, 40])
+    tracker.track_vehicles(None, old, [], current_time=0.0)
+    recent = batch([0, 0, 40, 40], [200, 0, 240, 40])
+    tracker.track_vehicles(None, recent, [], current_time=1 / FPS)
+    old_id, recent_id = recent.track_ids.tolist()
+
+    # A third vehicle: only the track not seen the longest may be evicted
+    tracker.track_vehicles(None, batch([200, 0, 240, 40]), [], current_time=2 / FPS)
+    tracker.track_vehicles(None, batch([200, 0, 240, 40], [400, 0, 440, 40]), [], current_time=3 / FPS)
+
+    live_ids = set(tracker.tracks.ids[tracker.tracks.active].tolist())
+    assert live_ids == {recent_id, recent_id + 1}
+    assert old_id not in live_ids
+    assert len(tracker.motion_model) == 2
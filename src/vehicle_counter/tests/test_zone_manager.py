@@ -0,0 +1,27 @@
+import numpy as np
+
+from zone_manager import Zone, ZoneManager
+
+
+def square_zone_manager(x):
+    manager = ZoneManager()
+    manager.create_zone([(x, 0), (x + 50, 0), (x + 50, 50), (x, 50)], Zone.ZONE_TYPE_COUNT)
+    return manager
+
+
+def test_each_manager_keeps_its_own_label_map():
+    first = square_zone_manager(0)
+    second = square_zone_manager(100)
+    points = np.array([[25, 25], [125, 25]])
+
+    assert first.zones_for_points(points).tolist() == [[True], [False]]
+    assert second.zones_for_points(points).tolist() == [[False], [True]]
+    first_map = first.label_map_cache[1]
+    second_map = second.label_map_cache[1]
+
+    # Alternating streams must not rebuild each other's map
+    for _ in range(3):
+        first.zones_for_points(points)
+        second.zones_for_points(points)
+    assert first.label_map_cache[1] is first_map
+    assert second.label_map_cache[1] is second_map
@@ -0,0 +1,188 @@
+import numpy as np
+
+
+class TrackTable:
+    """
+    Fixed-capacity track store.
+    Every live track occupies one slot of preallocated arrays (vehicle ID, last
+    box, last_seen time, hit/miss counters, zone bitmasks and zone entry times).
+    Freed slots go on a free-list and are reused, so memory is bounded by the
+    number of concurrent tracks instead of the number of vehicles ever seen.
+    """
+
+    ZONES_PER_WORD = 64  # one bit per zone, masks grow by one uint64 word per 64 zones
+
+    __slots__ = ("capacity", "ids", "boxes", "last_seen", "hits", "misses", "active", "entered_zones",
+                 "in_zones", "zone_entry_times", "free_slots", "zone_bit_index")
+
+    def __init__(self, capacity=1024):
+        """
+        Args:
+            capacity (int): Maximum number of concurrent tracks
+        """
+        self.capacity = capacity
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.boxes = np.zeros((capacity, 4), dtype=np.float32)
+        self.last_seen = np.zeros(capacity, dtype=np.float64)
+        self.hits = np.zeros(capacity, dtype=np.int32)  # Matched detections
+        self.misses = np.zeros(capacity, dtype=np.int32)  # Detection frames missed in a row
+        self.active = np.zeros(capacity, dtype=bool)
+        self.entered_zones = np.zeros((capacity, 1), dtype=np.uint64)  # COUNT zones ever entered
+        self.in_zones = np.zeros((capacity, 1), dtype=np.uint64)  # Zones the center was in on the last frame
+        self.zone_entry_times = np.zeros((capacity, self.ZONES_PER_WORD), dtype=np.float64)
+
+        # Lowest slot is handed out first
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.zone_bit_index = {}  # {zone_id: bit}
+
+    def __len__(self):
+        return self.capacity - len(self.free_slots)
+
+    def free_count(self):
+        return len(self.free_slots)
+
+    def allocate(self, vehicle_id, box, current_time):
+        """
+        Take a free slot for a new track
+
+        Args:
+            vehicle_id (int): Vehicle ID
+            box (array-like): [x1, y1, x2, y2]
+            current_time (float): Current time
+
+        Returns:
+            int: Slot
+
+        Raises:
+            IndexError: No free slot
+        """
+        slot = self.free_slots.pop()
+
+        self.ids[slot] = vehicle_id
+        self.boxes[slot] = box
+        self.last_seen[slot] = current_time
+        self.hits[slot] = 1
+        self.misses[slot] = 0
+        self.active[slot] = True
+
+        return slot
+
+    def release(self, slots):
+        """
+        Free slots and forget their zone history
+
+        Args:
+            slots (array-like): Slots
+        """
+        slots = np.asarray(slots, dtype=np.intp)
+        if len(slots) == 0:
+            return
+
+        self.active[slots] = False
+        self.ids[slots] = 0
+        self.entered_zones[slots] = 0
+        self.in_zones[slots] = 0
+        self.free_slots.extend(slots.tolist())
+
+    def touch(self, slots, boxes, current_time):
+        """
+        Store the matched boxes of tracks
+
+        Args:
+            slots (numpy.ndarray): Slots
+            boxes (numpy.ndarray): Boxes of the slots N x 4
+            current_time (float): Current time
+        """
+        self.boxes[slots] = boxes
+        self.last_seen[slots] = current_time
+        self.hits[slots] += 1
+        self.misses[slots] = 0
+
+    def oldest(self, count, exclude=()):
+        """
+        Least recently seen live slots
+
+        Args:
+            count (int): Number of slots
+            exclude (array-like): Slots never returned
+
+        Returns:
+            numpy.ndarray: Up to `count` slots, oldest first
+        """
+        last_seen = np.where(self.active, self.last_seen, np.inf)
+        last_seen[np.asarray(exclude, dtype=np.intp)] = np.inf
+
+        candidates = np.flatnonzero(np.isfinite(last_seen))
+        if len(candidates) <= count:
+            return candidates[np.argsort(last_seen[candidates], kind="stable")]
+
+        nearest = np.argpartition(last_seen[candidates], count)[:count]
+        slots = candidates[nearest]
+        return slots[np.argsort(last_seen[slots], kind="stable")]
+
+    def zone_words(self):
+        """
+        Number of uint64 words per zone mask
+        """
+        return self.entered_zones.shape[1]
+
+    @classmethod
+    def bit_mask(cls, bit):
+        """
+        Word index and single-bit mask of a zone bit
+
+        Args:
+            bit (int): Zone bit
+
+        Returns:
+            tuple: (word, numpy.uint64 mask)
+        """
+        return bit // cls.ZONES_PER_WORD, np.uint64(1 << (bit % cls.ZONES_PER_WORD))
+
+    def zone_bits(self, zone_ids):
+        """
+        Bit of every zone in the zone masks. Bits of zones that no longer
+        exist are recycled before the masks grow by another word.
+
+        Args:
+            zone_ids (list): IDs of the current zones
+
+        Returns:
+            list: Bit index per zone
+        """
+        if any(zone_id not in self.zone_bit_index for zone_id in zone_ids):
+            capacity_bits = self.zone_words() * self.ZONES_PER_WORD
+            if len(self.zone_bit_index) + len(set(zone_ids) - self.zone_bit_index.keys()) > capacity_bits:
+                self._drop_zones(set(self.zone_bit_index) - set(zone_ids))
+
+            while len(set(self.zone_bit_index) | set(zone_ids)) > self.zone_words() * self.ZONES_PER_WORD:
+                self._add_zone_word()
+
+            used = set(self.zone_bit_index.values())
+            free_bits = [bit for bit in range(self.zone_words() * self.ZONES_PER_WORD) if bit not in used]
+
+            for zone_id in zone_ids:
+                if zone_id not in self.zone_bit_index:
+                    self.zone_bit_index[zone_id] = free_bits.pop(0)
+
+        return [self.zone_bit_index[zone_id] for zone_id in zone_ids]
+
+    def _add_zone_word(self):
+        """
+        Room for 64 more zones in every slot
+        """
+        empty_words = np.zeros((self.capacity, 1), dtype=np.uint64)
+        self.entered_zones = np.hstack([self.entered_zones, empty_words])
+        self.in_zones = np.hstack([self.in_zones, empty_words])
+        self.zone_entry_times = np.hstack([
+            self.zone_entry_times, np.zeros((self.capacity, self.ZONES_PER_WORD), dtype=np.float64)
+        ])
+
+    def _drop_zones(self, zone_ids):
+        """
+        Forget removed zones and clear their bits in every slot
+        """
+        for zone_id in zone_ids:
+            word, mask = self.bit_mask(self.zone_bit_index.pop(zone_id))
+            self.entered_zones[:, word] &= ~mask
+            self.in_zones[:, word] &= ~mask
@@ -1,9 +1,12 @@
 import cv2
 import numpy as np
-import time
+
+from clock import SYSTEM_CLOCK
 
 class TrafficLightController:
-    def __init__(self):
+    def __init__(self, clock=None):
+        """Create the controller; clock provides now() (system time if None)"""
+        self.clock = clock or SYSTEM_CLOCK
         
         self.traffic_lights = {
             
@@ -52,7 +55,7 @@ class TrafficLightController:
         }
         
         
-        self.last_change_time = time.time()
+        self.last_change_time = self.clock.now()
         
         self.min_change_interval = 30
         
@@ -60,13 +63,19 @@ class TrafficLightController:
         
         self.auto_mode = True
         
-        self.last_auto_check = time.time()
+        self.last_auto_check = self.clock.now()
         
         self.auto_check_interval = 5
         
-    def switch_to_red(self, direction):
+    def reset_time(self, current_time):
+        """Restart the change and auto-check timers from the given time"""
+        self.last_change_time = current_time
+        self.last_auto_check = current_time
+    
+    def switch_to_red(self, direction, current_time=None):
         """Change the light to red for the given direction"""
-        current_time = time.time()
+        if current_time is None:
+            current_time = self.clock.now()
         
         
         if self.traffic_lights[direction]["status"] != "RED":
@@ -81,11 +90,11 @@ class TrafficLightController:
             return True
         return False
     
-    def switch_to_blue(self, direction):
+    def switch_to_blue(self, direction, current_time=None):
         """Change the light to blue for the given direction"""
         if self.traffic_lights[direction]["status"] != "BLUE":
             self.traffic_lights[direction]["status"] = "BLUE"
-            self.traffic_lights[direction]["changed_time"] = time.time()
+            self.traffic_lights[direction]["changed_time"] = self.clock.now() if current_time is None else current_time
             self.traffic_lights[direction]["color"] = (255, 150, 0)  
             
             
@@ -94,11 +103,11 @@ class TrafficLightController:
             return True
         return False
     
-    def switch_to_green(self, direction):
+    def switch_to_green(self, direction, current_time=None):
         """Change the light to green for the given direction"""
         if self.traffic_lights[direction]["status"] != "GREEN":
             self.traffic_lights[direction]["status"] = "GREEN"
-            self.traffic_lights[direction]["changed_time"] = time.time()
+            self.traffic_lights[direction]["changed_time"] = self.clock.now() if current_time is None else current_time
             self.traffic_lights[direction]["color"] = (0, 255, 0)  
             
             
@@ -135,9 +144,10 @@ class TrafficLightController:
         self.auto_mode = not self.auto_mode
         return self.auto_mode
     
-    def check_light_durations(self):
+    def check_light_durations(self, current_time=None):
         """Check and automatically adjust traffic light durations"""
-        current_time = time.time()
+        if current_time is None:
+            current_time = self.clock.now()
         
         
         if not self.auto_mode or current_time - self.last_auto_check < self.auto_check_interval:
@@ -153,17 +163,18 @@ class TrafficLightController:
             
             if light["status"] == "RED" and current_time - light["changed_time"] > light["duration"]:
                 
-                if self.switch_to_blue(direction):
+                if self.switch_to_blue(direction, current_time):
                     changes_made = True
                     
         return changes_made
     
-    def handle_stalled_zone(self, zone):
+    def handle_stalled_zone(self, zone, current_time=None):
         """Turn off lights related to zones with stalled vehicles"""
         if not zone.is_stalled:
             return False
             
-        current_time = time.time()
+        if current_time is None:
+            current_time = self.clock.now()
         
         
         if current_time - self.last_change_time < self.min_change_interval:
@@ -180,18 +191,19 @@ class TrafficLightController:
             high_priority = True  
             self.adjust_light_duration(direction, len(zone.current_vehicles) * 2 if high_priority else len(zone.current_vehicles))
             
-            if self.switch_to_red(direction):
+            if self.switch_to_red(direction, current_time):
                 changes_made = True
                 print(f"WARNING: Vehicles stalled in zone {zone.name}, changing {self.direction_names.get(direction, direction)} direction to red!")
                 
         return changes_made
     
-    def handle_detection(self, zone):
+    def handle_detection(self, zone, current_time=None):
         """Turn off lights related to zones with vehicle detections"""
         if len(zone.current_vehicles) == 0:
             return False
         
-        current_time = time.time()
+        if current_time is None:
+            current_time = self.clock.now()
         
         
         # if current_time - zone.last_update_time < 0.0:
@@ -205,18 +217,19 @@ class TrafficLightController:
             
             self.adjust_light_duration(direction, len(zone.current_vehicles))
             
-            if self.switch_to_red(direction):
+            if self.switch_to_red(direction, current_time):
                 changes_made = True
                 print(f"NOTICE: Vehicles detected in zone {zone.name}, changing {self.direction_names.get(direction, direction)} direction to red!")
                 
         return changes_made
     
-    def handle_empty_zone(self, zone):
+    def handle_empty_zone(self, zone, current_time=None):
         """Turn on lights related to zones that have become empty"""
         if len(zone.current_vehicles) > 0:
             return False
             
-        current_time = time.time()
+        if current_time is None:
+            current_time = self.clock.now()
         
         
         if current_time - self.last_change_time < 5:
@@ -229,38 +242,46 @@ class TrafficLightController:
             
             self.adjust_light_duration(direction, 0)
             
-            if self.switch_to_blue(direction):
+            if self.switch_to_blue(direction, current_time):
                 changes_made = True
                 print(f"NOTICE: No vehicles in zone {zone.name}, changing {self.direction_names.get(direction, direction)} direction to blue!")
                 
         return changes_made
     
-    def manage_traffic_congestion(self, zones):
+    def manage_traffic_congestion(self, zones, current_time=None):
         """Check all zones and adjust lights for congested areas"""
+        if current_time is None:
+            current_time = self.clock.now()
+        
         changes_made = False
         
         
-        if self.check_light_durations():
+        if self.check_light_durations(current_time):
             changes_made = True
         
         
         for zone in zones:
             
             if zone.is_stalled:
-                if self.handle_stalled_zone(zone):
+                if self.handle_stalled_zone(zone, current_time):
                     changes_made = True
             elif len(zone.current_vehicles) == 0:
-                if self.handle_empty_zone(zone):
+                if self.handle_empty_zone(zone, current_time):
                     changes_made = True
             
             elif len(zone.current_vehicles) > 0:
-                if self.handle_detection(zone):
+                if self.handle_detection(zone, current_time):
                     changes_made = True
                 
         return changes_made
     
-    def draw_traffic_light_status(self, frame):
-        """Display traffic light status on screen"""
+    def overlay_state(self):
+        """Light statuses and recently changed directions, taken on the processing thread for drawing"""
+        return {direction: light["status"] for direction, light in self.traffic_lights.items()}, list(self.recently_changed)
+    
+    def draw_traffic_light_status(self, frame, state=None):
+        """Display traffic light status on screen (from overlay_state() if given, without touching the lights)"""
+        statuses, recently_changed = state or self.overlay_state()
         height, width = frame.shape[:2]
         light_size = 25
         margin = 10
@@ -289,12 +310,12 @@ class TrafficLightController:
             
             
             for direction in directions:
-                light = self.traffic_lights[direction]
+                status = statuses[direction]
                 
                 
-                if light["status"] == "RED":
+                if status == "RED":
                     color = (0, 0, 255)  
-                elif light["status"] == "BLUE":
+                elif status == "BLUE":
                     color = (255, 150, 0)  
                 else:
                     color = (0, 255, 0)  
@@ -316,12 +337,12 @@ class TrafficLightController:
             y_offset += 10
         
         
-        if self.recently_changed:
-            num_display = min(3, len(self.recently_changed))  
-            short_directions = [self.direction_names.get(d, d) for d in self.recently_changed[:num_display]]
+        if recently_changed:
+            num_display = min(3, len(recently_changed))  
+            short_directions = [self.direction_names.get(d, d) for d in recently_changed[:num_display]]
             
-            if len(self.recently_changed) > num_display:
-                notification = "Red lights: " + ", ".join(short_directions) + f"... +{len(self.recently_changed) - num_display}"
+            if len(recently_changed) > num_display:
+                notification = "Red lights: " + ", ".join(short_directions) + f"... +{len(recently_changed) - num_display}"
             else:
                 notification = "Red lights: " + ", ".join(short_directions)
                 
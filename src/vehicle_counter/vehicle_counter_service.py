@@ -1,15 +1,28 @@
 import cv2
 import time
 import os
+import threading
 import json
+from collections import deque
 from datetime import datetime
 import numpy as np
 
-from vehicle_detector import VehicleDetector
+from vehicle_detector import VehicleDetector, empty_detections
+from detections import DetectionBatch
 from zone_manager import Zone, ZoneManager
 from vehicle_tracker import VehicleTracker
 from zone_setup import ZoneSetupUI
 from traffic_light_controller import TrafficLightController
+from frame_pipeline import FramePipeline
+from motion_gate import MotionGate
+from event_log import EventLogWriter
+from snapshot import build_snapshot
+from frame_buffer import EncodedFrameBuffer
+from clock import FrameClock
+from latency import StageTimer
+from profiler import SamplingProfiler
+from metrics import (FRAMES_PROCESSED, FRAMES_DROPPED, DETECTIONS_SKIPPED, INFERENCE_SECONDS,
+                     ZONE_CROSSINGS, STALL_EVENTS, LIGHT_TRANSITIONS)
 
 
 class VehicleCounterService:
@@ -17,7 +30,8 @@ class VehicleCounterService:
     Main service for vehicle counting
     """
     
-    def __init__(self, video_path=None, model_path="yolov8s.pt", device="cpu", output_path="data", custom_zones=None):
+    def __init__(self, video_path=None, model_path="yolov8s.pt", device="cpu", output_path="data", custom_zones=None,
+                 detector=None, name=None, backend="ultralytics", threads=None, detection=None):
         """
         Initialize vehicle counting service
         
@@ -27,6 +41,13 @@ class VehicleCounterService:
             device (str): Device to use (cpu, cuda, mps)
             output_path (str): Output data path
             custom_zones (list): Custom zones provided by user
+            detector (VehicleDetector): Detector shared with other services (None creates a new one)
+            name (str): Stream name (window title and metrics label; the label is derived
+                        from the video source when not given)
+            backend (str): Detector backend: ultralytics, onnxruntime or openvino
+            threads (int): CPU threads of the onnxruntime/openvino backends
+            detection (dict): Detection settings of this camera: classes, conf, iou, max_det
+                              (None = detector defaults)
         """
         self.video_path = video_path
         self.model_path = model_path
@@ -34,16 +55,54 @@ class VehicleCounterService:
         self.output_path = output_path
         self.custom_zones = custom_zones
         
-        self.detector = VehicleDetector(model_path, device)
-        self.zone_manager = ZoneManager()
-        self.tracker = VehicleTracker()
-        self.traffic_light_controller = TrafficLightController()
+        self.name = name or "Vehicle Counter"
+        self.stream_label = name or self._source_label(video_path)
+        self.detector = detector if detector is not None else VehicleDetector(model_path, device, backend, threads)
+        self.detection_settings = self.detector.make_settings(**detection) if detection else None
+        self.detection_rois = None  # Zone crops of this camera (set by start_counting with roi_inference)
+        # Sampled once per frame and shared by zones, tracker and traffic lights
+        self.clock = FrameClock()
+        self.zone_manager = ZoneManager(clock=self.clock)
+        self.tracker = VehicleTracker(clock=self.clock, zone_manager=self.zone_manager)
+        self.traffic_light_controller = TrafficLightController(clock=self.clock)
         
         self.cap = None
         self.frame_count = 0
         self.start_time = None
         self.fps = 0
         self.processing = False
+        self.event_log = None
+        self.last_event_sample_time = None
+        self.event_sample_interval = 1.0
+        self.last_statistics_time = None
+        self.statistics_interval = 5
+        self.pipeline = None
+        self.motion_gate = None
+        self.last_detections = empty_detections()
+        self.frames_since_detection = 0  # Frames whose detector run was skipped since the last detected frame
+        self.snapshot = None
+        self.snapshot_version = 0
+        self.snapshot_interval = 0.1
+        self.last_snapshot_time = 0
+        self._statistics_payload = None
+        self._statistics_payload_time = None
+        self.frame_buffer = EncodedFrameBuffer()
+        self.offline = False
+        self.clock_base = None
+        self.frame_times = deque()  # Video timestamps of frames read but not yet tracked (offline)
+        self.frames_read = 0
+        self.last_frame_time = None
+        self.stage_timer = StageTimer()
+        self.last_output_time = None
+        self.processing_thread_id = None
+        self.profiler = SamplingProfiler()
+        # Prometheus children of this stream, only written by the processing thread
+        self.frames_processed_metric = FRAMES_PROCESSED.labels(self.stream_label)
+        self.tracking_errors_metric = FRAMES_DROPPED.labels(self.stream_label, "tracking_error")
+        self.detections_skipped_metric = DETECTIONS_SKIPPED.labels(self.stream_label)
+        self.inference_metric = INFERENCE_SECONDS.labels(self.stream_label)
+        self.stalled_zone_ids = set()
+        self.light_statuses = {}
         
         os.makedirs(output_path, exist_ok=True)
     
@@ -228,18 +287,704 @@ class VehicleCounterService:
         with open(filename, "w") as f:
             json.dump(data, f, indent=2)
     
-    def start_counting(self, display=True, save_data=True, save_video=False):
+    @staticmethod
+    def _source_label(video_path):
         """
-        Start vehicle counting process
+        Metrics label of an unnamed stream, taken from its video source
+        
+        Args:
+            video_path (str): Video file path or URL (None for camera)
+            
+        Returns:
+            str: "camera0" or the file name without extension
+        """
+        if not video_path:
+            return "camera0"
+        
+        source = str(video_path).rstrip("/")
+        return os.path.splitext(os.path.basename(source))[0] or source
+    
+    def _unpack_detections(self, detections):
+        """
+        Normalize detector output to a DetectionBatch
+        
+        Args:
+            detections: Detector output (DetectionBatch, (boxes, scores, class_ids) tuple or list of dicts)
+            
+        Returns:
+            DetectionBatch: Detections of the frame
+        """
+        if isinstance(detections, DetectionBatch):
+            return detections
+        
+        if isinstance(detections, tuple) and len(detections) == 3:
+            return DetectionBatch.from_lists(*detections)
+        
+        boxes = []
+        scores = []
+        class_ids = []
+        
+        if detections:
+            for det in detections:
+                if isinstance(det, dict) and 'box' in det:
+                    x1, y1, x2, y2 = det['box']
+                    boxes.append([x1, y1, x2, y2])
+                    scores.append(det.get('confidence', 1.0))
+                    class_ids.append(det.get('class_id', 0))
+        
+        return DetectionBatch.from_lists(boxes, scores, class_ids)
+    
+    def _read_frames(self, count):
+        """
+        Read up to `count` frames from the video capture
+        
+        Args:
+            count (int): Maximum number of frames to read
+            
+        Returns:
+            list: Frames read (empty when the video ended)
+        """
+        started = time.perf_counter()
+        frames = []
+        
+        while len(frames) < count and self.cap.isOpened():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+            self.frames_read += 1
+            
+            if self.offline:
+                self.frame_times.append(self._video_time())
+        
+        if frames:
+            self.stage_timer.since("capture", started, len(frames))
+        
+        return frames
+    
+    def _video_time(self):
+        """
+        Position of the frame just read in the video (seconds)
+        
+        Returns:
+            float: Video timestamp
+        """
+        msec = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        
+        # Some backends do not report positions: derive it from the frame rate
+        if msec <= 0 and self.frames_read > 1:
+            fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+            msec = (self.frames_read - 1) * 1000.0 / fps
+        
+        return msec / 1000.0
+    
+    def _frame_time(self):
+        """
+        Advance the shared clock to the next frame to track: the video
+        timestamp in offline mode, the wall clock otherwise
+        
+        Returns:
+            float: Frame time
+        """
+        if self.offline and self.frame_times:
+            return self.clock.tick(self.clock_base + self.frame_times.popleft())
+        return self.clock.tick()
+    
+    def _detect_frames(self, frames):
+        """
+        Run detection on a list of frames.
+        With the motion gate on, frames without motion inside the zones reuse the previous detections.
+        
+        Args:
+            frames (list): Image frames
+            
+        Returns:
+            list: (boxes, scores, class_ids) per frame
+        """
+        started = time.perf_counter()
+        run_detection = self._gate_frames(frames)
+        detect_frames = [frame for frame, run in zip(frames, run_detection) if run]
+        detect_started = time.perf_counter()
+        
+        if len(detect_frames) == 1:
+            detected = [self.detector.detect_vehicles(detect_frames[0], self.detection_settings, self.detection_rois)]
+        elif detect_frames:
+            detected = self.detector.detect_vehicles_batch(detect_frames, self.detection_settings, self.detection_rois)
+        else:
+            detected = []
+        
+        detected_time = time.perf_counter()
+        detections = self._fill_skipped_detections(run_detection, detected)
+        
+        self._record_inference(len(frames), time.perf_counter() - started,
+                               len(detect_frames), detected_time - detect_started)
+        
+        return detections
+    
+    def _record_inference(self, frame_count, stage_seconds, detect_count, detect_seconds):
+        """
+        Record the inference stage latency, the detector time and the skipped detections
+        
+        Args:
+            frame_count (int): Frames handled, detected and skipped
+            stage_seconds (float): Time of the whole stage (motion gate included)
+            detect_count (int): Frames that went through the detector
+            detect_seconds (float): Time spent in the detector
+        """
+        if frame_count == 0:
+            return
+        
+        self.stage_timer.record("inference", stage_seconds, frame_count)
+        
+        # Only frames that went through the detector
+        if detect_count:
+            per_frame = detect_seconds / detect_count
+            for _ in range(detect_count):
+                self.inference_metric.observe(per_frame)
+        
+        skipped = frame_count - detect_count
+        if skipped:
+            self.detections_skipped_metric.inc(skipped)
+    
+    def _gate_frames(self, frames):
+        """
+        Decide for each frame whether the detector has to run
+        
+        Args:
+            frames (list): Image frames
+            
+        Returns:
+            list: bool per frame (always True when the motion gate is off)
+        """
+        if self.motion_gate is None:
+            return [True] * len(frames)
+        
+        if self.motion_gate.mask is None and frames:
+            self.motion_gate.set_zones(self.zone_manager.zones, frames[0].shape)
+        
+        return [self.motion_gate.should_detect(frame) for frame in frames]
+    
+    def _fill_skipped_detections(self, run_detection, detected):
+        """
+        Put the previous detections in place of skipped frames
+        
+        Args:
+            run_detection (list): bool per frame from _gate_frames
+            detected (list): Detections of the frames where run_detection is True
+            
+        Returns:
+            list: (boxes, scores, class_ids) per frame
+        """
+        detected = iter(detected)
+        results = []
+        
+        for run in run_detection:
+            if run:
+                self.last_detections = next(detected)
+                results.append(self.last_detections)
+            else:
+                # Same arrays, own tracking results
+                results.append(self.last_detections.share())
+        
+        return results
+    
+    def get_motion_gate_stats(self):
+        """
+        Get motion gate statistics
+        
+        Returns:
+            dict: Gate statistics (empty when the gate is off)
+        """
+        if self.motion_gate is None:
+            return {}
+        
+        return self.motion_gate.get_stats()
+    
+    def _process_frame(self, frame, detections, display, video_writer, save_data):
+        """
+        Track, update zones and lights, draw and save one detected frame
+        
+        Args:
+            frame (numpy.ndarray): Image frame
+            detections: Detector output for the frame
+            display (bool): Display video
+            video_writer (cv2.VideoWriter): Video writer or None
+            save_data (bool): Save data
+            
+        Returns:
+            bool: False if the user asked to stop
+        """
+        self.frame_count += 1
+        current_time = self._frame_time()
+        
+        tracked_objects, zone_vehicles = self._track_frame(frame, detections, current_time)
+        overlay = self._capture_overlay(current_time, display)
+        
+        return self._output_frame(frame, tracked_objects, zone_vehicles, current_time, overlay,
+                                  display, video_writer, save_data)
+    
+    def _track_frame(self, frame, detections, current_time):
+        """
+        Track vehicles, update zones, statistics and traffic lights for one frame
+        
+        Args:
+            frame (numpy.ndarray): Image frame
+            detections: Detector output for the frame
+            current_time (float): Frame time
+            
+        Returns:
+            tuple: (tracked_objects, zone_vehicles), tracked_objects is the DetectionBatch with vehicle IDs
+        """
+        timer = self.stage_timer
+        started = time.perf_counter()
+        
+        detections = self._unpack_detections(detections)
+        self.last_frame_time = current_time
+        
+        # The motion model steps over the skipped frames on the next detected frame
+        if detections.reused:
+            frame_step = 1
+            self.frames_since_detection += 1
+        else:
+            frame_step = self.frames_since_detection + 1
+            self.frames_since_detection = 0
+        
+        try:
+            tracked_objects, zone_vehicles = self.tracker.track_vehicles(
+                frame, detections, self.zone_manager.zones, frame_step, current_time
+            )
+        except Exception as e:
+            print(f"Tracking error: {e}")
+            self.tracking_errors_metric.inc()
+            tracked_objects = DetectionBatch.empty()
+            zone_vehicles = {}
+        
+        started = timer.since("tracking", started)
+        
+        if self.traffic_light_controller.manage_traffic_congestion(self.zone_manager.zones, current_time):
+            print(f"Frame {self.frame_count}: Traffic light status changed.")
+        
+        started = timer.since("light_control", started)
+        
+        # Zone statistics, event log records and the API snapshot
+        self._update_statistics(current_time)
+        
+        if self.event_log is not None:
+            self._log_events(current_time)
+        
+        if current_time - self.last_snapshot_time >= self.snapshot_interval:
+            self.publish_snapshot()
+            self.last_snapshot_time = current_time
+        
+        self._record_frame_metrics()
+        
+        timer.since("zone_update", started)
+        
+        return tracked_objects, zone_vehicles
+    
+    def _record_frame_metrics(self):
+        """
+        Update the Prometheus counters from the results of this frame.
+        Runs on the processing thread, so scraping never has to read the zones.
+        """
+        self.frames_processed_metric.inc()
+        
+        for _, zone_id in self.tracker.frame_crossings:
+            ZONE_CROSSINGS.labels(self.stream_label, zone_id).inc()
+        
+        for zone in self.zone_manager.zones:
+            if zone.is_stalled:
+                if zone.id not in self.stalled_zone_ids:
+                    self.stalled_zone_ids.add(zone.id)
+                    STALL_EVENTS.labels(self.stream_label, zone.id).inc()
+            else:
+                self.stalled_zone_ids.discard(zone.id)
+        
+        # Manual changes through the API are picked up on the next frame too
+        for direction, light in self.traffic_light_controller.traffic_lights.items():
+            status = light["status"]
+            previous = self.light_statuses.get(direction)
+            if previous != status:
+                if previous is not None:
+                    LIGHT_TRANSITIONS.labels(self.stream_label, direction, status).inc()
+                self.light_statuses[direction] = status
+    
+    def _update_statistics(self, current_time):
+        """
+        Add a zone history sample once per statistics_interval. The zone history
+        holds a fixed number of samples, so sampling every frame would shrink the
+        hour it covers to a few minutes.
+        
+        Args:
+            current_time (float): Frame time
+        """
+        if current_time - self.last_statistics_time < self.statistics_interval:
+            return
+        
+        for zone in self.zone_manager.zones:
+            zone.update_statistics(current_time)
+        self.last_statistics_time = current_time
+    
+    def publish_snapshot(self):
+        """
+        Build and publish a new read-only snapshot for the API.
+        Called by the thread that updates the zones.
+        
+        Returns:
+            TelemetrySnapshot: Published snapshot
+        """
+        # Zone statistics only change every statistics_interval: reuse the serialized body
+        statistics_payload = None
+        if self._statistics_payload_time == self.last_statistics_time:
+            statistics_payload = self._statistics_payload
+        
+        self.snapshot_version += 1
+        snapshot = build_snapshot(self, self.snapshot_version, statistics_payload)
+        
+        self._statistics_payload = snapshot.payload("statistics")
+        self._statistics_payload_time = self.last_statistics_time
+        
+        self.snapshot = snapshot
+        return snapshot
+    
+    def get_snapshot(self):
+        """
+        Latest published snapshot. When not processing, a fresh one is built
+        so changes made through the API are visible.
+        
+        Returns:
+            TelemetrySnapshot: Snapshot
+        """
+        snapshot = self.snapshot
+        
+        if snapshot is None or not self.processing:
+            return build_snapshot(self, self.snapshot_version)
+        
+        return snapshot
+    
+    def _log_events(self, current_time):
+        """
+        Buffer crossing events of this frame and periodic zone samples in the event log
+        
+        Args:
+            current_time (float): Frame time
+        """
+        for vehicle_id, zone_id in self.tracker.frame_crossings:
+            self.event_log.log_crossing(current_time, self.frame_count, zone_id, vehicle_id)
+        
+        if current_time - self.last_event_sample_time >= self.event_sample_interval:
+            for zone in self.zone_manager.zones:
+                self.event_log.log_zone_sample(current_time, self.frame_count, zone)
+            self.last_event_sample_time = current_time
+    
+    def _capture_overlay(self, current_time, display):
+        """
+        Copy what the overlay shows from the live zones and lights. Runs on the
+        tracking thread, so the output stage draws without reading or updating zone state.
+        
+        Args:
+            current_time (float): Frame time
+            display (bool): Display video
+            
+        Returns:
+            dict: Overlay state, or None when the frame will not be drawn
+        """
+        if not display and self.frame_buffer.viewers == 0:
+            return None
+        
+        elapsed_time = current_time - self.start_time
+        if elapsed_time > 0:
+            self.fps = self.frame_count / elapsed_time
+        
+        zone_states = [(zone, zone.overlay_state()) for zone in self.zone_manager.zones]
+        stalled_zones = sum(1 for _, (_, is_stalled, _, _) in zone_states if is_stalled)
+        
+        return {
+            "fps": self.fps,
+            "congestion_level": "Normal" if stalled_zones == 0 else "Medium" if stalled_zones < 3 else "High",
+            "zones": zone_states,
+            "lights": self.traffic_light_controller.overlay_state()
+        }
+    
+    def _draw_overlay(self, frame, tracked_objects, overlay):
+        """
+        Draw FPS, congestion, zones, tracked vehicles and traffic lights on a frame
+        
+        Args:
+            frame (numpy.ndarray): Image frame
+            tracked_objects (DetectionBatch): Tracked vehicles
+            overlay (dict): State from _capture_overlay
+            
+        Returns:
+            numpy.ndarray: Annotated frame
+        """
+        cv2.putText(frame, f"FPS: {overlay['fps']:.1f}", (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        
+        
+        congestion_level = overlay["congestion_level"]
+        congestion_color = (0, 255, 0)  
+        
+        if congestion_level == "Medium":
+            congestion_color = (0, 165, 255)  
+        elif congestion_level == "High":
+            congestion_color = (0, 0, 255)  
+        
+        cv2.putText(frame, f"Congestion: {congestion_level}", (10, 60), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, congestion_color, 2)
+        
+        
+        frame = self.zone_manager.draw_zones(frame, overlay["zones"])
+        
+        
+        frame = self.zone_manager.draw_current_polygon(frame)
+        
+        
+        for (x1, y1, x2, y2), track_id in zip(tracked_objects.int_boxes().tolist(), tracked_objects.track_ids.tolist()):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
+            
+            
+            cv2.putText(frame, f"ID: {track_id}", (x1, y1 - 10), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+        
+        
+        frame = self.traffic_light_controller.draw_traffic_light_status(frame, overlay["lights"])
+        
+        return frame
+    
+    def _output_frame(self, frame, tracked_objects, zone_vehicles, current_time, overlay, display, video_writer, save_data):
+        """
+        Draw, display, write and save one tracked frame
         
         Args:
+            frame (numpy.ndarray): Image frame
+            tracked_objects (DetectionBatch): Tracked vehicles
+            zone_vehicles (dict): Vehicles in each zone
+            current_time (float): Frame time
+            overlay (dict): Overlay state captured by the tracking stage (None = not drawn)
             display (bool): Display video
+            video_writer (cv2.VideoWriter): Video writer or None
             save_data (bool): Save data
+            
+        Returns:
+            bool: False if the user asked to stop
+        """
+        timer = self.stage_timer
+        started = time.perf_counter()
+        
+        # Annotated frames are also needed by stream viewers (MJPEG)
+        streaming = self.frame_buffer.viewers > 0
+        
+        if overlay is not None and (display or streaming):
+            frame = self._draw_overlay(frame, tracked_objects, overlay)
+            
+            if streaming:
+                self.frame_buffer.publish(frame)
+        
+        if display:
+            cv2.imshow(self.name, frame)
+            
+            
+            key = cv2.waitKey(1) & 0xFF
+            if key == 27:  
+                return False
+        
+        started = timer.since("rendering", started)
+        
+        if video_writer is not None:
+            video_writer.write(frame)
+        
+        
+        if self.event_log is not None:
+            self.event_log.flush()
+        
+        finished = timer.since("persistence", started)
+        
+        # Time between two finished frames: spikes of the whole loop
+        if self.last_output_time is not None:
+            timer.record("frame_interval", finished - self.last_output_time)
+        self.last_output_time = finished
+        
+        return True
+    
+    def _run_serial(self, display, video_writer, save_data, batch_size):
+        """
+        Run capture, detection, tracking and output one after another in this thread
+        
+        Args:
+            display (bool): Display video
+            video_writer (cv2.VideoWriter): Video writer or None
+            save_data (bool): Save data
+            batch_size (int): Frames per detector forward pass
+        """
+        while self.cap.isOpened() and self.processing:
+            
+            frames = self._read_frames(batch_size)
+            if not frames:
+                break
+            
+            
+            detections_batch = self._detect_frames(frames)
+            
+            
+            for frame, detections in zip(frames, detections_batch):
+                if not self._process_frame(frame, detections, display, video_writer, save_data):
+                    return
+    
+    def _run_pipeline(self, display, video_writer, save_data, batch_size, queue_size):
+        """
+        Run capture, inference, tracking and output as separate threads connected by bounded queues
+        
+        Args:
+            display (bool): Display video
+            video_writer (cv2.VideoWriter): Video writer or None
+            save_data (bool): Save data
+            batch_size (int): Frames per detector forward pass
+            queue_size (int): Maximum batches waiting between two stages
+        """
+        def capture():
+            if not self.processing or not self.cap.isOpened():
+                return None
+            
+            frames = self._read_frames(batch_size)
+            if not frames:
+                return None
+            
+            return frames
+        
+        def inference(frames):
+            return list(zip(frames, self._detect_frames(frames)))
+        
+        def tracking(batch):
+            results = []
+            for frame, detections in batch:
+                self.frame_count += 1
+                current_time = self._frame_time()
+                tracked_objects, zone_vehicles = self._track_frame(frame, detections, current_time)
+                overlay = self._capture_overlay(current_time, display)
+                results.append((frame, tracked_objects, zone_vehicles, current_time, overlay))
+            return results
+        
+        def output(batch):
+            for frame, tracked_objects, zone_vehicles, current_time, overlay in batch:
+                if not self._output_frame(frame, tracked_objects, zone_vehicles, current_time, overlay,
+                                          display, video_writer, save_data):
+                    self.processing = False
+                    self.pipeline.stop()
+                    break
+            return None
+        
+        self.pipeline = FramePipeline(queue_size=queue_size)
+        self.pipeline.add_stage("capture", capture)
+        self.pipeline.add_stage("inference", inference)
+        self.pipeline.add_stage("tracking", tracking)
+        self.pipeline.add_stage("output", output)
+        
+        self.pipeline.start()
+        
+        try:
+            while self.pipeline.is_running():
+                if not self.processing:
+                    self.pipeline.stop()
+                self.pipeline.join(timeout=0.5)
+        finally:
+            self.pipeline.stop()
+            self.pipeline.join()
+    
+    def get_latency_stats(self):
+        """
+        Rolling per-frame latency percentiles of each processing stage
+        
+        Returns:
+            dict: {stage: {count, last_ms, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}, "fps": float}
+        """
+        stats = self.stage_timer.get_stats()
+        
+        interval = stats.get("frame_interval", {}).get("mean_ms")
+        stats["fps"] = round(1000.0 / interval, 2) if interval else 0.0
+        
+        return stats
+    
+    def get_processing_thread_ids(self):
+        """
+        Threads that run the processing loop
+        
+        Returns:
+            set: Thread idents
+        """
+        # Pipelined: the starting thread only waits for the stage threads
+        if self.pipeline is not None and self.pipeline.is_running():
+            return {stage.thread.ident for stage in self.pipeline.stages if stage.thread is not None}
+        
+        if self.processing_thread_id is not None:
+            return {self.processing_thread_id}
+        
+        return set()
+    
+    def profile(self, duration=5.0, top=30):
+        """
+        Sample the processing threads with the sampling profiler (blocks for `duration` seconds)
+        
+        Args:
+            duration (float): Profiling time (seconds)
+            top (int): Number of functions in the report
+            
+        Returns:
+            dict: Profiler report
+        """
+        return self.profiler.profile(duration, self.get_processing_thread_ids(), top)
+    
+    def get_queue_depths(self):
+        """
+        Items waiting in front of each pipeline stage
+        
+        Returns:
+            dict: {stage_name: queue depth} (empty when not running pipelined)
+        """
+        return {stage: stats.get("queue_depth", 0) for stage, stats in self.get_pipeline_stats().items()}
+    
+    def get_pipeline_stats(self):
+        """
+        Get queue depths and per-stage latency of the processing pipeline
+        
+        Returns:
+            dict: {stage_name: statistics} (empty when not running pipelined)
+        """
+        if self.pipeline is None:
+            return {}
+        
+        return self.pipeline.get_stats()
+    
+    def start_counting(self, display=True, save_data=True, save_video=False, batch_size=1,
+                       pipelined=False, queue_size=4, motion_gate=False, motion_threshold=0.002,
+                       roi_inference=False, roi_imgsz=None, offline=False):
+        """
+        Start vehicle counting process
+        
+        Args:
+            display (bool): Display video
+            save_data (bool): Save zone samples and crossing events to the event log
+                              (output_path/events) and a summary when finished
             save_video (bool): Save processed video
+            batch_size (int): Frames collected per detector forward pass (1 = frame by frame)
+            pipelined (bool): Run capture, inference, tracking and output in separate threads
+            queue_size (int): Maximum batches waiting between two pipeline stages
+            motion_gate (bool): Skip detection on frames without motion inside the zones
+            motion_threshold (float): Fraction of zone pixels that must change to run detection
+            roi_inference (bool): Run the detector only on the zone bounding rectangles
+            roi_imgsz (int): Model input size for the ROI crops (None = model default)
+            offline (bool): Process a recorded video as fast as possible: timing follows the
+                            video timestamps, no display and no API server
             
         Returns:
             bool: Process success
         """
+        if offline:
+            if self.video_path is None:
+                print("Offline mode needs a video file, running live.")
+                offline = False
+            else:
+                display = False
         
         if not self._setup_zones():
             return False
@@ -255,6 +1000,9 @@ class VehicleCounterService:
             return False
         
         
+        self._setup_rois(roi_inference, roi_imgsz)
+        
+        
         video_writer = None
         if save_video and self.video_path is not None:
             
@@ -271,137 +1019,24 @@ class VehicleCounterService:
             video_writer = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
         
         
-        self.processing = True
-        self.frame_count = 0
-        self.start_time = time.time()
-        last_save_time = time.time()  
-        save_interval = 60  
-        last_statistics_time = time.time()  
-        statistics_interval = 5  
+        self._begin_run(save_data, motion_gate, motion_threshold, offline)
+        batch_size = max(1, int(batch_size))
         
         
-        try:
-            from api import start_api
-            api_thread = start_api(vehicle_counter=self, host="0.0.0.0", port=8000)
-            print("API server started successfully (port 8000)")
-        except Exception as e:
-            print(f"Error starting API server: {e}")
+        if not offline:
+            try:
+                from api import start_api
+                api_thread = start_api(vehicle_counter=self, host="0.0.0.0", port=8000)
+                print("API server started successfully (port 8000)")
+            except Exception as e:
+                print(f"Error starting API server: {e}")
         
         
         try:
-            while self.cap.isOpened() and self.processing:
-                
-                ret, frame = self.cap.read()
-                if not ret:
-                    break
-                
-                self.frame_count += 1
-                current_time = time.time()
-                
-                
-                detections = self.detector.detect_vehicles(frame)
-                
-                
-                if isinstance(detections, tuple) and len(detections) == 3:
-                    boxes, scores, class_ids = detections
-                else:
-                    
-                    boxes = []
-                    scores = []
-                    class_ids = []
-                    
-                    if detections:
-                        for det in detections:
-                            if isinstance(det, dict) and 'box' in det:
-                                x1, y1, x2, y2 = det['box']
-                                boxes.append([x1, y1, x2, y2])
-                                scores.append(det.get('confidence', 1.0))
-                                class_ids.append(det.get('class_id', 0))
-                
-                
-                try:
-                    tracked_objects, zone_vehicles = self.tracker.track_vehicles(
-                        frame, boxes, scores, class_ids, self.zone_manager.zones
-                    )
-                except Exception as e:
-                    print(f"Tracking error: {e}")
-                    tracked_objects = []
-                    zone_vehicles = {}
-                
-                
-                if current_time - last_statistics_time >= statistics_interval:
-                    for zone in self.zone_manager.zones:
-                        zone.update_statistics()
-                    last_statistics_time = current_time
-                
-                
-                if self.traffic_light_controller.manage_traffic_congestion(self.zone_manager.zones):
-                    print(f"Frame {self.frame_count}: Traffic light status changed.")
-                
-                
-                if display:
-                    
-                    elapsed_time = current_time - self.start_time
-                    if elapsed_time > 0:
-                        self.fps = self.frame_count / elapsed_time
-                    
-                    
-                    cv2.putText(frame, f"FPS: {self.fps:.1f}", (10, 30), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                    
-                    
-                    congestion_status = self.get_congestion_status()
-                    congestion_level = congestion_status.get("level", "Normal")
-                    congestion_color = (0, 255, 0)  
-                    
-                    if congestion_level == "Medium":
-                        congestion_color = (0, 165, 255)  
-                    elif congestion_level == "High":
-                        congestion_color = (0, 0, 255)  
-                    
-                    cv2.putText(frame, f"Congestion: {congestion_level}", (10, 60), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, congestion_color, 2)
-                    
-                    
-                    frame = self.zone_manager.draw_zones(frame)
-                    
-                    
-                    frame = self.zone_manager.draw_current_polygon(frame)
-                    
-                    
-                    for obj in tracked_objects:
-                        x1, y1, x2, y2 = obj["bbox"]
-                        track_id = obj["id"]
-                        
-                        
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-                        
-                        
-                        cv2.putText(frame, f"ID: {track_id}", (x1, y1 - 10), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                    
-                    
-                    frame = self.traffic_light_controller.draw_traffic_light_status(frame)
-                    
-                    
-                    cv2.imshow("Vehicle Counter", frame)
-                    
-                    
-                    key = cv2.waitKey(1) & 0xFF
-                    if key == 27:  
-                        break
-                
-                
-                if video_writer is not None:
-                    video_writer.write(frame)
-                
-                
-                if save_data and current_time - last_save_time >= save_interval:
-                    self._save_data(self.frame_count, current_time, {"zone_vehicles": zone_vehicles})
-                    last_save_time = current_time
-                    
-                    
-                    self._save_statistics(current_time)
+            if pipelined:
+                self._run_pipeline(display, video_writer, save_data, batch_size, queue_size)
+            else:
+                self._run_serial(display, video_writer, save_data, batch_size)
         
         except KeyboardInterrupt:
             print("Process stopped by user request.")
@@ -409,23 +1044,118 @@ class VehicleCounterService:
             print(f"Process stopped with error: {e}")
         finally:
             
-            self.processing = False
-            self._close_video_capture()
-            
             if video_writer is not None:
                 video_writer.release()
             
             cv2.destroyAllWindows()
             
-            
-            if save_data:
-                self._save_data(self.frame_count, time.time(), {})
-                self._save_statistics(time.time())
-            
-            print(f"Vehicle counting process finished. Processed {self.frame_count} frames total.")
+            self._end_run(save_data)
             
             return True
     
+    def _setup_rois(self, roi_inference, roi_imgsz=None):
+        """
+        Set the zone crops of this camera (needs the open capture for the frame size)
+        
+        Args:
+            roi_inference (bool): Run the detector only on the zone bounding rectangles
+            roi_imgsz (int): Model input size for the ROI crops (None = model default)
+        """
+        self.detection_rois = None
+        if not roi_inference:
+            return
+        
+        frame_shape = (int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+        self.detection_rois = self.detector.make_rois(self.zone_manager.zones, frame_shape, imgsz=roi_imgsz)
+        if self.detection_rois:
+            print(f"{self.stream_label}: ROI inference on {len(self.detection_rois.rects)} crop(s): "
+                  f"{self.detection_rois.rects}")
+        else:
+            print(f"{self.stream_label}: zones cover most of the frame, using full-frame inference.")
+    
+    def _begin_run(self, save_data, motion_gate=False, motion_threshold=0.002, offline=False):
+        """
+        Reset per-run state before the first frame
+        
+        Args:
+            save_data (bool): Open the event log
+            motion_gate (bool): Skip detection on frames without motion inside the zones
+            motion_threshold (float): Fraction of zone pixels that must change to run detection
+            offline (bool): Drive all timing by the video timestamps instead of the wall clock
+        """
+        self.processing = True
+        self.frame_count = 0
+        self.start_time = time.time()
+        self.wall_start_time = self.start_time
+        self.offline = offline
+        self.clock_base = self.start_time
+        self.frame_times.clear()
+        self.frames_read = 0
+        self.last_frame_time = None
+        self.clock.reset()
+        self.stage_timer.reset()
+        self.last_output_time = None
+        self.processing_thread_id = threading.get_ident()
+        self.stalled_zone_ids = {zone.id for zone in self.zone_manager.zones if zone.is_stalled}
+        self.light_statuses = {direction: light["status"]
+                               for direction, light in self.traffic_light_controller.traffic_lights.items()}
+        
+        if offline:
+            # Video time 0 maps to the run start, timers start there too
+            self.zone_manager.reset_time(self.clock_base)
+            self.traffic_light_controller.reset_time(self.clock_base)
+        
+        self.last_statistics_time = self.start_time
+        self.last_event_sample_time = 0
+        self.event_log = EventLogWriter(os.path.join(self.output_path, "events")) if save_data else None
+        self.last_detections = empty_detections()
+        self.frames_since_detection = 0
+        self.motion_gate = MotionGate(threshold=motion_threshold) if motion_gate else None
+        self.snapshot = None
+        self.last_snapshot_time = 0
+        self._statistics_payload = None
+        self._statistics_payload_time = None
+    
+    def _end_run(self, save_data):
+        """
+        Release the capture and write remaining data after the last frame
+        
+        Args:
+            save_data (bool): Save summary data
+        """
+        self.processing = False
+        self._close_video_capture()
+        self.frame_buffer.clear()
+        
+        if self.event_log is not None:
+            self.event_log.close()
+            self.event_log = None
+        
+        end_time = self.current_time()
+        
+        if save_data:
+            self._save_data(self.frame_count, end_time, {})
+            self._save_statistics(end_time)
+        
+        print(f"Vehicle counting process finished. Processed {self.frame_count} frames total.")
+        
+        if self.offline and self.last_frame_time is not None:
+            wall_time = time.time() - self.wall_start_time
+            video_time = self.last_frame_time - self.clock_base
+            speed = video_time / wall_time if wall_time > 0 else 0
+            print(f"Offline: {video_time:.1f}s of video in {wall_time:.1f}s ({speed:.1f}x real time).")
+        
+        self.clock.reset()
+    
+    def current_time(self):
+        """
+        Current time of the run: time of the frame being processed, the wall clock when not running
+        
+        Returns:
+            float: Timestamp
+        """
+        return self.clock.now()
+    
     def _save_statistics(self, timestamp):
         """
         Save statistics data
@@ -434,7 +1164,7 @@ class VehicleCounterService:
             timestamp (float): Timestamp
         """
         
-        all_stats = self.zone_manager.get_all_statistics()
+        all_stats = self.zone_manager.get_all_statistics(timestamp)
         
         
         summary = {
@@ -505,7 +1235,7 @@ class VehicleCounterService:
             zones_status.append(zone_data)
         
         return {
-            "timestamp": time.time(),
+            "timestamp": self.current_time(),
             "total_vehicles": total_vehicles,
             "zones": zones_status
         }
@@ -1,62 +1,283 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from shapely.geometry import Point
 
+from detector_backends import create_backend
+from detections import DetectionBatch
+
+# COCO classes counted as vehicles (IDs used when the model has no class names)
+COCO_VEHICLE_CLASSES = {'bicycle': 1, 'car': 2, 'motorcycle': 3, 'bus': 5, 'truck': 7}
+VEHICLE_CLASS_NAMES = tuple(COCO_VEHICLE_CLASSES)
+
+
+def empty_detections():
+    """
+    Detections of a frame without vehicles
+    
+    Returns:
+        DetectionBatch: Empty batch
+    """
+    return DetectionBatch.empty()
+
+
+class DetectionSettings:
+    """
+    Per-camera detection parameters, applied inside the model call
+    """
+    
+    __slots__ = ("classes", "conf", "iou", "max_det")
+    
+    def __init__(self, classes, conf=0.25, iou=0.7, max_det=300):
+        """
+        Args:
+            classes (tuple): Class IDs kept by the model
+            conf (float): Minimum confidence
+            iou (float): NMS IoU threshold
+            max_det (int): Maximum detections per frame
+        """
+        self.classes = tuple(sorted(int(class_id) for class_id in classes))
+        self.conf = float(conf)
+        self.iou = float(iou)
+        self.max_det = int(max_det)
+    
+    def key(self):
+        """Frames with equal keys can share one forward pass"""
+        return self.classes, self.conf, self.iou, self.max_det
+    
+    def as_dict(self):
+        return {"classes": list(self.classes), "conf": self.conf, "iou": self.iou, "max_det": self.max_det}
+
+
+class DetectionRois:
+    """
+    Zone crops of one camera: inference runs only inside these rectangles
+    """
+    
+    __slots__ = ("rects", "imgsz")
+    
+    def __init__(self, rects, imgsz=None):
+        """
+        Args:
+            rects (list): Crop rectangles [(x1, y1, x2, y2), ...]
+            imgsz (int): Model input size for the crops (None = model default)
+        """
+        self.rects = [tuple(int(v) for v in rect) for rect in rects]
+        self.imgsz = imgsz
+    
+    def key(self):
+        """Frames with equal keys can share one forward pass"""
+        return tuple(self.rects), self.imgsz
+
 
 class VehicleDetector:
     """
     Service for detecting vehicles using YOLOv8.
     """
     
-    def __init__(self, model_path="yolov8s.pt", device="cpu"):
+    def __init__(self, model_path="yolov8s.pt", device="cpu", backend="ultralytics", threads=None,
+                 detection=None):
         """
         Initialize detector
         
         Args:
-            model_path (str): YOLO model path
+            model_path (str): YOLO model path (.pt, or the exported model of the backend)
             device (str): Device to use (cpu, cuda, mps)
+            backend (str): Inference backend: ultralytics, onnxruntime or openvino
+            threads (int): CPU threads of the onnxruntime/openvino backends (None = all cores)
+            detection (dict): Default detection settings, see make_settings()
         """
-        self.model = YOLO(model_path)
+        self.backend = create_backend(backend, model_path, device=device, threads=threads)
+        self.names = self.backend.names
         self.device = device
         
+        self.vehicle_class_names = list(VEHICLE_CLASS_NAMES)
+        self.settings = self.make_settings(**(detection or {}))
+        self.vehicle_classes = list(self.settings.classes)
         
-        self.vehicle_classes = [2, 3, 5, 7, 1]  
-        self.vehicle_class_names = ['car', 'bus', 'truck', 'motorcycle', 'bicycle', 'person']
+    def make_settings(self, classes=None, conf=0.25, iou=0.7, max_det=300):
+        """
+        Build detection settings from config values
         
-    def detect_vehicles(self, frame):
+        Args:
+            classes (list): Class IDs or names to detect (None = vehicle classes)
+            conf (float): Minimum confidence
+            iou (float): NMS IoU threshold
+            max_det (int): Maximum detections per frame
+            
+        Returns:
+            DetectionSettings: Settings
+        """
+        if classes is None:
+            classes = self.vehicle_class_names
+        
+        ids_by_name = {name: class_id for class_id, name in self.names.items()} or COCO_VEHICLE_CLASSES
+        class_ids = []
+        
+        for class_id in classes:
+            if isinstance(class_id, str) and not class_id.isdigit():
+                if class_id not in ids_by_name:
+                    raise ValueError(f"Unknown class '{class_id}'")
+                class_id = ids_by_name[class_id]
+            class_ids.append(int(class_id))
+        
+        return DetectionSettings(class_ids, conf, iou, max_det)
+    
+    def _predict(self, images, settings, imgsz=None):
+        settings = settings or self.settings
+        return self.backend.predict(images, imgsz, classes=settings.classes, conf=settings.conf,
+                                    iou=settings.iou, max_det=settings.max_det)
+    
+    def detect_vehicles(self, frame, settings=None, rois=None):
         """
         Detect vehicles in a single frame
         
         Args:
             frame (numpy.ndarray): Image frame
+            settings (DetectionSettings): Settings of the camera (None = detector defaults)
+            rois (DetectionRois): Zone crops of the camera (None = full frame)
             
         Returns: 
-            tuple : (boxes, scores, class_ids) of vehicles
-                  boxes - Box coordinates (x1, y1, x2, y2)
-                  scores - Detection scores
-                  class_ids - Class IDs
+            DetectionBatch : Vehicles of the frame
+                  boxes - (N, 4) float32 box coordinates (x1, y1, x2, y2)
+                  scores - (N,) float32 detection scores
+                  class_ids - (N,) int32 class IDs
         """
-        results = self.model(frame)[0]
+        if rois:
+            return self._detect_in_rois([frame], settings, rois)[0]
         
+        return self._parse_results(self._predict([frame], settings)[0])
+    
+    def detect_vehicles_batch(self, frames, settings=None, rois=None):
+        """
+        Detect vehicles in several frames with a single forward pass
         
-        boxes = []
-        scores = []
-        class_ids = []
+        Args:
+            frames (list): List of image frames (numpy.ndarray)
+            settings (DetectionSettings): Settings shared by the frames (None = detector defaults)
+            rois (DetectionRois): Zone crops shared by the frames (None = full frame)
+            
+        Returns:
+            list: One DetectionBatch per frame, in input order
+        """
+        if len(frames) == 0:
+            return []
         
+        if rois:
+            return self._detect_in_rois(frames, settings, rois)
         
-        for r in results.boxes.data.tolist():
-            x1, y1, x2, y2, confidence, class_id = r
-            class_id = int(class_id)
+        return [self._parse_results(result) for result in self._predict(list(frames), settings)]
+    
+    def make_rois(self, zones, frame_shape, padding=32, imgsz=None, max_area_ratio=0.9):
+        """
+        Crops for running inference only on the bounding rectangles of the zones.
+        The crops belong to the camera, not the detector, so one detector can
+        serve cameras with different zones.
+        
+        Args:
+            zones (list): List of zones (ZoneManager.zones)
+            frame_shape (tuple): Frame shape (height, width, ...)
+            padding (int): Pixels added around each zone so vehicles on the border are not cut
+            imgsz (int): Model input size for the crops (None = model default)
+            max_area_ratio (float): Keep full-frame inference if the crops cover more than this part of the frame
+            
+        Returns:
+            DetectionRois: Crops (None if the zones cover too much of the frame for cropping to help)
+        """
+        height, width = frame_shape[:2]
+        rects = []
+        
+        for zone in zones:
+            points = np.asarray(zone.points, dtype=np.float64).reshape(-1, 2)
+            if len(points) == 0:
+                continue
+            
+            x1 = max(0, int(np.floor(points[:, 0].min())) - padding)
+            y1 = max(0, int(np.floor(points[:, 1].min())) - padding)
+            x2 = min(width, int(np.ceil(points[:, 0].max())) + padding)
+            y2 = min(height, int(np.ceil(points[:, 1].max())) + padding)
+            
+            if x2 > x1 and y2 > y1:
+                rects.append((x1, y1, x2, y2))
+        
+        rects = self.merge_rects(rects)
+        crop_area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in rects)
+        
+        if not rects or crop_area > max_area_ratio * width * height:
+            return None
+        
+        return DetectionRois(rects, imgsz)
+    
+    @staticmethod
+    def merge_rects(rects):
+        """
+        Merge overlapping rectangles until none overlap
+        
+        Args:
+            rects (list): Rectangles [(x1, y1, x2, y2), ...]
             
+        Returns:
+            list: Non-overlapping rectangles
+        """
+        rects = list(rects)
+        merged = True
+        
+        while merged:
+            merged = False
+            for i in range(len(rects)):
+                for j in range(i + 1, len(rects)):
+                    a, b = rects[i], rects[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        rects[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                        rects.pop(j)
+                        merged = True
+                        break
+                if merged:
+                    break
+        
+        return rects
+    
+    def _detect_in_rois(self, frames, settings, rois):
+        """
+        Detect vehicles on the ROI crops of each frame in one forward pass
+        and map boxes back to full-frame coordinates
+        
+        Args:
+            frames (list): Image frames
+            settings (DetectionSettings): Settings shared by the frames
+            rois (DetectionRois): Crops shared by the frames
             
+        Returns:
+            list: One DetectionBatch per frame
+        """
+        crops = [frame[y1:y2, x1:x2] for frame in frames for x1, y1, x2, y2 in rois.rects]
+        offsets = np.array([[x1, y1, x1, y1] for x1, y1, _, _ in rois.rects], dtype=np.float32)
+        
+        results = self._predict(crops, settings, rois.imgsz)
+        crop_count = len(rois.rects)
+        
+        detections = []
+        for i in range(len(frames)):
+            frame_results = results[i * crop_count:(i + 1) * crop_count]
+            for result, offset in zip(frame_results, offsets):
+                result[:, :4] += offset
             
-            if class_id in self.vehicle_classes or self.model.names[class_id] in self.vehicle_class_names:
-                boxes.append([int(x1), int(y1), int(x2), int(y2)])
-                scores.append(float(confidence))
-                class_ids.append(class_id)
+            detections.append(self._parse_results(np.concatenate(frame_results)))
         
-        return boxes, scores, class_ids
+        return detections
+    
+    @staticmethod
+    def _parse_results(results):
+        """
+        Split the backend output of one frame into a DetectionBatch.
+        Class, confidence and NMS filtering already happened in the model call.
+        
+        Args:
+            results (numpy.ndarray): (N, 6) detections of one frame from the backend
+            
+        Returns:
+            DetectionBatch: Vehicles of the frame
+        """
+        return DetectionBatch.from_results(results)
     
     def detect_vehicles_old(self, frame):
         """
@@ -69,21 +290,20 @@ class VehicleDetector:
             list: List of detected vehicles
                   [{class_name, confidence, box}]
         """
-        results = self.model(frame)[0]
+        results = self._predict([frame], None)[0]
         vehicles = []
         
-        for r in results.boxes.data.tolist():
+        for r in results.tolist():
             x1, y1, x2, y2, confidence, class_id = r
-            class_name = self.model.names[int(class_id)]
+            class_name = self.names.get(int(class_id), str(int(class_id)))
+            
+            vehicles.append({
+                'class_name': class_name,
+                'confidence': confidence,
+                'box': [int(x1), int(y1), int(x2), int(y2)],
+                'class_id': int(class_id)
+            })
             
-            if class_name in self.vehicle_class_names:
-                vehicles.append({
-                    'class_name': class_name,
-                    'confidence': confidence,
-                    'box': [int(x1), int(y1), int(x2), int(y2)],
-                    'class_id': int(class_id)
-                })
-                
         return vehicles
     
     def draw_detections(self, frame, vehicles):
@@ -114,13 +334,13 @@ class VehicleDetector:
                 cv2.putText(result_frame, label, (x1, y1-10), 
                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
         
-        elif isinstance(vehicles, tuple) and len(vehicles) == 3:
+        elif isinstance(vehicles, DetectionBatch) or (isinstance(vehicles, tuple) and len(vehicles) == 3):
             boxes, scores, class_ids = vehicles
-            for i, box in enumerate(boxes):
+            for i, box in enumerate(np.asarray(boxes, dtype=np.float32).reshape(-1, 4).astype(np.int32).tolist()):
                 x1, y1, x2, y2 = box
-                class_id = class_ids[i]
+                class_id = int(class_ids[i])
                 confidence = scores[i]
-                class_name = self.model.names[class_id]
+                class_name = self.names.get(class_id, str(class_id))
                 
                 
                 cv2.rectangle(result_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
@@ -1,5 +1,12 @@
-import time
+import heapq
+
 import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from zone_manager import ZoneManager
+from motion_model import KalmanBoxFilter
+from track_table import TrackTable
+from clock import SYSTEM_CLOCK
 
 
 class VehicleTracker:
@@ -7,20 +14,39 @@ class VehicleTracker:
     Class for tracking, counting and eliminating vehicle duplicates
     """
     
-    def __init__(self, cooldown_time=2.0, iou_threshold=0.3):
+    def __init__(self, cooldown_time=2.0, iou_threshold=0.3, clock=None, max_tracks=1024,
+                 max_age=30, min_hits=3, center_gate=1.0, zone_manager=None):
         """
         Initialize vehicle tracker
         
         Args:
             cooldown_time (float): Time before recounting the same vehicle (seconds)
             iou_threshold (float): IoU threshold for considering the same vehicle
+            clock: Time source with now() (system time if None)
+            max_tracks (int): Capacity of the track table (concurrent vehicles)
+            max_age (int): Detection frames a track may coast on prediction before it is dropped
+            min_hits (int): Matches before a track is confirmed. Younger tracks are dropped
+                on their second missed detection frame and may match by center distance.
+            center_gate (float): Largest center shift of a young track, in track box sizes
+            zone_manager (ZoneManager): Manager of the tracked zones, whose zone lookup map is used
+                (a private manager if None)
         """
-        self.tracked_vehicles = {}  
-        self.vehicles_in_zones = {}  
-        self.vehicles_zone_history = {}
+        self.clock = clock or SYSTEM_CLOCK
+        self.zone_manager = zone_manager or ZoneManager(clock=self.clock)
+        self.tracks = TrackTable(max_tracks)
+        self.track_slots = np.zeros(0, dtype=np.intp)  # Track table slot of each motion model row
+        self.motion_model = KalmanBoxFilter()
+        self.last_vehicle_id = 0  # IDs are never reused within a session
+        self.expiry_queue = []  # Heap of (last_seen, slot, vehicle_id), one entry per live track
         self.cooldown_time = cooldown_time
         self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.center_gate = center_gate
+        self.last_slots = np.zeros(0, dtype=np.intp)  # Slots of the last detected frame
+        self.last_slot_ids = np.zeros(0, dtype=np.int64)  # Vehicle IDs of those slots
         self.previous_frame_data = {}  
+        self.frame_crossings = []  # (vehicle_id, zone_id) counted in the last frame
         
     def initialize_zones(self, zones):
         """
@@ -29,7 +55,8 @@ class VehicleTracker:
         Args:
             zones (list): List of zones
         """
-        self.vehicles_in_zones = {zone.id: set() for zone in zones}
+        self.tracks.in_zones[:] = 0
+        self.tracks.zone_bits([zone.id for zone in zones])
     
     def calculate_iou(self, box1, box2):
         """
@@ -63,90 +90,417 @@ class VehicleTracker:
             return 0
         return inter_area / union_area
     
-    def track_vehicle(self, vehicle_box, current_time):
+    def calculate_iou_matrix(self, boxes1, boxes2):
         """
-        Track vehicle, assign ID
+        Calculate IoU for every pair of boxes at once
         
         Args:
-            vehicle_box (list): [x1, y1, x2, y2]
+            boxes1 (array-like): N boxes [[x1, y1, x2, y2], ...]
+            boxes2 (array-like): M boxes [[x1, y1, x2, y2], ...]
+            
+        Returns:
+            numpy.ndarray: N x M IoU matrix
+        """
+        boxes1 = np.asarray(boxes1, dtype=np.float32).reshape(-1, 4)
+        boxes2 = np.asarray(boxes2, dtype=np.float32).reshape(-1, 4)
+        
+        x1_inter = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+        y1_inter = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+        x2_inter = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+        y2_inter = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+        
+        inter_area = np.clip(x2_inter - x1_inter, 0, None) * np.clip(y2_inter - y1_inter, 0, None)
+        
+        boxes1_area = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+        boxes2_area = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+        
+        union_area = boxes1_area[:, None] + boxes2_area[None, :] - inter_area
+        
+        return np.divide(inter_area, union_area, out=np.zeros_like(inter_area), where=union_area > 0)
+    
+    def associate(self, boxes, track_boxes):
+        """
+        Match all detections of a frame to tracks (Hungarian assignment on IoU)
+        
+        Args:
+            boxes (numpy.ndarray): Detected boxes N x 4 [[x1, y1, x2, y2], ...]
+            track_boxes (array-like): Track boxes [[x1, y1, x2, y2], ...]
+            
+        Returns:
+            tuple: (det_indices, track_indices, unmatched) index arrays
+                det_indices, track_indices: matched detection/track pairs
+                unmatched: detection indices without a track
+        """
+        no_match = np.zeros(0, dtype=np.intp)
+        
+        if len(boxes) == 0:
+            return no_match, no_match, no_match
+        
+        if len(track_boxes) == 0:
+            return no_match, no_match, np.arange(len(boxes))
+        
+        iou_matrix = self.calculate_iou_matrix(boxes, track_boxes)
+        
+        det_indices, track_indices = linear_sum_assignment(-iou_matrix)
+        
+        matched = iou_matrix[det_indices, track_indices] > self.iou_threshold
+        det_indices = det_indices[matched]
+        track_indices = track_indices[matched]
+        
+        unmatched_mask = np.ones(len(boxes), dtype=bool)
+        unmatched_mask[det_indices] = False
+        
+        return det_indices, track_indices, np.flatnonzero(unmatched_mask)
+    
+    def associate_centers(self, boxes, track_boxes):
+        """
+        Match detections to tracks by center distance. Fallback for tracks whose
+        velocity is not known yet, when a fast vehicle no longer overlaps its predicted box.
+        
+        Args:
+            boxes (numpy.ndarray): Detected boxes N x 4
+            track_boxes (numpy.ndarray): Track boxes M x 4
+            
+        Returns:
+            tuple: (det_indices, track_indices) matched pairs
+        """
+        no_match = np.zeros(0, dtype=np.intp)
+        
+        if len(boxes) == 0 or len(track_boxes) == 0:
+            return no_match, no_match
+        
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+        track_sizes = np.maximum(track_boxes[:, 2:] - track_boxes[:, :2], 1e-6)
+        
+        # Center distance in track box sizes
+        distance = np.linalg.norm(centers[:, None] - track_centers[None], axis=2) / track_sizes.max(axis=1)[None]
+        
+        # Boxes of very different size are other vehicles
+        areas = np.prod(np.maximum(boxes[:, 2:] - boxes[:, :2], 1e-6), axis=1)
+        area_ratio = areas[:, None] / np.prod(track_sizes, axis=1)[None]
+        
+        cost = np.where((area_ratio > 0.5) & (area_ratio < 2.0), distance, np.inf)
+        cost = np.minimum(cost, self.center_gate * 2 + 1)  # finite costs for the assignment
+        
+        det_indices, track_indices = linear_sum_assignment(cost)
+        matched = cost[det_indices, track_indices] <= self.center_gate
+        
+        return det_indices[matched], track_indices[matched]
+    
+    def assign_ids(self, boxes, current_time, frame_step=1):
+        """
+        Assign vehicle IDs to all detections of one frame.
+        Detections are matched against the Kalman-predicted boxes of the tracks.
+        
+        Args:
+            boxes (array-like): Detected boxes N x 4 [[x1, y1, x2, y2], ...]
             current_time (float): Current time
+            frame_step (int): Frames elapsed since the previous call (>1 when frames were skipped)
             
         Returns:
-            tuple: (vehicle_id, is_new)
+            tuple: (vehicle_ids, is_new) arrays, one entry per box in input order
+        """
+        slots, is_new = self.assign_slots(boxes, current_time, frame_step)
+        return self.slot_vehicle_ids(slots), is_new
+    
+    def assign_slots(self, boxes, current_time, frame_step=1):
+        """
+        Match the detections of one frame to track table slots, opening new tracks for the rest.
+        When the table is full the least recently seen tracks are evicted; detections
+        beyond the capacity stay untracked (slot -1).
+        
+        Args:
+            boxes (array-like): Detected boxes N x 4 [[x1, y1, x2, y2], ...]
+            current_time (float): Current time
+            frame_step (int): Frames elapsed since the previous call
+            
+        Returns:
+            tuple: (slots, is_new) arrays, one entry per box in input order
         """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        slots = np.full(len(boxes), -1, dtype=np.intp)
+        is_new = np.zeros(len(boxes), dtype=bool)
+        
+        predicted_boxes = self.motion_model.predict(frame_step)
+        det_indices, track_indices, unmatched = self.associate(boxes, predicted_boxes)
+        
+        # Young tracks have no velocity yet: fall back to center distance
+        if len(unmatched) and self.center_gate > 0:
+            free_rows = np.ones(len(predicted_boxes), dtype=bool)
+            free_rows[track_indices] = False
+            young_rows = np.flatnonzero(free_rows & (self.tracks.hits[self.track_slots] < self.min_hits))
+            
+            extra_dets, extra_rows = self.associate_centers(boxes[unmatched], predicted_boxes[young_rows])
+            if len(extra_dets):
+                det_indices = np.concatenate([det_indices, unmatched[extra_dets]])
+                track_indices = np.concatenate([track_indices, young_rows[extra_rows]])
+                unmatched = np.delete(unmatched, extra_dets)
+        
+        if len(det_indices):
+            self.motion_model.update(track_indices, boxes[det_indices])
+            slots[det_indices] = self.track_slots[track_indices]
+            self.tracks.touch(slots[det_indices], boxes[det_indices], current_time)
+        
+        self._age_unmatched_tracks(track_indices)
+        
+        missing = len(unmatched) - self.tracks.free_count()
+        if missing > 0:
+            self._drop_tracks(self.tracks.oldest(missing, exclude=slots[det_indices]))
+            unmatched = unmatched[:self.tracks.free_count()]
+        
+        if len(unmatched):
+            self.motion_model.add(boxes[unmatched])
+            
+            new_slots = []
+            for det_idx in unmatched.tolist():
+                vehicle_id = self._next_vehicle_id()
+                slot = self.tracks.allocate(vehicle_id, boxes[det_idx], current_time)
+                heapq.heappush(self.expiry_queue, (current_time, slot, vehicle_id))
+                new_slots.append(slot)
+            slots[unmatched] = new_slots
+            self.track_slots = np.concatenate([self.track_slots, np.asarray(new_slots, dtype=np.intp)])
         
-        if not self.tracked_vehicles:
-            vehicle_id = 1
-            self.tracked_vehicles[vehicle_id] = vehicle_box
-            return vehicle_id, True
+        is_new[unmatched] = True
         
+        self.last_slots = slots
+        self.last_slot_ids = self.slot_vehicle_ids(slots)
         
-        best_iou = 0
-        best_vehicle_id = None
+        return slots, is_new
+    
+    def _age_unmatched_tracks(self, matched_rows):
+        """
+        Count a missed detection frame for every track without a match and drop
+        tracks that coasted too long (more than max_age misses, or more than one for unconfirmed tracks)
         
-        for vid, box in self.tracked_vehicles.items():
-            iou = self.calculate_iou(vehicle_box, box)
-            if iou > best_iou:
-                best_iou = iou
-                best_vehicle_id = vid
+        Args:
+            matched_rows (numpy.ndarray): Motion model rows matched this frame
+        """
+        unmatched_rows = np.ones(len(self.track_slots), dtype=bool)
+        unmatched_rows[matched_rows] = False
         
+        missed_slots = self.track_slots[unmatched_rows]
+        if len(missed_slots) == 0:
+            return
         
-        if best_iou > self.iou_threshold:
+        self.tracks.misses[missed_slots] += 1
+        
+        max_misses = np.where(self.tracks.hits[missed_slots] >= self.min_hits, self.max_age, 1)
+        self._drop_tracks(missed_slots[self.tracks.misses[missed_slots] > max_misses])
+    
+    def carry_slots(self, detections, current_time):
+        """
+        Slots for a frame whose detector run was skipped (a batch shared with the
+        last detected frame): the tracks of that frame are kept as they are and
+        the motion model is not stepped, so the next detected frame predicts over
+        all frames since (frame_step).
+        
+        Args:
+            detections (DetectionBatch): Reused detections
+            current_time (float): Current time
             
-            self.tracked_vehicles[best_vehicle_id] = vehicle_box
-            return best_vehicle_id, False
-        else:
+        Returns:
+            numpy.ndarray: Slot per box (-1 = track has ended)
+        """
+        if len(self.last_slots) != len(detections):
+            return np.full(len(detections), -1, dtype=np.intp)
+        
+        slots = self.last_slots
+        live = (slots >= 0) & (self.slot_vehicle_ids(slots) == self.last_slot_ids)
+        slots = np.where(live, slots, -1)
+        
+        # Nothing moved in the zones: the vehicles are still there
+        self.tracks.last_seen[slots[live]] = current_time
+        
+        return slots
+    
+    def slot_vehicle_ids(self, slots):
+        """
+        Vehicle IDs of track table slots (0 for untracked detections)
+        
+        Args:
+            slots (numpy.ndarray): Slots, -1 = untracked
             
-            vehicle_id = max(self.tracked_vehicles.keys()) + 1 if self.tracked_vehicles else 1
-            self.tracked_vehicles[vehicle_id] = vehicle_box
-            return vehicle_id, True
+        Returns:
+            numpy.ndarray: int64 vehicle IDs
+        """
+        return np.where(slots >= 0, self.tracks.ids[slots], 0)
+    
+    def get_predicted_boxes(self):
+        """
+        Predicted boxes of all tracks for the current frame
+        
+        Returns:
+            dict: {vehicle_id: [x1, y1, x2, y2]}
+        """
+        return dict(zip(self.tracks.ids[self.track_slots].tolist(), self.motion_model.boxes().tolist()))
     
-    def update_zone_presence(self, vehicle_id, zone_id, current_time):
+    def _next_vehicle_id(self):
+        """
+        Next vehicle ID from the monotonic 64-bit counter
+        
+        Returns:
+            int: Vehicle ID
+        """
+        self.last_vehicle_id += 1
+        return self.last_vehicle_id
+    
+    def track_vehicle(self, vehicle_box, current_time):
+        """
+        Track vehicle, assign ID
+        
+        Args:
+            vehicle_box (list): [x1, y1, x2, y2]
+            current_time (float): Current time
+            
+        Returns:
+            tuple: (vehicle_id, is_new)
+        """
+        vehicle_ids, is_new = self.assign_ids([vehicle_box], current_time)
+        return int(vehicle_ids[0]), bool(is_new[0])
+    
+    def update_zone_presence(self, slot, zone_bit, current_time):
         """
         Update whether a vehicle has entered a zone
         
         Args:
-            vehicle_id (int): Vehicle ID
-            zone_id (int): Zone ID
+            slot (int): Track table slot of the vehicle
+            zone_bit (int): Bit of the zone in the zone masks
             current_time (float): Current time
             
         Returns:
             bool: Whether the vehicle is newly entered
         """
+        word, mask = self.tracks.bit_mask(zone_bit)
         
-        self.vehicles_in_zones[zone_id].add(vehicle_id)
+        is_first_entry = not (self.tracks.entered_zones[slot, word] & mask)
+        
+        
+        last_entry_time = self.tracks.zone_entry_times[slot, zone_bit]
+        should_count = is_first_entry or (current_time - last_entry_time) > self.cooldown_time
         
         
-        if vehicle_id not in self.vehicles_zone_history:
-            self.vehicles_zone_history[vehicle_id] = {}
+        self.tracks.entered_zones[slot, word] |= mask
+        self.tracks.zone_entry_times[slot, zone_bit] = current_time
+        
+        return should_count
+    
+    def box_centers(self, boxes):
+        """
+        Center points of boxes
+        
+        Args:
+            boxes (list): Boxes [[x1, y1, x2, y2], ...]
             
+        Returns:
+            numpy.ndarray: N x 2 integer centers
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
         
-        is_first_entry = zone_id not in self.vehicles_zone_history[vehicle_id]
+        return ((boxes[:, :2] + boxes[:, 2:]) / 2).astype(np.int32)
+    
+    def update_zone_vehicles(self, slots, centers, zones, current_zone_vehicles, current_time):
+        """
+        Put vehicles into the zones containing their centers and count COUNT zone entries.
+        The zone masks of the track table are replaced by this frame's zones.
         
+        Args:
+            slots (numpy.ndarray): Track table slot of every box (-1 = untracked)
+            centers (numpy.ndarray): Box centers N x 2
+            zones (list): List of zones
+            current_zone_vehicles (dict): {zone_id: set(vehicle_ids)} filled in place
+            current_time (float): Current time
+        """
+        zone_bits = self.tracks.zone_bits([zone.id for zone in zones])
+        zone_membership = self.zone_manager.label_points(zones, centers)
+        zone_membership[slots < 0] = False
+        
+        vehicle_ids = self.slot_vehicle_ids(slots).tolist()
+        slot_list = slots.tolist()
+        previous_zones = self.tracks.in_zones
+        
+        for det_idx, zone_idx in zip(*(indices.tolist() for indices in np.nonzero(zone_membership))):
+            vehicle_id = vehicle_ids[det_idx]
+            slot = slot_list[det_idx]
+            zone = zones[zone_idx]
+            zone_bit = zone_bits[zone_idx]
+            
+            current_zone_vehicles[zone.id].add(vehicle_id)
+            
+            
+            if zone.is_count_zone():
+                word, mask = self.tracks.bit_mask(zone_bit)
+                was_in_zone = previous_zones[slot, word] & mask
+                
+                
+                if not was_in_zone:
+                    should_count = self.update_zone_presence(slot, zone_bit, current_time)
+                    
+                    
+                    if should_count:
+                        zone.increment_count()
+                        self.frame_crossings.append((vehicle_id, zone.id))
         
-        last_entry_time = self.vehicles_zone_history.get(vehicle_id, {}).get(zone_id, 0)
-        should_count = is_first_entry or (current_time - last_entry_time) > self.cooldown_time
         
+        zone_bits = np.asarray(zone_bits, dtype=np.int64)
+        zone_words = zone_bits // TrackTable.ZONES_PER_WORD
+        zone_masks = np.left_shift(np.uint64(1), (zone_bits % TrackTable.ZONES_PER_WORD).astype(np.uint64))
         
-        self.vehicles_zone_history[vehicle_id][zone_id] = current_time
-        self.vehicles_zone_history[vehicle_id]['last_seen'] = current_time
+        frame_zones = np.zeros((len(slots), self.tracks.zone_words()), dtype=np.uint64)
+        for word in np.unique(zone_words).tolist():
+            in_word = zone_words == word
+            frame_zones[:, word] = np.bitwise_or.reduce(
+                np.where(zone_membership[:, in_word], zone_masks[in_word], np.uint64(0)), axis=1
+            )
         
-        return should_count
+        tracked = slots >= 0
+        self.tracks.in_zones[:] = 0
+        self.tracks.in_zones[slots[tracked]] = frame_zones[tracked]
+    
+    def _drop_tracks(self, slots):
+        """
+        End tracks: remove their motion model rows and free their slots
+        
+        Args:
+            slots (numpy.ndarray): Slots
+        """
+        if len(slots) == 0:
+            return
+        
+        dropped_rows = np.isin(self.track_slots, slots)
+        self.motion_model.remove(np.flatnonzero(dropped_rows))
+        self.track_slots = self.track_slots[~dropped_rows]
+        self.tracks.release(slots)
     
     def cleanup_stale_tracks(self, current_time, timeout=5.0):
         """
-        Clean up vehicles that have been missing for a long time
+        Clean up vehicles that have been missing for a long time.
+        Only heap entries older than the timeout are looked at: a track seen since
+        its entry was pushed is rescheduled at its new last_seen, so every track is
+        re-examined at most once per timeout period.
         
         Args:
             current_time (float): Current time
             timeout (float): Timeout (seconds)
         """
-        for vid in list(self.tracked_vehicles.keys()):
-            if vid in self.vehicles_zone_history and 'last_seen' in self.vehicles_zone_history[vid]:
-                if current_time - self.vehicles_zone_history[vid]['last_seen'] > timeout:
-                    self.tracked_vehicles.pop(vid, None)
+        stale_slots = []
+        
+        while self.expiry_queue and current_time - self.expiry_queue[0][0] > timeout:
+            _, slot, vehicle_id = heapq.heappop(self.expiry_queue)
+            
+            # Entry of a track that was already evicted
+            if not self.tracks.active[slot] or self.tracks.ids[slot] != vehicle_id:
+                continue
+            
+            last_seen = float(self.tracks.last_seen[slot])
+            if current_time - last_seen > timeout:
+                stale_slots.append(slot)
+            else:
+                heapq.heappush(self.expiry_queue, (last_seen, slot, vehicle_id))
+        
+        self._drop_tracks(np.asarray(stale_slots, dtype=np.intp))
     
-    def process_frame(self, vehicles, zones, current_time):
+    def process_frame(self, vehicles, zones, current_time, frame_step=1):
         """
         Process all vehicles in one frame
         
@@ -154,6 +508,7 @@ class VehicleTracker:
             vehicles (list): Detected vehicles
             zones (list): List of zones
             current_time (float): Current time
+            frame_step (int): Frames elapsed since the previous call
             
         Returns:
             dict: Processed result {
@@ -164,51 +519,33 @@ class VehicleTracker:
         """
         
         current_zone_vehicles = {zone.id: set() for zone in zones}
+        self.frame_crossings = []
         current_vehicles_by_id = {}
         
         
-        for vehicle in vehicles:
-            box = vehicle['box']
-            vehicle_id, is_new = self.track_vehicle(box, current_time)
-            
-            
+        boxes = [vehicle['box'] for vehicle in vehicles]
+        slots, _ = self.assign_slots(boxes, current_time, frame_step)
+        vehicle_ids = self.slot_vehicle_ids(slots).tolist()
+        
+        for vehicle, vehicle_id in zip(vehicles, vehicle_ids):
             vehicle['id'] = vehicle_id
             current_vehicles_by_id[vehicle_id] = vehicle
-            
-            
-            for zone in zones:
-                if zone.contains_point(
-                    int((box[0] + box[2]) / 2),  
-                    int((box[1] + box[3]) / 2)   
-                ):
-                    
-                    current_zone_vehicles[zone.id].add(vehicle_id)
-                    
-                    
-                    if zone.is_count_zone():
-                        was_in_zone = vehicle_id in self.vehicles_in_zones.get(zone.id, set())
-                        
-                        
-                        if not was_in_zone:
-                            should_count = self.update_zone_presence(vehicle_id, zone.id, current_time)
-                            
-                            
-                            if should_count:
-                                zone.increment_count()
+        
+        
+        self.update_zone_vehicles(
+            slots, self.box_centers(boxes), zones, current_zone_vehicles, current_time
+        )
         
         
         for zone in zones:
             if zone.is_sum_zone():
-                zone.set_current_count(len(current_zone_vehicles[zone.id]))
+                zone.set_current_count(len(current_zone_vehicles[zone.id]), current_time)
             
             
-            zone.update_vehicles(current_zone_vehicles[zone.id])
+            zone.update_vehicles(current_zone_vehicles[zone.id], current_time)
             
             
-            zone.update_stalled_status()
-        
-        
-        self.vehicles_in_zones = current_zone_vehicles
+            zone.update_stalled_status(current_time)
         
         
         self.cleanup_stale_tracks(current_time)
@@ -222,84 +559,56 @@ class VehicleTracker:
             'zone_connections': zone_connections
         }
     
-    def track_vehicles(self, frame, boxes, scores, class_ids, zones):
+    def track_vehicles(self, frame, detections, zones, frame_step=1, current_time=None):
         """
-        New format: Track vehicles using boxes, scores, class_ids
+        New format: Track the detections of one frame
         
         Args:
             frame (numpy.ndarray): Image frame
-            boxes (list): Detected boxes [[x1,y1,x2,y2], ...]
-            scores (list): Scores [score1, score2, ...]
-            class_ids (list): Class IDs [class_id1, class_id2, ...]
+            detections (DetectionBatch): Detections of the frame; track_ids and is_new are set in place.
+                A reused batch (detector skipped) keeps the tracks of the last detected frame.
             zones (list): Zones
+            frame_step (int): Frames since the last detected frame (>1 when frames or detections were skipped)
+            current_time (float): Frame time (None = read the clock)
             
         Returns:
-            tuple: (tracked_objects, zone_vehicles)
-                tracked_objects: Tracked vehicles
+            tuple: (detections, zone_vehicles)
+                detections: The same batch with vehicle IDs
                 zone_vehicles: Vehicles in each zone
         """
-        current_time = time.time()
+        if current_time is None:
+            current_time = self.clock.now()
         
         
         current_zone_vehicles = {zone.id: set() for zone in zones}
-        tracked_objects = []
+        self.frame_crossings = []
         
         
-        for i, box in enumerate(boxes):
-            score = scores[i]
-            class_id = class_ids[i]
-            
-            vehicle_id, is_new = self.track_vehicle(box, current_time)
-            
-            
-            tracked_obj = {
-                "id": vehicle_id,
-                "bbox": box,
-                "score": score,
-                "class_id": class_id,
-                "is_new": is_new
-            }
-            tracked_objects.append(tracked_obj)
-            
-            
-            center_x = int((box[0] + box[2]) / 2)
-            center_y = int((box[1] + box[3]) / 2)
-            
-            for zone in zones:
-                if zone.contains_point(center_x, center_y):
-                    
-                    current_zone_vehicles[zone.id].add(vehicle_id)
-                    
-                    
-                    if zone.is_count_zone():
-                        was_in_zone = vehicle_id in self.vehicles_in_zones.get(zone.id, set())
-                        
-                        
-                        if not was_in_zone:
-                            should_count = self.update_zone_presence(vehicle_id, zone.id, current_time)
-                            
-                            
-                            if should_count:
-                                zone.increment_count()
+        if detections.reused:
+            slots = self.carry_slots(detections, current_time)
+            detections.is_new = np.zeros(len(detections), dtype=bool)
+        else:
+            slots, detections.is_new = self.assign_slots(detections.boxes, current_time, frame_step)
+        detections.track_ids = self.slot_vehicle_ids(slots)
+        
+        
+        self.update_zone_vehicles(slots, detections.centers(), zones, current_zone_vehicles, current_time)
         
         
         for zone in zones:
             if zone.is_sum_zone():
-                zone.set_current_count(len(current_zone_vehicles[zone.id]))
+                zone.set_current_count(len(current_zone_vehicles[zone.id]), current_time)
             
             
-            zone.update_vehicles(current_zone_vehicles[zone.id])
+            zone.update_vehicles(current_zone_vehicles[zone.id], current_time)
             
             
-            zone.update_stalled_status()
-        
-        
-        self.vehicles_in_zones = current_zone_vehicles
+            zone.update_stalled_status(current_time)
         
         
         self.cleanup_stale_tracks(current_time)
         
-        return tracked_objects, current_zone_vehicles
+        return detections, current_zone_vehicles
     
     def check_zone_connections(self, zones, current_zone_vehicles):
         """
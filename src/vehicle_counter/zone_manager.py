@@ -1,7 +1,106 @@
 import cv2
 import numpy as np
 import time
-from shapely.geometry import Point, Polygon
+from shapely.geometry import Polygon
+
+from clock import SYSTEM_CLOCK
+
+class VehicleHistoryBuffer:
+    """
+    Бүсийн машины түүхийг хадгалах тогтмол багтаамжтай цагираг буфер.
+    Нэмэх, хуучин бичлэг устгах, дундаж авах нь O(1).
+    """
+    
+    def __init__(self, capacity=4096, max_age=3600):
+        """
+        Буфер үүсгэх
+        
+        Args:
+            capacity (int): Хамгийн их бичлэгийн тоо
+            max_age (float): Бичлэг хадгалах хугацаа (секунд)
+        """
+        self.capacity = capacity
+        self.max_age = max_age
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.counts = np.zeros(capacity, dtype=np.int32)
+        self.stalled = np.zeros(capacity, dtype=bool)
+        self.head = 0  # Хамгийн хуучин бичлэгийн байрлал
+        self.size = 0
+        self.count_sum = 0  # Буфер дэх машины тооны нийлбэр
+        self.stalled_sum = 0  # Буфер дэх түгжрэлтэй бичлэгийн тоо
+    
+    def __len__(self):
+        return self.size
+    
+    def __iter__(self):
+        for i in range(self.size):
+            idx = (self.head + i) % self.capacity
+            yield {
+                "timestamp": float(self.timestamps[idx]),
+                "count": int(self.counts[idx]),
+                "is_stalled": bool(self.stalled[idx])
+            }
+    
+    def _pop_oldest(self):
+        """
+        Хамгийн хуучин бичлэгийг устгах
+        """
+        self.count_sum -= int(self.counts[self.head])
+        self.stalled_sum -= int(self.stalled[self.head])
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+    
+    def evict_older_than(self, timestamp):
+        """
+        Өгөгдсөн хугацаанаас хуучин бичлэгүүдийг устгах
+        
+        Args:
+            timestamp (float): Хугацааны хязгаар
+        """
+        while self.size and self.timestamps[self.head] <= timestamp:
+            self._pop_oldest()
+    
+    def append(self, timestamp, count, is_stalled):
+        """
+        Шинэ бичлэг нэмэх (дүүрсэн бол хамгийн хуучныг дарна)
+        
+        Args:
+            timestamp (float): Хугацаа
+            count (int): Машины тоо
+            is_stalled (bool): Түгжрэлтэй эсэх
+        """
+        self.evict_older_than(timestamp - self.max_age)
+        
+        if self.size == self.capacity:
+            self._pop_oldest()
+        
+        idx = (self.head + self.size) % self.capacity
+        self.timestamps[idx] = timestamp
+        self.counts[idx] = count
+        self.stalled[idx] = is_stalled
+        self.size += 1
+        
+        self.count_sum += int(count)
+        self.stalled_sum += int(bool(is_stalled))
+    
+    def average_count(self):
+        """
+        Дундаж машины тоо
+        
+        Returns:
+            float: Дундаж (бичлэггүй бол 0)
+        """
+        return self.count_sum / self.size if self.size else 0
+    
+    def stalled_ratio(self):
+        """
+        Түгжрэлтэй бичлэгийн эзлэх хувь
+        
+        Returns:
+            float: 0.0 ~ 1.0
+        """
+        return self.stalled_sum / self.size if self.size else 0
+
 
 class Zone:
     """
@@ -10,7 +109,7 @@ class Zone:
     ZONE_TYPE_COUNT = 1  # Нэвтэрсэн тээврийн хэрэгслийг тоолох төрөл
     ZONE_TYPE_SUM = 2    # Одоогийн байгаа тээврийн хэрэгслийг тоолох төрөл
     
-    def __init__(self, zone_id, points, zone_type, name=None):
+    def __init__(self, zone_id, points, zone_type, name=None, clock=None):
         """
         Бүс үүсгэх
         
@@ -19,12 +118,15 @@ class Zone:
             points (list): Бүсийн цэгүүд [(x, y), ...]
             zone_type (int): Бүсийн төрөл (1: COUNT, 2: SUM)
             name (str): Бүсийн нэр
+            clock: Цаг (now() функцтэй, None бол системийн цаг)
         """
+        self.clock = clock or SYSTEM_CLOCK
         self.id = zone_id
         self.points = points
         self.type = zone_type
         self.name = name or f"Zone {zone_id}"
         self.polygon = Polygon(points)
+        self.mask_origin, self.mask = self._build_mask(points)  # Бүсийн растер маск (bounding box хэмжээтэй)
         self.vehicle_count = 0
         self.current_count = 0  # Type 2 (SUM) бүсийн хувьд одоогийн тээврийн хэрэгслийн тоо
         self.traffic_light_directions = []  # Холбоотой гэрлэн дохионы чиглэлүүд
@@ -35,14 +137,16 @@ class Zone:
         self.current_vehicles = set()  # Одоогийн frame-д байгаа машинууд
         self.vehicle_movement_detected = False  # Машин хөдөлж байгаа эсэх
         self.movement_threshold = 3  # Хөдөлгөөн мэдрэх босго
-        self.last_update_time = time.time()  # Сүүлийн шинэчлэлтийн хугацаа
+        self.last_update_time = self.clock.now()  # Сүүлийн шинэчлэлтийн хугацаа
         
         # Статистик
-        self.stat_start_time = time.time()  # Статистик эхэлсэн хугацаа
+        self.stat_start_time = self.clock.now()  # Статистик эхэлсэн хугацаа
         self.hourly_stats = {}  # Цагийн статистик {hour: count}
         self.congestion_events = []  # Түгжрэлийн үйл явдлууд
-        self.vehicle_history = []  # Машины түүх [{timestamp, count}]
+        self.vehicle_history = VehicleHistoryBuffer()  # Машины түүх (сүүлийн 1 цаг)
         self.max_vehicle_count = 0  # Хамгийн их машины тоо
+        self.max_vehicle_time = None  # Хамгийн их машин анх бүртгэгдсэн хугацаа
+        self.max_hourly_stats = 24 * 7  # Цагийн статистикийг хадгалах цагийн тоо
         self.total_stalled_time = 0  # Нийт түгжрэлд зарцуулсан хугацаа (секунд)
         self.stall_start_time = None  # Түгжрэл эхэлсэн хугацаа
     
@@ -57,7 +161,57 @@ class Zone:
         Returns:
             bool: Цэг бүсэд байгаа эсэх
         """
-        return self.polygon.contains(Point(x, y))
+        dx = int(x) - self.mask_origin[0]
+        dy = int(y) - self.mask_origin[1]
+        
+        if 0 <= dy < self.mask.shape[0] and 0 <= dx < self.mask.shape[1]:
+            return bool(self.mask[dy, dx])
+        return False
+    
+    def contains_points(self, points):
+        """
+        Олон цэг бүсэд байгаа эсэхийг нэг дор шалгах
+        
+        Args:
+            points (numpy.ndarray): Цэгүүд N x 2 [(x, y), ...]
+            
+        Returns:
+            numpy.ndarray: N урттай bool массив
+        """
+        points = np.asarray(points).reshape(-1, 2).astype(np.int64)
+        result = np.zeros(len(points), dtype=bool)
+        
+        dx = points[:, 0] - self.mask_origin[0]
+        dy = points[:, 1] - self.mask_origin[1]
+        
+        inside = (dx >= 0) & (dx < self.mask.shape[1]) & (dy >= 0) & (dy < self.mask.shape[0])
+        result[inside] = self.mask[dy[inside], dx[inside]] != 0
+        
+        return result
+    
+    @staticmethod
+    def _build_mask(points):
+        """
+        Полигоны bounding box хэмжээтэй uint8 маск үүсгэх (нэг удаа)
+        
+        Args:
+            points (list): Бүсийн цэгүүд [(x, y), ...]
+            
+        Returns:
+            tuple: ((x0, y0) маскын эхлэл, numpy.ndarray маск)
+        """
+        pts = np.round(np.asarray(points, dtype=np.float64)).astype(np.int32).reshape(-1, 2)
+        
+        if len(pts) == 0:
+            return (0, 0), np.zeros((0, 0), dtype=np.uint8)
+        
+        x0, y0 = pts.min(axis=0)
+        x1, y1 = pts.max(axis=0)
+        
+        mask = np.zeros((y1 - y0 + 1, x1 - x0 + 1), dtype=np.uint8)
+        cv2.fillPoly(mask, [pts - np.array([x0, y0], dtype=np.int32)], 1)
+        
+        return (int(x0), int(y0)), mask
     
     def is_count_zone(self):
         """Type 1 (COUNT) бүс мөн эсэх"""
@@ -71,16 +225,34 @@ class Zone:
         """Тээврийн хэрэгслийн тоо нэмэгдүүлэх (Type 1 - COUNT)"""
         self.vehicle_count += 1
     
-    def set_current_count(self, count):
+    def reset_time(self, current_time):
+        """
+        Хугацааны тэмдэглэлүүдийг шинэ цагаас эхлүүлэх (бичлэгийн цагаар ажиллахад)
+        
+        Args:
+            current_time (float): Эхлэх хугацаа
+        """
+        self.last_update_time = current_time
+        self.stat_start_time = current_time
+        self.stall_start_time = None
+    
+    def set_current_count(self, count, current_time=None):
         """
         Одоогийн тээврийн хэрэгслийн тоо тохируулах (Type 2 - SUM)
+        
+        Args:
+            count (int): Тээврийн хэрэгслийн тоо
+            current_time (float): Одоогийн хугацаа (None бол clock-оос авна)
         """
+        if current_time is None:
+            current_time = self.clock.now()
+        
         # Тоо өөрчлөгдсөн эсэхийг шалгах
         if self.current_count != count:
             # Тоо нэмэгдсэн бол машин хөдөлж байна гэж үзнэ
             self.vehicle_movement_detected = abs(self.current_count - count) >= self.movement_threshold
-            self.last_update_time = time.time()
-        elif time.time() - self.last_update_time > 5.0:  # 5 секунд өнгөрсөн бол хөдөлгөөнгүй
+            self.last_update_time = current_time
+        elif current_time - self.last_update_time > 5.0:  # 5 секунд өнгөрсөн бол хөдөлгөөнгүй
             self.vehicle_movement_detected = False
             
         self.current_count = count
@@ -91,12 +263,13 @@ class Zone:
         """
         return self.vehicle_count if self.is_count_zone() else self.current_count
     
-    def update_vehicles(self, vehicle_ids):
+    def update_vehicles(self, vehicle_ids, current_time=None):
         """
         Тухайн зонд байгаа машинуудын ID-г шинэчлэх
         
         Args:
             vehicle_ids (set): Машинуудын ID
+            current_time (float): Одоогийн хугацаа (None бол clock-оос авна)
         """
         # Өмнөх машиныг хадгалах
         self.previous_vehicles = self.current_vehicles.copy()
@@ -113,15 +286,21 @@ class Zone:
         
         # Сүүлийн шинэчлэлийн хугацааг тэмдэглэх
         if self.vehicle_movement_detected:
-            self.last_update_time = time.time()
+            self.last_update_time = self.clock.now() if current_time is None else current_time
     
-    def update_stalled_status(self):
+    def update_stalled_status(self, current_time=None):
         """
         Машин удаан хугацаанд хөдөлгөөнгүй зогссон эсэхийг шинэчлэх
         
+        Args:
+            current_time (float): Одоогийн хугацаа (None бол clock-оос авна)
+        
         Returns:
             bool: Машин удаан зогссон эсэх
         """
+        if current_time is None:
+            current_time = self.clock.now()
+        
         # Хэрэв машин байхгүй бол хөдөлгөөнгүй гэж үзэхгүй
         if len(self.current_vehicles) == 0:
             self.stalled_time = 0
@@ -129,14 +308,14 @@ class Zone:
             
             # Хэрэв өмнө нь түгжрэлтэй байсан бол хугацааг бүртгэх
             if self.stall_start_time is not None:
-                stall_duration = time.time() - self.stall_start_time
+                stall_duration = current_time - self.stall_start_time
                 self.total_stalled_time += stall_duration
                 self.stall_start_time = None
                 
                 # Түгжрэлийн үйл явдлыг бүртгэх
                 self.congestion_events.append({
                     "start_time": self.stall_start_time,
-                    "end_time": time.time(),
+                    "end_time": current_time,
                     "duration": stall_duration,
                     "vehicle_count": len(self.previous_vehicles)
                 })
@@ -149,20 +328,18 @@ class Zone:
             
             # Хэрэв өмнө нь түгжрэлтэй байсан бол хугацааг бүртгэх
             if self.stall_start_time is not None:
-                stall_duration = time.time() - self.stall_start_time
+                stall_duration = current_time - self.stall_start_time
                 self.total_stalled_time += stall_duration
                 self.stall_start_time = None
                 
                 # Түгжрэлийн үйл явдлыг бүртгэх
                 self.congestion_events.append({
                     "start_time": self.stall_start_time,
-                    "end_time": time.time(),
+                    "end_time": current_time,
                     "duration": stall_duration,
                     "vehicle_count": len(self.current_vehicles)
                 })
         else:
-            current_time = time.time()
-            
             stall_duration = current_time - self.last_update_time
             
             # Хөдөлгөөнгүй байх хугацаа 10 секундээс их бол түгжрэл гэж үзэх
@@ -173,19 +350,23 @@ class Zone:
             
         prev_stalled = self.is_stalled
         
-        self.is_stalled = self.stalled_time > 0 and time.time() - self.last_update_time >= 10.0
+        self.is_stalled = self.stalled_time > 0 and current_time - self.last_update_time >= 10.0
         
         # Хэрэв түгжрэл эхэлж байгаа бол эхлэх хугацааг тэмдэглэх
         if not prev_stalled and self.is_stalled:
-            self.stall_start_time = time.time()
+            self.stall_start_time = current_time
             
         return self.is_stalled
     
-    def update_statistics(self):
+    def update_statistics(self, current_time=None):
         """
         Статистик мэдээллийг шинэчлэх
+        
+        Args:
+            current_time (float): Одоогийн хугацаа (None бол clock-оос авна)
         """
-        current_time = time.time()
+        if current_time is None:
+            current_time = self.clock.now()
         current_hour = time.strftime("%Y-%m-%d %H", time.localtime(current_time))
         vehicle_count = len(self.current_vehicles)
         
@@ -195,36 +376,46 @@ class Zone:
         else:
             self.hourly_stats[current_hour] = vehicle_count
             
-        # Машины түүх шинэчлэх
-        self.vehicle_history.append({
-            "timestamp": current_time,
-            "count": vehicle_count,
-            "is_stalled": self.is_stalled
-        })
+            # Хамгийн хуучин цагийг устгах
+            if len(self.hourly_stats) > self.max_hourly_stats:
+                self.hourly_stats.pop(next(iter(self.hourly_stats)))
+            
+        # Машины түүх шинэчлэх (1 цагаас хуучин бичлэг автоматаар устна)
+        self.vehicle_history.append(current_time, vehicle_count, self.is_stalled)
         
         # Хамгийн их машины тоог шинэчлэх
         if vehicle_count > self.max_vehicle_count:
             self.max_vehicle_count = vehicle_count
+            self.max_vehicle_time = current_time
+    
+    def overlay_state(self):
+        """
+        Зурахад хэрэгтэй, боловсруулалтын явцад өөрчлөгддөг утгууд
+        (тооллын урсгал дээр авч, зурах урсгалд дамжуулна)
         
-        # Түүхийг хязгаарлах (сүүлийн 1 цагийн мэдээллийг л хадгалах)
-        one_hour_ago = current_time - 3600
-        self.vehicle_history = [record for record in self.vehicle_history if record["timestamp"] > one_hour_ago]
+        Returns:
+            tuple: (display_count, is_stalled, max_vehicle_count, congestion_event_count)
+        """
+        return self.get_display_count(), self.is_stalled, self.max_vehicle_count, len(self.congestion_events)
     
-    def draw(self, frame):
+    def draw(self, frame, state=None):
         """
-        Бүсийг зураг дээр зурах
+        Бүсийг зураг дээр зурах. Бүсийн төлөвийг өөрчлөхгүй.
         
         Args:
             frame (numpy.ndarray): Зургийн фрэйм
+            state (tuple): overlay_state()-ийн утга (None бол одоогийн төлөвөөс авна)
             
         Returns:
             numpy.ndarray: Боловсруулсан зураг
         """
+        display_count, is_stalled, max_vehicle_count, congestion_event_count = state or self.overlay_state()
+        
         # Өнгө сонгох (COUNT=ногоон, SUM=улбар шар)
         color = (0, 255, 0) if self.is_count_zone() else (0, 120, 255)
         
         # Хэрэв түгжрэлтэй бол улаан өнгөтэй болгох
-        if self.is_stalled:
+        if is_stalled:
             color = (0, 0, 255)  # Улаан - түгжрэлтэй
         
         # Олон талт зурах
@@ -235,10 +426,10 @@ class Zone:
         if len(self.points) > 0:
             label_pos = self.points[0]
             zone_type_name = "COUNT" if self.is_count_zone() else "SUM"
-            count_text = f"{self.name} ({zone_type_name}): {self.get_display_count()}"
+            count_text = f"{self.name} ({zone_type_name}): {display_count}"
             
             # Түгжрэлийн статус нэмэх
-            if self.is_stalled:
+            if is_stalled:
                 count_text += " [ТҮГЖРЭЛТЭЙ]"
             
             cv2.putText(frame, count_text, 
@@ -253,35 +444,32 @@ class Zone:
                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
                 
             # Статистик мэдээлэл харуулах
-            if self.max_vehicle_count > 0:
-                stats_text = f"Хамгийн их: {self.max_vehicle_count} / Түгжрэл: {len(self.congestion_events)}"
+            if max_vehicle_count > 0:
+                stats_text = f"Хамгийн их: {max_vehicle_count} / Түгжрэл: {congestion_event_count}"
                 cv2.putText(frame, stats_text, 
                           (label_pos[0], label_pos[1] + 40), 
                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
         
         return frame
     
-    def get_statistics(self):
+    def get_statistics(self, current_time=None):
         """
         Статистик мэдээлэл авах
         
+        Args:
+            current_time (float): Одоогийн хугацаа (None бол clock-оос авна)
+        
         Returns:
             dict: Статистик мэдээлэл
         """
-        # Ажилласан нийт хугацаа (секунд)
-        run_time = time.time() - self.stat_start_time
+        if current_time is None:
+            current_time = self.clock.now()
         
-        # Хамгийн их машин байсан хугацаа
-        max_vehicle_time = None
-        for record in self.vehicle_history:
-            if record["count"] == self.max_vehicle_count:
-                max_vehicle_time = record["timestamp"]
-                break
+        # Ажилласан нийт хугацаа (секунд)
+        run_time = current_time - self.stat_start_time
         
-        # Дундаж машины тоо (хэрэв түүх байгаа бол)
-        avg_vehicle_count = 0
-        if self.vehicle_history:
-            avg_vehicle_count = sum(record["count"] for record in self.vehicle_history) / len(self.vehicle_history)
+        # Дундаж машины тоо (сүүлийн 1 цаг)
+        avg_vehicle_count = self.vehicle_history.average_count()
         
         return {
             "zone_id": self.id,
@@ -290,30 +478,98 @@ class Zone:
             "current_vehicle_count": len(self.current_vehicles),
             "total_vehicle_count": self.vehicle_count if self.is_count_zone() else None,
             "max_vehicle_count": self.max_vehicle_count,
-            "max_vehicle_time": max_vehicle_time,
+            "max_vehicle_time": self.max_vehicle_time,
             "avg_vehicle_count": round(avg_vehicle_count, 2),
             "congestion_events": len(self.congestion_events),
             "total_stalled_time": round(self.total_stalled_time, 2),
             "stalled_percentage": round((self.total_stalled_time / run_time) * 100, 2) if run_time > 0 else 0,
+            "recent_stalled_percentage": round(self.vehicle_history.stalled_ratio() * 100, 2),
             "hourly_stats": self.hourly_stats,
             "run_time_seconds": round(run_time, 2)
         }
 
 
+class ZoneLabelMap:
+    """
+    Бүх бүсийн маскийг нэг дор овоолсон пикселийн шошгын зураг.
+    Пиксел бүрт бүсүүдийн битүүдийг (np.packbits дарааллаар) хадгалж,
+    цэгүүдийг нэг индексжүүлэлтээр бүх бүсээр ангилна.
+    """
+    
+    def __init__(self, zones):
+        """
+        Шошгын зураг үүсгэх (нэг удаа)
+        
+        Args:
+            zones (list): Бүсүүдийн жагсаалт
+        """
+        self.zone_count = len(zones)
+        
+        masked = [zone for zone in zones if zone.mask.size]
+        if masked:
+            x0 = min(zone.mask_origin[0] for zone in masked)
+            y0 = min(zone.mask_origin[1] for zone in masked)
+            x1 = max(zone.mask_origin[0] + zone.mask.shape[1] for zone in masked)
+            y1 = max(zone.mask_origin[1] + zone.mask.shape[0] for zone in masked)
+        else:
+            x0 = y0 = x1 = y1 = 0
+        
+        self.origin = (x0, y0)
+        self.labels = np.zeros((y1 - y0, x1 - x0, (self.zone_count + 7) // 8), dtype=np.uint8)
+        
+        for zone_idx, zone in enumerate(zones):
+            if not zone.mask.size:
+                continue
+            
+            dx = zone.mask_origin[0] - x0
+            dy = zone.mask_origin[1] - y0
+            h, w = zone.mask.shape
+            bit = np.uint8(0x80 >> (zone_idx % 8))
+            
+            self.labels[dy:dy + h, dx:dx + w, zone_idx // 8] |= (zone.mask != 0).astype(np.uint8) * bit
+    
+    def lookup(self, points):
+        """
+        Цэг бүр аль бүсүүдэд байгааг тодорхойлох
+        
+        Args:
+            points (numpy.ndarray): Цэгүүд N x 2 [(x, y), ...]
+            
+        Returns:
+            numpy.ndarray: N x len(zones) bool матриц
+        """
+        points = np.asarray(points).reshape(-1, 2).astype(np.int64)
+        result = np.zeros((len(points), self.zone_count), dtype=bool)
+        
+        dx = points[:, 0] - self.origin[0]
+        dy = points[:, 1] - self.origin[1]
+        
+        inside = (dx >= 0) & (dx < self.labels.shape[1]) & (dy >= 0) & (dy < self.labels.shape[0])
+        if inside.any():
+            result[inside] = np.unpackbits(self.labels[dy[inside], dx[inside]], axis=1, count=self.zone_count)
+        
+        return result
+
+
 class ZoneManager:
     """
     Бүсүүдийг зохицуулах класс.
     """
     
-    def __init__(self):
+    def __init__(self, clock=None):
         """
         Бүсийн менежер үүсгэх
+        
+        Args:
+            clock: Бүх бүсэд дамжуулах цаг (now() функцтэй, None бол системийн цаг)
         """
+        self.clock = clock or SYSTEM_CLOCK
         self.zones = []
         self.current_zone_id = 1
         self.current_polygon = []  # Одоогийн буй зурагдаж байгаа полигон
-        self.last_statistics_update = time.time()  # Сүүлийн статистик шинэчлэлтийн хугацаа
+        self.last_statistics_update = self.clock.now()  # Сүүлийн статистик шинэчлэлтийн хугацаа
         self.statistics_update_interval = 5.0  # Статистик шинэчлэх хугацааны зай (секунд)
+        self.label_map_cache = ((), None)  # (бүсүүдийн tuple, ZoneLabelMap) энэ менежерийн сүүлд ашигласан бүсүүдийнх
     
     def create_zone(self, points, zone_type, name=None):
         """
@@ -327,7 +583,7 @@ class ZoneManager:
         Returns:
             Zone: Шинээр үүссэн бүс
         """
-        zone = Zone(self.current_zone_id, points, zone_type, name)
+        zone = Zone(self.current_zone_id, points, zone_type, name, clock=self.clock)
         self.zones.append(zone)
         self.current_zone_id += 1
         return zone
@@ -347,6 +603,41 @@ class ZoneManager:
                 return zone
         return None
     
+    def label_points(self, zones, points):
+        """
+        Цэг бүрийг аль бүсүүдэд байгааг нэг дор тодорхойлох.
+        Бүсийн маскууд өөрчлөгддөггүй тул шошгын зургийг бүсүүдийн
+        жагсаалт өөрчлөгдөх үед л дахин үүсгэнэ. Кэш менежер бүрт
+        тусдаа тул олон урсгал бие биеийнхээ зургийг дарж бичихгүй.
+        
+        Args:
+            zones (list): Бүсүүдийн жагсаалт
+            points (numpy.ndarray): Цэгүүд N x 2 [(x, y), ...]
+            
+        Returns:
+            numpy.ndarray: N x len(zones) bool матриц
+        """
+        key = tuple(zones)
+        cached_key, label_map = self.label_map_cache
+        
+        if label_map is None or cached_key != key:
+            label_map = ZoneLabelMap(zones)
+            self.label_map_cache = (key, label_map)
+        
+        return label_map.lookup(points)
+    
+    def zones_for_points(self, points):
+        """
+        Тээврийн хэрэгслийн төв цэгүүдийг бүсүүдээр ангилах
+        
+        Args:
+            points (numpy.ndarray): Цэгүүд N x 2 [(x, y), ...]
+            
+        Returns:
+            numpy.ndarray: N x len(self.zones) bool матриц
+        """
+        return self.label_points(self.zones, points)
+    
     def find_zones_containing_point(self, x, y):
         """
         Өгөгдсөн цэгийг агуулж байгаа бүс олох
@@ -402,22 +693,25 @@ class ZoneManager:
         """
         return len(self.current_polygon) >= 3
     
-    def draw_zones(self, frame):
+    def draw_zones(self, frame, zone_states=None):
         """
-        Бүх бүсүүдийг зураг дээр зурах
+        Бүх бүсүүдийг зураг дээр зурах. Статистик шинэчлэхгүй (зөвхөн уншина),
+        тиймээс тооллын урсгалаас өөр урсгалд дуудаж болно.
         
         Args:
             frame (numpy.ndarray): Зургийн фрэйм
+            zone_states (list): [(zone, overlay_state), ...] тооллын урсгал дээр авсан төлөв
+                (None бол одоогийн бүсүүдийг шууд уншина)
             
         Returns:
             numpy.ndarray: Боловсруулсан зураг
         """
-        # Статистикийг шинэчлэх
-        self.update_statistics()
+        if zone_states is None:
+            zone_states = [(zone, None) for zone in self.zones]
         
         # Бүх бүсийг зурах
-        for zone in self.zones:
-            frame = zone.draw(frame)
+        for zone, state in zone_states:
+            frame = zone.draw(frame, state)
         
         return frame
     
@@ -450,26 +744,44 @@ class ZoneManager:
         
         return result_frame
     
-    def update_statistics(self):
+    def reset_time(self, current_time):
+        """
+        Бүх бүсийн хугацааны тэмдэглэлүүдийг шинэ цагаас эхлүүлэх
+        
+        Args:
+            current_time (float): Эхлэх хугацаа
+        """
+        self.last_statistics_update = current_time
+        for zone in self.zones:
+            zone.reset_time(current_time)
+    
+    def update_statistics(self, current_time=None):
         """
         Бүх бүсийн статистикийг шинэчлэх
+        
+        Args:
+            current_time (float): Одоогийн хугацаа (None бол clock-оос авна)
         """
-        current_time = time.time()
+        if current_time is None:
+            current_time = self.clock.now()
         
         # Хугацааны зайг шалгаж статистикийг шинэчлэх
         if current_time - self.last_statistics_update >= self.statistics_update_interval:
             for zone in self.zones:
-                zone.update_statistics()
+                zone.update_statistics(current_time)
             self.last_statistics_update = current_time
     
-    def get_all_statistics(self):
+    def get_all_statistics(self, current_time=None):
         """
         Бүх бүсийн статистикийг авах
         
+        Args:
+            current_time (float): Одоогийн хугацаа (None бол clock-оос авна)
+        
         Returns:
             list: Бүх бүсийн статистик
         """
-        return [zone.get_statistics() for zone in self.zones]
+        return [zone.get_statistics(current_time) for zone in self.zones]
     
     def get_zone_statistics(self, zone_id):
         """